@@ -32,12 +32,26 @@ if config.config_file_name is not None:
 # Metadatos del modelo para autogenerate
 target_metadata = Base.metadata
 
+def include_object(objeto, nombre, tipo, reflejado, comparado_con):
+    """
+    Excluye de autogenerate los objetos de la búsqueda de texto completo y de
+    `catalogo_snapshot`, que no están en los modelos.
+    """
+    if tipo == "column" and nombre == "busqueda" and objeto.table.name == "productos":
+        return False
+    if tipo in ("table", "index") and nombre and (nombre.startswith("productos_fts") or nombre == "ix_productos_busqueda"):
+        return False
+    if tipo in ("table", "index") and nombre and nombre.startswith(("catalogo_snapshot", "ix_catalogo_snapshot")):
+        return False
+    return True
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -53,7 +67,8 @@ def run_migrations_online() -> None:
         poolclass=pool.NullPool,
     )
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata,
+                          include_object=include_object)
         with context.begin_transaction():
             context.run_migrations()
 
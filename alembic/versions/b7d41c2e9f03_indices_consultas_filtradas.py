@@ -0,0 +1,61 @@
+"""Indices para las consultas filtradas y paginadas por clave
+
+Revision ID: b7d41c2e9f03
+Revises: 9e538d1bc067
+Create Date: 2026-10-18 10:12:40.118204
+
+Índices compuestos que terminan en `id` (la última columna de las claves de
+paginación de `crud.obtener_pagina_productos`) y parciales para destacados y
+productos con stock. En PostgreSQL los índices por categoría y por marca
+incluyen las columnas filtrables, para que la selección de cada página sea un
+index-only scan, y se crean con CONCURRENTLY para no bloquear las escrituras en
+tablas grandes (fuera de la transacción de la migración). Un index-only scan sólo
+evita leer la tabla en las páginas marcadas como visibles, así que al final se
+ejecuta `VACUUM (ANALYZE)`, que actualiza el mapa de visibilidad y las estadísticas;
+después lo mantiene el autovacuum.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c2e9f03'
+down_revision: Union[str, None] = '9e538d1bc067'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNAS_FILTRO = ['categoria_id', 'subcategoria_id', 'marca_id', 'precio', 'stock', 'destacado']
+
+# nombre -> (columnas, opciones); las condiciones son las de `models.PRODUCTO_DESTACADO` y `models.PRODUCTO_CON_STOCK`
+INDICES = {
+    'ix_productos_categoria_id_id': (['categoria_id', 'id'],
+                                     {'postgresql_include': [c for c in COLUMNAS_FILTRO if c != 'categoria_id']}),
+    'ix_productos_marca_id_id': (['marca_id', 'id'],
+                                 {'postgresql_include': [c for c in COLUMNAS_FILTRO if c != 'marca_id']}),
+    'ix_productos_subcategoria_id_id': (['subcategoria_id', 'id'], {}),
+    'ix_productos_precio_id': (['precio', 'id'], {}),
+    'ix_productos_destacados': (['categoria_id', 'id'], {'postgresql_where': sa.text('destacado = true'),
+                                                         'sqlite_where': sa.text('destacado = 1')}),
+    'ix_productos_con_stock': (['categoria_id', 'id'], {'postgresql_where': sa.text('stock > 0'),
+                                                        'sqlite_where': sa.text('stock > 0')}),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre, (columnas, opciones) in INDICES.items():
+            op.create_index(nombre, 'productos', columnas, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True, **opciones)
+        if op.get_context().dialect.name == 'postgresql':
+            # Mapa de visibilidad (para los index-only scans) y estadísticas; VACUUM no admite transacción
+            op.execute('VACUUM (ANALYZE) productos')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre in reversed(list(INDICES)):
+            op.drop_index(nombre, table_name='productos', if_exists=True, postgresql_concurrently=True)
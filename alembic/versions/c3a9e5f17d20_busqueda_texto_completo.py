@@ -0,0 +1,77 @@
+"""Busqueda de texto completo en productos
+
+Revision ID: c3a9e5f17d20
+Revises: b7d41c2e9f03
+Create Date: 2026-10-18 12:31:07.402615
+
+PostgreSQL: columna generada `productos.busqueda` (`tsvector` con configuración
+`spanish`: nombre con peso A, descripción con peso B) e índice GIN sobre ella,
+que usa `crud.buscar_productos`. Añadir la columna reescribe la tabla, con un
+bloqueo exclusivo mientras dura: en tablas grandes conviene aplicarla fuera de
+horas. El índice se crea con CONCURRENTLY.
+
+SQLite: tabla virtual FTS5 `productos_fts` con el contenido de `productos` y
+triggers que la mantienen al día (el mismo SQL que `busqueda.asegurar_indice_sqlite`).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a9e5f17d20'
+down_revision: Union[str, None] = 'b7d41c2e9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TSVECTOR = ("setweight(to_tsvector('spanish'::regconfig, coalesce(nombre, '')), 'A') || "
+            "setweight(to_tsvector('spanish'::regconfig, coalesce(descripcion, '')), 'B')")
+
+SQLITE_UPGRADE = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+        nombre, descripcion, content='productos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, descripcion ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+        INSERT INTO productos_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+    "INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialecto = op.get_context().dialect.name
+    if dialecto == 'postgresql':
+        op.add_column('productos', sa.Column('busqueda', postgresql.TSVECTOR(),
+                                             sa.Computed(TSVECTOR, persisted=True), nullable=True))
+        with op.get_context().autocommit_block():
+            op.create_index('ix_productos_busqueda', 'productos', ['busqueda'], unique=False,
+                            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+    elif dialecto == 'sqlite':
+        for sentencia in SQLITE_UPGRADE:
+            op.execute(sentencia)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialecto = op.get_context().dialect.name
+    if dialecto == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_productos_busqueda', table_name='productos', postgresql_concurrently=True,
+                          if_exists=True)
+        op.drop_column('productos', 'busqueda')
+    elif dialecto == 'sqlite':
+        for trigger in ('productos_fts_au', 'productos_fts_ad', 'productos_fts_ai'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS productos_fts')
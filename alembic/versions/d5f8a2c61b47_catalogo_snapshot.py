@@ -0,0 +1,83 @@
+"""Copia desnormalizada del catalogo para la generacion
+
+Revision ID: d5f8a2c61b47
+Revises: c3a9e5f17d20
+Create Date: 2026-10-18 16:04:52.731190
+
+`catalogo_snapshot`: una fila por producto con los nombres de marca, categoría y
+subcategoría ya resueltos, que lee `main.py --snapshot` (ver `catalogo_snapshot`),
+y `catalogo_snapshot_estado`, con la huella de los datos del último refresco.
+
+PostgreSQL: vista materializada, llenada al crearla y ordenada por `id`, con un
+índice único por `id` (necesario para `REFRESH MATERIALIZED VIEW CONCURRENTLY`)
+y otro por `(categoria_id, id)` para la lista de precios. Crearla ejecuta la
+unión completa una vez; hasta el primer `crud.refrescar_catalogo_snapshot` no
+tiene huella y la generación no la usa.
+
+SQLite: tabla normal con el mismo contenido, actualizada de forma incremental por
+`crud.refrescar_catalogo_snapshot` (el mismo SQL que `catalogo_snapshot.asegurar_snapshot_sqlite`).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f8a2c61b47'
+down_revision: Union[str, None] = 'c3a9e5f17d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SELECT_PLANO = """SELECT p.id, p.nombre, p.descripcion, p.precio, p.codigo, p.stock, p.imagen_url, p.destacado,
+        p.fecha_actualizado, p.marca_id, m.nombre AS marca_nombre, p.categoria_id, c.nombre AS categoria_nombre,
+        p.subcategoria_id, s.nombre AS subcategoria_nombre
+    FROM productos p
+    LEFT JOIN marcas m ON m.id = p.marca_id
+    LEFT JOIN categorias c ON c.id = p.categoria_id
+    LEFT JOIN subcategorias s ON s.id = p.subcategoria_id"""
+
+POSTGRESQL_UPGRADE = (
+    f"CREATE MATERIALIZED VIEW IF NOT EXISTS catalogo_snapshot AS {SELECT_PLANO} ORDER BY p.id WITH DATA",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_catalogo_snapshot_id ON catalogo_snapshot (id)",
+    "CREATE INDEX IF NOT EXISTS ix_catalogo_snapshot_categoria_id_id ON catalogo_snapshot (categoria_id, id)",
+    "ANALYZE catalogo_snapshot",
+)
+
+SQLITE_UPGRADE = (
+    """CREATE TABLE IF NOT EXISTS catalogo_snapshot (
+        id INTEGER NOT NULL PRIMARY KEY, nombre VARCHAR(255) NOT NULL, descripcion TEXT,
+        precio NUMERIC(10, 2) NOT NULL, codigo VARCHAR(50), stock INTEGER, imagen_url VARCHAR(255),
+        destacado BOOLEAN, fecha_actualizado DATETIME, marca_id INTEGER, marca_nombre VARCHAR(100),
+        categoria_id INTEGER NOT NULL, categoria_nombre VARCHAR(100), subcategoria_id INTEGER,
+        subcategoria_nombre VARCHAR(100))""",
+    "CREATE INDEX IF NOT EXISTS ix_catalogo_snapshot_categoria_id_id ON catalogo_snapshot (categoria_id, id)",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialecto = op.get_context().dialect.name
+    if dialecto == 'postgresql':
+        for sentencia in POSTGRESQL_UPGRADE:
+            op.execute(sentencia)
+    elif dialecto == 'sqlite':
+        for sentencia in SQLITE_UPGRADE:
+            op.execute(sentencia)
+    op.create_table('catalogo_snapshot_estado',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('huella', sa.String(length=64), nullable=False),
+    sa.Column('refrescado_en', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalogo_snapshot_estado')
+    dialecto = op.get_context().dialect.name
+    if dialecto == 'postgresql':
+        op.execute('DROP MATERIALIZED VIEW IF EXISTS catalogo_snapshot')
+    elif dialecto == 'sqlite':
+        op.execute('DROP INDEX IF EXISTS ix_catalogo_snapshot_categoria_id_id')
+        op.execute('DROP TABLE IF EXISTS catalogo_snapshot')
@@ -0,0 +1,119 @@
+"""Almacén de catálogos generados, direccionado por contenido.
+
+Antes de generar, `main.run_catalog_generation` calcula la huella de la
+generación: la de los datos (`crud.obtener_huella_catalogo`, que no lee los
+productos) más las opciones que cambian el PDF (motor, imágenes, índice y
+`formato_ficha.VERSION_DISENO`). Si el almacén ya tiene un PDF para esa huella, se
+copia a `PDF_FILENAME` en lugar de generarlo de nuevo.
+
+Cada PDF se guarda una sola vez con el hash SHA-256 de su contenido como nombre
+(dos huellas que producen el mismo archivo lo comparten) y `generaciones.json`
+registra las últimas generaciones, de la más antigua a la más reciente. Al
+guardar una nueva se eliminan las que pasan de `max_generaciones` y los PDF a
+los que ya no apunta ninguna.
+
+Los cambios que no pasan por la base de datos (por ejemplo, sustituir el
+archivo de una imagen con la misma URL) no cambian la huella: para esos casos
+está `main.py --forzar`.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Optional
+
+from config import INDICE_COLUMNAS, INDICE_NUMEROS_PAGINA
+import crud
+from formato_ficha import VERSION_DISENO
+
+def huella_generacion(db, motor: str, con_imagenes: bool, optimizar: bool = False, linealizar: bool = False,
+                      buscar: str = None, snapshot: bool = False) -> Optional[str]:
+    """
+    Huella de los datos y de las opciones de las que depende el PDF. Con
+    `snapshot=True`, la de los datos de `catalogo_snapshot` en su último refresco
+    (None si nunca se ha refrescado): coincide con la de las tablas si la copia está
+    al día, y entonces el PDF es el mismo.
+    """
+    datos = crud.obtener_huella_snapshot(db) if snapshot else crud.obtener_huella_catalogo(db)
+    if datos is None:
+        return None
+    partes = [datos, motor, con_imagenes, INDICE_COLUMNAS, INDICE_NUMEROS_PAGINA,
+              VERSION_DISENO]
+    if optimizar or linealizar: # Sin optimizar, la misma huella que antes de existir la opción
+        partes += [optimizar, linealizar]
+    if buscar:
+        partes.append(["buscar", buscar])
+    return hashlib.sha256(json.dumps(partes).encode()).hexdigest()
+
+def hash_archivo(ruta: str) -> str:
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(2**20), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+class AlmacenCatalogos:
+    """PDF de las últimas `max_generaciones` generaciones, indexados por huella."""
+
+    def __init__(self, directorio: str, max_generaciones: int):
+        self.directorio = directorio
+        self.max_generaciones = max(1, max_generaciones)
+        self._ruta_indice = os.path.join(directorio, "generaciones.json")
+        os.makedirs(directorio, exist_ok=True)
+
+    def _leer_generaciones(self) -> list:
+        try:
+            with open(self._ruta_indice, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _escribir_generaciones(self, generaciones: list):
+        temporal = f"{self._ruta_indice}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(generaciones, f, indent=2)
+        os.replace(temporal, self._ruta_indice)
+
+    def _ruta_pdf(self, contenido: str) -> str:
+        return os.path.join(self.directorio, f"{contenido}.pdf")
+
+    def buscar(self, huella: str) -> Optional[str]:
+        """Ruta del PDF guardado para `huella`, o None si no está."""
+        for generacion in reversed(self._leer_generaciones()):
+            if generacion["huella"] == huella and os.path.exists(self._ruta_pdf(generacion["contenido"])):
+                return self._ruta_pdf(generacion["contenido"])
+        return None
+
+    def restaurar(self, huella: str, destino: str) -> bool:
+        """Copia a `destino` el PDF de `huella`, si está en el almacén."""
+        ruta = self.buscar(huella)
+        if ruta is None:
+            return False
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        shutil.copyfile(ruta, temporal)
+        os.replace(temporal, destino)
+        return True
+
+    def guardar(self, huella: str, ruta_pdf: str) -> str:
+        """Guarda `ruta_pdf` como la generación más reciente de `huella` y aplica el límite."""
+        contenido = hash_archivo(ruta_pdf)
+        destino = self._ruta_pdf(contenido)
+        if not os.path.exists(destino):
+            temporal = f"{destino}.{os.getpid()}.tmp"
+            shutil.copyfile(ruta_pdf, temporal)
+            os.replace(temporal, destino)
+
+        generaciones = [g for g in self._leer_generaciones() if g["huella"] != huella]
+        generaciones.append({"huella": huella, "contenido": contenido, "bytes": os.path.getsize(destino),
+                             "fecha": time.strftime("%Y-%m-%dT%H:%M:%S")})
+        generaciones = generaciones[-self.max_generaciones:]
+        self._escribir_generaciones(generaciones)
+
+        # PDF sin generación que los use (desalojadas o sustituidas por otra de la misma huella)
+        en_uso = {f"{g['contenido']}.pdf" for g in generaciones}
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(".pdf") and nombre not in en_uso:
+                os.remove(os.path.join(self.directorio, nombre))
+        return contenido
@@ -0,0 +1,130 @@
+"""Tiempo de arranque de `main.py` en ejecuciones pequeñas.
+
+Uso:
+    python benchmarks/bench_arranque.py [num_productos] [repeticiones]
+
+Crea un catálogo sintético pequeño (por defecto 40 productos, del tamaño de un
+catálogo de una sola categoría) y ejecuta `main.py` en un proceso nuevo cada
+vez, como una tarea programada. Para cada escenario muestra la mediana de
+`repeticiones` ejecuciones, contadas desde que se lanza el proceso:
+
+* `primera_consulta`: primera sentencia SQL enviada a la base de datos;
+* `primera_pagina`: primera página terminada (`Canvas.showPage`);
+* `total`: fin del proceso.
+
+Escenarios: `importar` (sólo `import main`), `ayuda` (`--help`), `almacen`
+(`--sin-imagenes` con los datos sin cambios: el PDF se copia del almacén),
+`exportar` (`--exportar csv`), `completo` (`--forzar --sin-imagenes`) y `lista`
+(`--forzar --motor lista`).
+"""
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico, project_root
+
+# Se ejecuta en el proceso hijo: marca la primera consulta y la primera página
+# sin importar nada que `main` no importaría por sí mismo antes de tiempo.
+PROGRAMA_HIJO = r"""
+import atexit, importlib.abc, importlib.util, json, os, runpy, sys, time
+marcas = {}
+atexit.register(lambda: json.dump(marcas, open(os.environ["BENCH_MARCAS"], "w")))
+
+class VigiaCanvas(importlib.abc.MetaPathFinder):
+    def find_spec(self, nombre, path, target=None):
+        if nombre != "reportlab.pdfgen.canvas":
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(nombre)
+        ejecutar = spec.loader.exec_module
+        def exec_module(modulo):
+            ejecutar(modulo)
+            mostrar = modulo.Canvas.showPage
+            def showPage(canvas_obj):
+                marcas.setdefault("primera_pagina", time.time())
+                return mostrar(canvas_obj)
+            modulo.Canvas.showPage = showPage
+        spec.loader.exec_module = exec_module
+        return spec
+
+sys.meta_path.insert(0, VigiaCanvas())
+if sys.argv[1] == "--importar":
+    import main
+else:
+    # Se engancha al cargar database (que importa sqlalchemy) para no adelantar el import
+    class VigiaSQL(importlib.abc.MetaPathFinder):
+        def find_spec(self, nombre, path, target=None):
+            if nombre != "database":
+                return None
+            sys.meta_path.remove(self)
+            from sqlalchemy import event
+            from sqlalchemy.engine import Engine
+            event.listen(Engine, "before_cursor_execute",
+                         lambda *a: marcas.setdefault("primera_consulta", time.time()))
+            return None
+    sys.meta_path.insert(0, VigiaSQL())
+    sys.argv = sys.argv[1:]
+    try:
+        runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit:
+        pass
+"""
+
+ESCENARIOS = (
+    ("importar", ["--importar"]),
+    ("ayuda", ["--help"]),
+    ("almacen", ["--sin-imagenes"]),
+    ("exportar", ["--exportar", "csv"]),
+    ("completo", ["--forzar", "--sin-imagenes"]),
+    ("lista", ["--forzar", "--motor", "lista"]),
+)
+
+def ejecutar(directorio: str, argumentos: list, entorno: dict) -> dict:
+    """Lanza `main.py argumentos` y devuelve los tiempos de sus marcas desde el lanzamiento."""
+    ruta_marcas = os.path.join(directorio, "marcas.json")
+    entorno = dict(entorno, BENCH_MARCAS=ruta_marcas)
+    programa = [sys.executable, "-c", PROGRAMA_HIJO]
+    if argumentos[:1] != ["--importar"]:
+        programa.append(os.path.join(project_root, "main.py"))
+    inicio = time.time()
+    subprocess.run(programa + argumentos, cwd=directorio, env=entorno, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    fin = time.time()
+    with open(ruta_marcas) as f:
+        marcas = json.load(f)
+    marcas["total"] = fin
+    return {nombre: marca - inicio for nombre, marca in marcas.items()}
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    directorio = tempfile.mkdtemp(prefix="bench_arranque_")
+    try:
+        ruta_db = os.path.join(directorio, "catalogo.db")
+        engine, _ = crear_catalogo_sintetico(ruta_db, num_productos)
+        engine.dispose()
+        entorno = dict(os.environ, DATABASE_URL=f"sqlite:///{ruta_db}", PYTHONPATH=project_root,
+                       PYTHONDONTWRITEBYTECODE="")
+        # Deja el PDF en el almacén para el escenario `almacen` y los .pyc compilados
+        ejecutar(directorio, ["--sin-imagenes"], entorno)
+
+        print(f"{'escenario':<10} {'primera_consulta':>17} {'primera_pagina':>15} {'total':>9}")
+        for nombre, argumentos in ESCENARIOS:
+            medidas = [ejecutar(directorio, argumentos, entorno) for _ in range(repeticiones)]
+            columnas = []
+            for marca in ("primera_consulta", "primera_pagina", "total"):
+                valores = [m[marca] for m in medidas if marca in m]
+                columnas.append(f"{1000 * statistics.median(valores):.0f}ms" if valores else "-")
+            print(f"{nombre:<10} {columnas[0]:>17} {columnas[1]:>15} {columnas[2]:>9}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Búsqueda de texto completo (`crud.buscar_productos`) frente a ILIKE.
+
+Uso:
+    python benchmarks/bench_busqueda.py [num_productos] [limite]
+
+Crea un catálogo sintético en SQLite, cambia las descripciones por texto con un
+vocabulario más amplio (las palabras del catálogo sintético, frecuentes, y
+`VOCABULARIO` términos raros con frecuencia de Zipf, como modelos y
+características), construye el índice FTS5 (`busqueda`) y mide, para consultas
+de distinta selectividad, la mediana de 5 ejecuciones de:
+
+* `fts`: los `limite` resultados más relevantes;
+* `fts_todos`: todos los resultados, ordenados por relevancia;
+* `ilike`: todos los resultados con `nombre ILIKE '%palabra%' OR descripcion
+  ILIKE ...` para cada palabra, que recorre la tabla entera.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import PALABRAS, crear_catalogo_sintetico
+
+from sqlalchemy import and_, bindparam, or_, select, update
+
+import busqueda
+import crud
+import models
+
+VOCABULARIO = 20000
+CONSULTAS = ("solar", "inversor solar", "mppt", "inversor mppt -kit", "w00500", "w00500 bifacial",
+             '"panel solar" w00120', "w19999")
+
+def diversificar_descripciones(engine, num_productos: int, seed: int = 7, lote: int = 20000):
+    """Descripciones de 30 palabras: 12 del catálogo sintético y 18 de un vocabulario con frecuencia de Zipf."""
+    rnd = random.Random(seed)
+    raras = ["mppt", "bifacial", "monocristalino", "litio", "gel"] + [f"w{i:05d}" for i in range(VOCABULARIO)]
+    pesos = [1 / (i + 1) for i in range(len(raras))]
+    with engine.begin() as conn:
+        for inicio in range(1, num_productos + 1, lote):
+            filas = [{"pid": pid, "texto": " ".join(rnd.choices(PALABRAS, k=12) + rnd.choices(raras, pesos, k=18))}
+                     for pid in range(inicio, min(inicio + lote, num_productos + 1))]
+            conn.execute(update(models.Producto).where(models.Producto.id == bindparam("pid"))
+                         .values(descripcion=bindparam("texto")), filas)
+
+def mediana_ms(funcion, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return 1000 * statistics.median(tiempos), resultado
+
+def buscar_ilike(db, consulta):
+    condiciones = []
+    for excluido, termino in busqueda._terminos(consulta):
+        patron = f"%{termino}%"
+        coincide = or_(models.Producto.nombre.ilike(patron), models.Producto.descripcion.ilike(patron))
+        condiciones.append(~coincide if excluido else coincide)
+    filas = db.execute(select(*crud._COLUMNAS_LIGERAS).where(and_(*condiciones)).order_by(models.Producto.id))
+    return list(crud._proyectar(filas, crud.cargar_tablas_relacionadas(db)))
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    limite = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    ruta_db = os.path.join(tempfile.gettempdir(), "bench_busqueda.db")
+    print(f"Creando catálogo sintético de {num_productos} productos en {ruta_db}...")
+    engine, SessionLocal = crear_catalogo_sintetico(ruta_db, num_productos)
+    diversificar_descripciones(engine, num_productos)
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        busqueda.asegurar_indice_sqlite(conn)
+    print(f"Índice FTS5 construido en {time.perf_counter() - t0:.1f} s "
+          f"({os.path.getsize(ruta_db) / 2**20:.0f} MiB en total).")
+
+    db = SessionLocal()
+    try:
+        print(f"\n{'consulta':<30} {'coinciden':>10} {'fts':>10} {'fts_todos':>11} {'ilike':>10}")
+        for consulta in CONSULTAS:
+            t_fts, _ = mediana_ms(lambda: crud.buscar_productos(db, consulta, limite=limite))
+            t_todos, todos = mediana_ms(lambda: crud.buscar_productos(db, consulta), repeticiones=1)
+            t_ilike, _ = mediana_ms(lambda: buscar_ilike(db, consulta), repeticiones=1)
+            print(f"{consulta:<30} {len(todos):10} {t_fts:8.1f}ms {t_todos:9.1f}ms {t_ilike:8.1f}ms")
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(ruta_db)
+
+if __name__ == "__main__":
+    main()
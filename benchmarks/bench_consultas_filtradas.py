@@ -0,0 +1,120 @@
+"""Consultas filtradas y paginadas por clave (`crud.obtener_pagina_productos`) con y sin índices.
+
+Uso:
+    python benchmarks/bench_consultas_filtradas.py [num_productos] [tamano_pagina]
+
+Crea un catálogo sintético en SQLite (con los índices de `models`) y, para
+varios filtros, mide:
+
+* `clave`: recorrer todas las páginas con `crud.obtener_pagina_productos`;
+* `offset`: lo mismo con LIMIT/OFFSET, cuyo coste por página crece con la posición;
+* `ultima`: el tiempo de pedir sólo la última página con cada método;
+* `sin_indices`: la paginación por clave tras eliminar los índices de la migración
+  `b7d41c2e9f03`.
+
+Además muestra el plan (EXPLAIN QUERY PLAN) de la selección de cada página. En
+PostgreSQL el equivalente es `EXPLAIN (ANALYZE, BUFFERS)`, donde debe aparecer
+`Index Only Scan` (ver `alembic/versions/b7d41c2e9f03_indices_consultas_filtradas.py`).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from sqlalchemy import select, text
+
+import crud
+import models
+
+FILTROS = {
+    "categoria": (crud.FiltroProductos(categoria_id=3), "categoria"),
+    "cat+stock": (crud.FiltroProductos(categoria_id=3, con_stock=True), "categoria"),
+    "destacados": (crud.FiltroProductos(destacado=True), "categoria"),
+    "marca": (crud.FiltroProductos(marca_id=7), "id"),
+    "subcategoria": (crud.FiltroProductos(subcategoria_id=12), "id"),
+    "precio": (crud.FiltroProductos(precio_min=1000, precio_max=1100), "precio"),
+}
+
+def recorrer_por_clave(db, filtro, orden, tamano_pagina):
+    """Devuelve `(filas, clave de inicio de la última página)`."""
+    tablas = crud.cargar_tablas_relacionadas(db)
+    total, anterior, siguiente = 0, None, None
+    while True:
+        productos, nueva = crud.obtener_pagina_productos(db, filtro, orden, siguiente, tamano_pagina, tablas)
+        total += len(productos)
+        if nueva is None:
+            return total, siguiente if productos else anterior
+        anterior, siguiente = siguiente, nueva
+
+def pagina_por_offset(db, filtro, orden, tamano_pagina, desplazamiento, tablas):
+    consulta = crud._aplicar_filtro(select(*crud._COLUMNAS_LIGERAS), filtro).order_by(*crud.ORDENES_PAGINACION[orden])
+    filas = db.execute(consulta.limit(tamano_pagina).offset(desplazamiento)).all()
+    return list(crud._proyectar(filas, tablas))
+
+def recorrer_por_offset(db, filtro, orden, tamano_pagina):
+    tablas = crud.cargar_tablas_relacionadas(db)
+    total = 0
+    while True:
+        productos = pagina_por_offset(db, filtro, orden, tamano_pagina, total, tablas)
+        total += len(productos)
+        if len(productos) < tamano_pagina:
+            return total
+
+def plan(db, filtro, orden):
+    claves = crud.ORDENES_PAGINACION[orden]
+    consulta = (crud._aplicar_filtro(select(*claves), filtro)
+                .where(models.Producto.id > 0).order_by(*claves).limit(100))
+    sql = str(consulta.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    return "; ".join(fila[-1] for fila in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+def medir(funcion, *args):
+    t0 = time.perf_counter()
+    filas = funcion(*args)
+    return time.perf_counter() - t0, filas
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tamano_pagina = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    ruta_db = os.path.join(tempfile.gettempdir(), "bench_consultas_filtradas.db")
+    print(f"Creando catálogo sintético de {num_productos} productos en {ruta_db}...")
+    engine, SessionLocal = crear_catalogo_sintetico(ruta_db, num_productos)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    db = SessionLocal()
+    try:
+        resultados = {}
+        tablas = crud.cargar_tablas_relacionadas(db)
+        for nombre, (filtro, orden) in FILTROS.items():
+            t_clave, (filas, ultima) = medir(recorrer_por_clave, db, filtro, orden, tamano_pagina)
+            t_offset, filas_offset = medir(recorrer_por_offset, db, filtro, orden, tamano_pagina)
+            assert filas == filas_offset
+            # Última página: desde su clave de inicio o saltando las anteriores
+            t_ultima_clave, _ = medir(crud.obtener_pagina_productos, db, filtro, orden, ultima, tamano_pagina, tablas)
+            t_ultima_offset, _ = medir(pagina_por_offset, db, filtro, orden, tamano_pagina,
+                                       (filas - 1) // tamano_pagina * tamano_pagina, tablas)
+            resultados[nombre] = (filas, t_clave, t_offset, t_ultima_clave, t_ultima_offset)
+            print(f"  plan {nombre:<12} {plan(db, filtro, orden)}")
+
+        nuevos = [i for i in models.Producto.__table__.indexes if i.name not in
+                  ("ix_productos_codigo", "ix_productos_id", "ix_productos_nombre")]
+        for indice in nuevos:
+            indice.drop(engine)
+        print(f"\n{'filtro':<13} {'filas':>7} {'clave':>9} {'offset':>9} {'ultima clave':>13} {'ultima offset':>14} "
+              f"{'sin_indices':>12}")
+        for nombre, (filtro, orden) in FILTROS.items():
+            filas, t_clave, t_offset, t_ultima_clave, t_ultima_offset = resultados[nombre]
+            t_sin, _ = medir(recorrer_por_clave, db, filtro, orden, tamano_pagina)
+            print(f"{nombre:<13} {filas:7} {t_clave:8.3f}s {t_offset:8.3f}s {1000 * t_ultima_clave:10.1f} ms "
+                  f"{1000 * t_ultima_offset:11.1f} ms {t_sin:11.3f}s")
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(ruta_db)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Exportación a HTML, CSV y JSON Lines (`exportadores`) frente a generar el PDF.
+
+Uso:
+    python benchmarks/bench_exportadores.py [tamaños] [motor]
+
+Para cada tamaño de catálogo sintético (p. ej. `10000,100000`) mide el tiempo y
+el pico de memoria (`tracemalloc`) de:
+
+* cada formato por separado, con su propia lectura de los productos;
+* `todos`: los tres formatos con una sola lectura (`exportar_catalogo`, como
+  `python main.py --exportar html,csv,jsonl`);
+* `pdf`: el PDF en streaming sin imágenes (`pdf_utils.generar_catalogo_pdf_perezoso`)
+  con el motor indicado (`rapido` por defecto).
+
+Todas las variantes leen los productos con `crud.iterar_productos_ligeros`, así
+que el pico de memoria de las exportaciones no debería crecer con el catálogo.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+import crud
+import exportadores
+import pdf_utils
+
+def medir(funcion):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 2**20
+
+def main():
+    tamanos = [int(t) for t in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000]
+    motor = sys.argv[2] if len(sys.argv) > 2 else pdf_utils.MOTOR_RAPIDO
+
+    directorio = tempfile.mkdtemp(prefix="bench_exportadores_")
+    try:
+        print(f"{'productos':>10} {'variante':<8} {'tiempo':>9} {'pico':>10} {'tamaño':>10}")
+        for num_productos in tamanos:
+            engine, SessionLocal = crear_catalogo_sintetico(os.path.join(directorio, "catalogo.db"), num_productos)
+            db = SessionLocal()
+            try:
+                variantes = [(formato, [formato]) for formato in exportadores.FORMATOS]
+                variantes.append(("todos", list(exportadores.FORMATOS)))
+                for nombre, formatos in variantes:
+                    rutas = exportadores.rutas_exportacion(directorio, "catalogo", formatos)
+                    segundos, pico = medir(lambda: exportadores.exportar_catalogo(crud.iterar_productos_ligeros(db),
+                                                                                   rutas))
+                    tamano = sum(os.path.getsize(ruta) for ruta in rutas.values())
+                    print(f"{num_productos:10} {nombre:<8} {segundos:8.2f}s {pico:7.1f}MiB {tamano / 2**20:7.1f}MiB")
+                ruta_pdf = os.path.join(directorio, "catalogo.pdf")
+                segundos, pico = medir(lambda: pdf_utils.generar_catalogo_pdf_perezoso(
+                    ruta_pdf, lambda: crud.iterar_productos_ligeros(db), None, motor))
+                print(f"{num_productos:10} {'pdf':<8} {segundos:8.2f}s {pico:7.1f}MiB "
+                      f"{os.path.getsize(ruta_pdf) / 2**20:7.1f}MiB")
+            finally:
+                db.close()
+                engine.dispose()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Mide el coste de las imágenes de producto con un servidor HTTP local de prueba.
+
+Uso:
+    python benchmarks/bench_imagenes.py [num_productos] [latencia_ms]
+
+El servidor sirve imágenes JPEG grandes con una latencia artificial; un 5% de las
+URLs devuelve 404 y otro 2% tarda más que `IMG_TIMEOUT`. Se genera el catálogo sin
+imágenes, con la caché de miniaturas vacía y con la caché ya caliente.
+"""
+
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from PIL import Image as PILImage
+from sqlalchemy import update
+
+import crud
+import imagenes
+import models
+import pdf_utils
+
+def crear_servidor(latencia: float, timeout: float):
+    """Servidor de imágenes: /img/<n>.jpg, /faltante/<n>.jpg (404) y /lenta/<n>.jpg."""
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (1600, 1200), (200, 80, 40)).save(buffer, "JPEG", quality=90)
+    base = buffer.getvalue()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/lenta/"):
+                time.sleep(timeout * 2)
+            else:
+                time.sleep(latencia)
+            if self.path.startswith("/faltante/"):
+                self.send_error(404)
+                return
+            # Cada imagen es distinta para que no se deduplique por contenido
+            datos = base + self.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            with contextlib.suppress(BrokenPipeError, ConnectionResetError):
+                self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latencia = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    timeout = 1.0
+    directorio = tempfile.mkdtemp(prefix="bench_imagenes_")
+    ruta_db = os.path.join(directorio, "catalogo.db")
+    engine, SessionLocal = crear_catalogo_sintetico(ruta_db, num_productos)
+
+    servidor = crear_servidor(latencia, timeout)
+    url_base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    rnd = random.Random(1)
+    with engine.begin() as conn:
+        for pid in range(1, num_productos + 1):
+            r = rnd.random()
+            ruta = "faltante" if r < 0.05 else "lenta" if r < 0.07 else "img"
+            conn.execute(update(models.Producto).where(models.Producto.id == pid)
+                         .values(imagen_url=f"{url_base}/{ruta}/{pid}.jpg"))
+
+    db = SessionLocal()
+    productos = crud.obtener_productos_con_relaciones(db)
+    cache = os.path.join(directorio, "miniaturas")
+
+    def generar(nombre, cargador):
+        t0 = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            pdf_utils.generar_catalogo_pdf_completo(os.path.join(directorio, f"{nombre}.pdf"), productos, cargador)
+        duracion = time.perf_counter() - t0
+        informe = ""
+        if cargador:
+            cargador.cerrar()
+            informe = cargador.informe()
+        print(f"{nombre:<14} {duracion:8.2f} s  {informe}")
+
+    print(f"{num_productos} productos, latencia {latencia * 1000:.0f} ms por imagen")
+    generar("sin imágenes", None)
+    generar("caché fría", imagenes.CargadorImagenes(cache, timeout=timeout))
+    generar("caché caliente", imagenes.CargadorImagenes(cache, timeout=timeout))
+
+    db.close()
+    servidor.shutdown()
+    shutil.rmtree(directorio)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compara el índice de una sola `Table` (versión anterior) con `indice_catalogo`.
+
+Uso:
+    python benchmarks/bench_indice.py [tamaños,...] [columnas]
+
+Ejemplo: `python benchmarks/bench_indice.py 1000,2000,4000,8000 2`. Se renderiza
+sólo el índice, con las filas de `crud.obtener_resumen_productos`; el coste por
+entrada del índice por tabla crece con el número de filas, el del nuevo no.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from reportlab.platypus import Paragraph, PageBreak, Spacer, Table, TableStyle
+from reportlab.lib.units import inch
+
+import crud
+import pdf_utils
+
+def story_indice_tabla(filas, doc):
+    """El índice tal como lo construía antes `generar_catalogo_pdf_completo`."""
+    datos = []
+    for fila in filas:
+        texto = f'{fila.nombre} - <font color="blue">{fila.codigo}</font>'
+        datos.append([Paragraph(f'<a href="#prod_{fila.codigo}">{texto}</a>', pdf_utils.STYLE_INDEX_ENTRY)])
+    tabla = Table(datos, colWidths=[doc.width])
+    tabla.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ]))
+    return [Paragraph("Índice del Catálogo", pdf_utils.STYLE_HEADING1), Spacer(1, 0.2*inch), tabla, PageBreak()]
+
+def construir(ruta, story):
+    # Los enlaces apuntan a fichas que no están en este PDF: se registran sin crearlos
+    doc = pdf_utils._crear_doc_template(ruta)
+    t0 = time.perf_counter()
+    doc.build(story(doc), onFirstPage=pdf_utils._decorar_pagina, onLaterPages=pdf_utils._decorar_pagina,
+              canvasmaker=pdf_utils.CanvasEnlacesDiferidos)
+    return time.perf_counter() - t0, doc.page
+
+def main():
+    tamanos = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 2000, 4000]
+    columnas = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    directorio = tempfile.gettempdir()
+    _, SessionLocal = crear_catalogo_sintetico(os.path.join(directorio, "bench_indice.db"), max(tamanos))
+    db = SessionLocal()
+    try:
+        resumen = crud.obtener_resumen_productos(db)
+    finally:
+        db.close()
+
+    print(f"{'entradas':>9} {'tabla (s)':>10} {'µs/entrada':>11} {'nuevo (s)':>10} {'µs/entrada':>11} {'páginas':>8}")
+    for n in tamanos:
+        filas = resumen[:n]
+        t_tabla, _ = construir(os.path.join(directorio, "bench_indice_tabla.pdf"),
+                               lambda doc: story_indice_tabla(filas, doc))
+        t_nuevo, paginas = construir(os.path.join(directorio, "bench_indice_nuevo.pdf"),
+                                     lambda doc: list(pdf_utils._iterar_story_indice(filas, columnas)))
+        print(f"{n:>9} {t_tabla:>10.2f} {t_tabla / n * 1e6:>11.0f} {t_nuevo:>10.2f} {t_nuevo / n * 1e6:>11.0f} "
+              f"{paginas:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Lista de precios compacta (`--motor lista`) frente a las fichas del motor rápido.
+
+Uso:
+    python benchmarks/bench_lista_precios.py [tamaños] [motores]
+
+Para cada tamaño de catálogo sintético (p. ej. `10000,100000`) genera el PDF en
+streaming (`pdf_utils.generar_catalogo_pdf_perezoso`, sin imágenes) con cada
+motor (`lista,rapido` por defecto) y muestra tiempo, páginas, productos por
+página, tamaño y tiempo por cada 1000 productos, que en un motor de coste lineal
+no debería crecer con el tamaño. La lista lee los productos ordenados por
+categoría (`crud.iterar_productos_filtrados(db, orden="categoria")`), como `main.py`.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+import pypdf
+
+import crud
+import pdf_utils
+
+def main():
+    tamanos = [int(t) for t in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000]
+    motores = sys.argv[2].split(",") if len(sys.argv) > 2 else [pdf_utils.MOTOR_LISTA, pdf_utils.MOTOR_RAPIDO]
+
+    directorio = tempfile.mkdtemp(prefix="bench_lista_precios_")
+    try:
+        print(f"{'productos':>10} {'motor':<9} {'tiempo':>9} {'páginas':>8} {'prod/pág':>9} {'tamaño':>10} {'s/1000':>7}")
+        for num_productos in tamanos:
+            engine, SessionLocal = crear_catalogo_sintetico(os.path.join(directorio, "catalogo.db"), num_productos)
+            db = SessionLocal()
+            try:
+                for motor in motores:
+                    if motor == pdf_utils.MOTOR_LISTA:
+                        obtener_productos = lambda: crud.iterar_productos_filtrados(db, orden="categoria")
+                    else:
+                        obtener_productos = lambda: crud.iterar_productos_ligeros(db)
+                    ruta = os.path.join(directorio, f"catalogo_{motor}.pdf")
+                    t0 = time.perf_counter()
+                    pdf_utils.generar_catalogo_pdf_perezoso(ruta, obtener_productos, None, motor)
+                    segundos = time.perf_counter() - t0
+                    paginas = len(pypdf.PdfReader(ruta).pages)
+                    print(f"{num_productos:10} {motor:<9} {segundos:8.1f}s {paginas:8} {num_productos / paginas:9.1f} "
+                          f"{os.path.getsize(ruta) / 2**20:7.1f}MiB {1000 * segundos / num_productos:7.3f}")
+            finally:
+                db.close()
+                engine.dispose()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
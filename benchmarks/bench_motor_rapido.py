@@ -0,0 +1,54 @@
+"""Compara el motor de fichas de platypus con el motor rápido de `render_rapido`.
+
+Uso:
+    python benchmarks/bench_motor_rapido.py [num_productos] [repeticiones]
+
+Se mide sólo la sección de fichas (sin índice ni base de datos en el tiempo):
+los productos se cargan una vez y se construye el PDF con cada motor.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+
+import crud
+import pdf_utils
+
+def construir(ruta, productos, motor):
+    doc = pdf_utils._crear_doc_template(ruta)
+    flowables = pdf_utils._iterar_story_productos((p for p in productos), doc, motor=motor)
+    t0 = time.perf_counter()
+    doc.build(pdf_utils.StoryPerezosa(flowables), onFirstPage=pdf_utils._decorar_pagina,
+              onLaterPages=pdf_utils._decorar_pagina)
+    return time.perf_counter() - t0, doc.page
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    directorio = tempfile.gettempdir()
+    _, SessionLocal = crear_catalogo_sintetico(os.path.join(directorio, "bench_motor_rapido.db"), num_productos)
+    db = SessionLocal()
+    try:
+        productos = crud.obtener_productos_con_relaciones(db)
+    finally:
+        db.close()
+
+    resultados = {}
+    for motor in pdf_utils.MOTORES:
+        tiempos = []
+        for _ in range(repeticiones):
+            duracion, paginas = construir(os.path.join(directorio, f"bench_{motor}.pdf"), productos, motor)
+            tiempos.append(duracion)
+        resultados[motor] = (min(tiempos), paginas)
+
+    base = resultados[pdf_utils.MOTOR_PLATYPUS][0]
+    for motor, (duracion, paginas) in resultados.items():
+        print(f"{motor:<9} {duracion:8.2f} s  {num_productos / duracion:9.0f} productos/s  "
+              f"{paginas} páginas  aceleración x{base / duracion:.1f}")
+
+if __name__ == "__main__":
+    main()
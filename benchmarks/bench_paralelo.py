@@ -0,0 +1,54 @@
+"""Mide el renderizado paralelo por tramos frente al renderizado en un solo proceso.
+
+Uso:
+    python benchmarks/bench_paralelo.py [num_productos] [procesos,...]
+
+Ejemplo: `python benchmarks/bench_paralelo.py 20000 1,2,4,8,16`. Con 1 proceso se
+usa `generar_catalogo_pdf_completo`; con más, `pdf_paralelo`. La escala sólo es
+representativa en una máquina con al menos tantos núcleos como procesos.
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+import crud
+import pdf_paralelo
+import pdf_utils
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    lista_procesos = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 2, 4, os.cpu_count() or 1]
+    directorio = tempfile.gettempdir()
+    ruta_db = os.environ["DATABASE_URL"].replace("sqlite:///", "", 1)
+    print(f"Creando catálogo sintético de {num_productos} productos en {ruta_db}...")
+    _, SessionLocal = crear_catalogo_sintetico(ruta_db, num_productos)
+
+    # Los procesos hijos leen de la base a través de database.SessionLectura (sin réplica, DATABASE_URL)
+    productos_por_tramo = max(4, num_productos // (4 * max(lista_procesos)))
+    base = None
+    for procesos in lista_procesos:
+        salida = os.path.join(directorio, f"bench_paralelo_{procesos}.pdf")
+        t0 = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            if procesos == 1:
+                db = SessionLocal()
+                try:
+                    productos = crud.obtener_productos_con_relaciones(db)
+                finally:
+                    db.close()
+                pdf_utils.generar_catalogo_pdf_completo(salida, productos)
+            else:
+                pdf_paralelo.generar_catalogo_pdf_paralelo(salida, num_procesos=procesos,
+                                                           productos_por_tramo=productos_por_tramo)
+        duracion = time.perf_counter() - t0
+        base = base or duracion
+        print(f"{procesos:>3} procesos  {duracion:8.2f} s  aceleración x{base / duracion:5.2f}  "
+              f"({os.path.getsize(salida) / 2**20:.1f} MiB)")
+
+if __name__ == "__main__":
+    main()
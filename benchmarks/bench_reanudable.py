@@ -0,0 +1,97 @@
+"""Generación reanudable (`main.py --reanudable` / `--reanudar`) frente a empezar de nuevo.
+
+Uso:
+    python benchmarks/bench_reanudable.py [num_productos] [productos_por_tramo] [motor]
+
+Sobre un catálogo sintético sin imágenes se mide:
+
+* `un documento`: `pdf_utils.generar_catalogo_pdf_completo`, sin puntos de control;
+* `reanudable`: `generacion_reanudable.generar_catalogo_pdf_reanudable` sin interrupciones
+  (el coste de guardar cada tramo y el manifiesto y de unirlos al final);
+* `interrumpida` y `reanudar`: la misma generación, que falla al 90% de los tramos,
+  y su continuación con `reanudar=True`, que sólo renderiza el 10% restante y une.
+
+También comprueba que el PDF reanudado tiene el mismo texto en cada página que el
+generado sin interrupciones.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+RUTA_DB = os.path.join(tempfile.gettempdir(), "bench_reanudable.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{RUTA_DB}" # Antes de importar los módulos del proyecto
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from pypdf import PdfReader
+
+import crud
+import database
+import generacion_reanudable
+import pdf_paralelo
+import pdf_utils
+
+def textos(ruta: str) -> list:
+    return [pagina.extract_text() for pagina in PdfReader(ruta).pages]
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    por_tramo = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    motor = sys.argv[3] if len(sys.argv) > 3 else pdf_utils.MOTOR_RAPIDO
+
+    engine, SessionLocal = crear_catalogo_sintetico(RUTA_DB, num_productos)
+    directorio = tempfile.mkdtemp(prefix="bench_reanudable_")
+    puntos_control = os.path.join(directorio, "puntos_control")
+    generar = lambda ruta, reanudar=False: generacion_reanudable.generar_catalogo_pdf_reanudable(
+        ruta, puntos_control, reanudar, productos_por_tramo=por_tramo, motor=motor)
+    try:
+        db = SessionLocal()
+        try:
+            productos = crud.obtener_productos_ligeros(db)
+        finally:
+            db.close()
+        t0 = time.perf_counter()
+        pdf_utils.generar_catalogo_pdf_completo(os.path.join(directorio, "completo.pdf"), productos, None, motor)
+        t_completo = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        generar(os.path.join(directorio, "reanudable.pdf"))
+        t_reanudable = time.perf_counter() - t0
+
+        num_tramos = -(-num_productos // por_tramo)
+        renderizar_tramo, hechos = pdf_paralelo._renderizar_tramo, []
+        def tramo_que_falla(*argumentos):
+            if len(hechos) >= num_tramos * 9 // 10:
+                raise RuntimeError("interrupción simulada")
+            hechos.append(None)
+            return renderizar_tramo(*argumentos)
+        pdf_paralelo._renderizar_tramo = tramo_que_falla
+        t0 = time.perf_counter()
+        try:
+            generar(os.path.join(directorio, "reanudada.pdf"))
+        except RuntimeError:
+            pass
+        t_interrumpida = time.perf_counter() - t0
+        pdf_paralelo._renderizar_tramo = renderizar_tramo
+        t0 = time.perf_counter()
+        generar(os.path.join(directorio, "reanudada.pdf"), reanudar=True)
+        t_reanudar = time.perf_counter() - t0
+
+        print(f"{num_productos} productos en {num_tramos} tramos de {por_tramo} (motor {motor})")
+        print(f"{'un documento':<14} {t_completo:8.2f}s")
+        print(f"{'reanudable':<14} {t_reanudable:8.2f}s")
+        print(f"{'interrumpida':<14} {t_interrumpida:8.2f}s  ({len(hechos)} tramos hechos)")
+        print(f"{'reanudar':<14} {t_reanudar:8.2f}s  (empezar de nuevo: {t_reanudable:.2f}s)")
+        iguales = textos(os.path.join(directorio, "reanudable.pdf")) == textos(os.path.join(directorio, "reanudada.pdf"))
+        print(f"Mismo texto en cada página: {iguales}")
+    finally:
+        engine.dispose()
+        database.engine.dispose()
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.remove(RUTA_DB)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Lecturas del catálogo en una réplica (`DATABASE_URL_LECTURA`) mientras se escribe en el primario.
+
+Uso:
+    python benchmarks/bench_replica.py [num_productos] [escrituras_por_segundo] [lecturas]
+
+Crea un catálogo sintético en SQLite y lo copia en un segundo archivo que hace de
+réplica. Mientras un hilo actualiza precios en el primario (transacciones cortas,
+hasta `escrituras_por_segundo`), se leen `lecturas` veces los productos de la
+generación (`crud.obtener_productos_ligeros`):
+
+* `primario`: con `database.SessionLocal`, compitiendo con las escrituras por la misma base;
+* `replica`: con `database.SessionLectura`, que va a la réplica por su propio pool.
+
+De cada una se mide el tiempo de las lecturas y, sobre todo, lo que sufren las
+escrituras de la aplicación: cuántas se hicieron y cuánto tardó la más lenta.
+
+Después muestra las métricas de los dos pools (`database.metricas_pools`) y que
+una lectura con `timeout_ms` se interrumpe con `OperationalError` en vez de
+ocupar la conexión. En SQLite la contención es el bloqueo del archivo; en
+PostgreSQL, las lecturas largas compiten con el tráfico de la aplicación por
+CPU, E/S y conexiones del primario.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+RUTA_DB = os.path.join(tempfile.gettempdir(), "bench_replica_primario.db")
+RUTA_REPLICA = os.path.join(tempfile.gettempdir(), "bench_replica_lectura.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{RUTA_DB}" # Antes de importar los módulos del proyecto
+os.environ["DATABASE_URL_LECTURA"] = f"sqlite:///{RUTA_REPLICA}"
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import crud
+import database
+
+def escribir(parar: threading.Event, por_segundo: float, hechas: list):
+    """Actualiza precios en el primario hasta `parar`, anotando en `hechas` lo que tarda cada escritura."""
+    db = database.SessionLocal()
+    try:
+        while not parar.is_set():
+            t0 = time.perf_counter()
+            db.execute(text("UPDATE productos SET precio = precio + 0.01 WHERE id % 97 = :resto"),
+                       {"resto": len(hechas) % 97})
+            db.commit()
+            hechas.append(time.perf_counter() - t0)
+            time.sleep(1 / por_segundo)
+    finally:
+        db.close()
+
+def leer(fabrica, lecturas: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(lecturas):
+        db = fabrica()
+        try:
+            crud.obtener_productos_ligeros(db)
+        finally:
+            db.close()
+    return time.perf_counter() - t0
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    por_segundo = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    lecturas = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    engine, _ = crear_catalogo_sintetico(RUTA_DB, num_productos)
+    engine.dispose()
+    shutil.copyfile(RUTA_DB, RUTA_REPLICA)
+    try:
+        tiempos = {}
+        print(f"{num_productos} productos, {lecturas} lecturas, hasta {por_segundo:g} escrituras/s en el primario")
+        for nombre, fabrica in (("primario", database.SessionLocal), ("replica", database.SessionLectura)):
+            parar, hechas = threading.Event(), []
+            escritor = threading.Thread(target=escribir, args=(parar, por_segundo, hechas))
+            escritor.start()
+            try:
+                tiempos[nombre] = leer(fabrica, lecturas)
+            finally:
+                parar.set()
+                escritor.join()
+            print(f"{nombre:<10} lecturas {tiempos[nombre]:6.2f}s  escrituras {len(hechas) / tiempos[nombre]:6.1f}/s, "
+                  f"la más lenta {max(hechas, default=0) * 1000:7.1f}ms")
+
+        db = database.SessionLectura(timeout_ms=20)
+        t0 = time.perf_counter()
+        try:
+            db.execute(text("SELECT count(*) FROM productos a, productos b WHERE a.precio < b.precio")).scalar()
+            print("La lectura con timeout_ms=20 terminó sin interrumpirse")
+        except OperationalError as e:
+            print(f"Lectura con timeout_ms=20 interrumpida a los {time.perf_counter() - t0:.3f}s: {e.orig}")
+        finally:
+            db.close()
+
+        for nombre, metricas in database.metricas_pools().items():
+            print(f"{nombre:<10} {metricas}")
+        print(database.informe_pools())
+    finally:
+        database.obtener_engine().dispose()
+        database.obtener_engine_lectura().dispose()
+        os.remove(RUTA_DB)
+        os.remove(RUTA_REPLICA)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Prueba de carga local del servicio de catálogos (`servicio_catalogo.py`).
+
+Uso:
+    python benchmarks/bench_servicio.py [num_productos] [clientes] [peticiones_por_cliente]
+
+Crea un catálogo sintético en SQLite (sustituto de PostgreSQL), arranca el
+servicio en un puerto libre dentro del mismo proceso y lo somete a tres fases:
+
+* `simultaneas`: todos los clientes piden a la vez el mismo catálogo sin caché;
+  debería generarse una sola vez y el resto de peticiones esperar a ese resultado;
+* `mixtas`: cada cliente pide catálogos por categoría al azar, reenviando el
+  `ETag` recibido en `If-None-Match` (respuestas 200 desde caché o 304);
+* `tras_cambio`: se modifica un producto y se repiten las peticiones, que deben
+  generar de nuevo los catálogos (cambia la huella de los datos).
+
+Para cada fase se muestran las respuestas por código y origen, la latencia
+(mediana y p95) y las peticiones por segundo.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from urllib.parse import quote
+
+RUTA_DB = os.path.join(tempfile.gettempdir(), "bench_servicio.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{RUTA_DB}" # Antes de importar los módulos del proyecto
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from sqlalchemy import func, update
+
+import database
+import models
+import servicio_catalogo
+
+def pedir(url: str, etag: str = None):
+    """Devuelve `(código, origen, etag, segundos)` de un GET a `url`."""
+    peticion = urllib.request.Request(url, headers={"If-None-Match": etag} if etag else {})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(peticion) as respuesta:
+            respuesta.read()
+            return (respuesta.status, respuesta.headers.get("X-Catalogo-Origen"), respuesta.headers.get("ETag"),
+                    time.perf_counter() - inicio)
+    except urllib.error.HTTPError as e:
+        return e.code, None, e.headers.get("ETag"), time.perf_counter() - inicio
+
+def fase(nombre: str, clientes: int, trabajo):
+    """Ejecuta `trabajo(n_cliente, resultados)` en `clientes` hilos a la vez e imprime el resumen."""
+    resultados = []
+    barrera = threading.Barrier(clientes)
+
+    def cliente(n):
+        barrera.wait()
+        trabajo(n, resultados)
+
+    hilos = [threading.Thread(target=cliente, args=(n,)) for n in range(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(r[3] for r in resultados)
+    respuestas = Counter(f"{r[0]}{'/' + r[1] if r[1] else ''}" for r in resultados)
+    print(f"{nombre:<12} {len(resultados):5} peticiones en {duracion:6.2f} s ({len(resultados) / duracion:7.1f}/s)  "
+          f"mediana {1000 * latencias[len(latencias) // 2]:8.1f} ms  "
+          f"p95 {1000 * latencias[int(len(latencias) * 0.95)]:8.1f} ms  {dict(sorted(respuestas.items()))}")
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    peticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    print(f"Creando catálogo sintético de {num_productos} productos en {RUTA_DB}...")
+    crear_catalogo_sintetico(RUTA_DB, num_productos)
+    db = database.SessionLocal()
+    try:
+        categorias = [nombre for (nombre,) in db.query(models.Categoria.nombre).order_by(models.Categoria.id)]
+    finally:
+        db.close()
+
+    servicio = servicio_catalogo.ServicioCatalogos(con_imagenes=False)
+    servicio.calentar()
+    servidor = servicio_catalogo.crear_servidor(servicio, "127.0.0.1", 0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}/catalogo.pdf"
+    urls = [f"{base}?categoria={quote(c)}" for c in categorias]
+
+    try:
+        fase("simultaneas", clientes, lambda n, resultados: resultados.append(pedir(base)))
+
+        def mixtas(n, resultados):
+            rnd = random.Random(n)
+            etags = {}
+            for _ in range(peticiones):
+                url = rnd.choice(urls)
+                resultado = pedir(url, etags.get(url))
+                etags[url] = resultado[2] or etags.get(url)
+                resultados.append(resultado)
+
+        fase("mixtas", clientes, mixtas)
+
+        db = database.SessionLocal()
+        try:
+            db.execute(update(models.Producto).where(models.Producto.id == 1)
+                       .values(precio=models.Producto.precio + 1, fecha_actualizado=func.now()))
+            db.commit()
+        finally:
+            db.close()
+        fase("tras_cambio", clientes, mixtas)
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    estado = servicio.estado()
+    print(f"Generados {estado['generados']} catálogos en {estado['segundos_generando']:.2f} s; "
+          f"{estado['agrupadas']} peticiones agrupadas, {estado['aciertos']} aciertos de caché, "
+          f"{estado['no_modificado']} respuestas 304.")
+
+if __name__ == "__main__":
+    main()
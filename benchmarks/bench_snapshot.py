@@ -0,0 +1,72 @@
+"""Lectura de la generación desde `catalogo_snapshot` frente a las tablas normalizadas.
+
+Uso:
+    python benchmarks/bench_snapshot.py [num_productos] [porcentaje_cambios]
+
+Sobre un catálogo sintético en SQLite se mide:
+
+* `tablas`: `crud.obtener_productos_ligeros` (productos más marcas, categorías y subcategorías);
+* `snapshot`: `crud.obtener_productos_snapshot`, una sola consulta sin joins;
+* `refresco inicial`: el primer `crud.refrescar_catalogo_snapshot`, que llena la tabla;
+* `refresco sin cambios` y `refresco con cambios`: los siguientes, sin cambios y tras
+  modificar `porcentaje_cambios`% de los productos y renombrar una marca.
+
+También comprueba que ambas lecturas devuelven los mismos registros y muestra el
+plan de la lectura de la copia. En PostgreSQL el refresco es un `REFRESH
+MATERIALIZED VIEW CONCURRENTLY` que recalcula la unión entera; lo que se evita es
+repetirla en cada generación sobre las tablas que usa la aplicación.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from sqlalchemy import text
+
+import catalogo_snapshot
+import crud
+
+def cronometrar(funcion):
+    t0 = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - t0, resultado
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    porcentaje = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    ruta_db = os.path.join(tempfile.gettempdir(), "bench_snapshot.db")
+    engine, SessionLocal = crear_catalogo_sintetico(ruta_db, num_productos)
+    db = SessionLocal()
+    try:
+        t_inicial, _ = cronometrar(lambda: crud.refrescar_catalogo_snapshot(db))
+        t_sin_cambios, _ = cronometrar(lambda: crud.refrescar_catalogo_snapshot(db))
+        paso = max(1, round(100 / porcentaje))
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE productos SET precio = precio + 1, fecha_actualizado = CURRENT_TIMESTAMP "
+                              "WHERE id % :paso = 0"), {"paso": paso})
+            conn.execute(text("UPDATE marcas SET nombre = nombre || ' (nueva)' WHERE id = 1"))
+        t_cambios, _ = cronometrar(lambda: crud.refrescar_catalogo_snapshot(db))
+
+        t_tablas, de_tablas = cronometrar(lambda: crud.obtener_productos_ligeros(db))
+        t_snapshot, de_snapshot = cronometrar(lambda: crud.obtener_productos_snapshot(db))
+        plan = db.execute(text("EXPLAIN QUERY PLAN " + str(crud._consulta_snapshot("id").compile(engine)))).all()
+
+        print(f"{num_productos} productos; {porcentaje}% modificados ({num_productos // paso} filas)")
+        print(f"{'lectura tablas':<24} {t_tablas:8.2f}s")
+        print(f"{'lectura snapshot':<24} {t_snapshot:8.2f}s  ({t_tablas / t_snapshot:.1f}x)")
+        print(f"{'refresco inicial':<24} {t_inicial:8.2f}s")
+        print(f"{'refresco sin cambios':<24} {t_sin_cambios:8.2f}s")
+        print(f"{'refresco con cambios':<24} {t_cambios:8.2f}s")
+        print(f"Mismos registros: {de_tablas == de_snapshot}")
+        print(f"Plan de {catalogo_snapshot.SNAPSHOT.name}: {'; '.join(fila[-1] for fila in plan)}")
+    finally:
+        db.close()
+        engine.dispose()
+        os.remove(ruta_db)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compara el pico de memoria de `generar_catalogo_pdf_completo` y del modo perezoso.
+
+Uso:
+    python benchmarks/bench_story_perezosa.py [num_productos]
+
+El modo completo recibe la lista de productos ya cargada; el perezoso los lee en
+streaming desde la base sintética mientras `doc.build` avanza.
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+import crud
+import pdf_utils
+
+def medir(nombre, funcion):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        funcion()
+    duracion = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<10} {duracion:8.2f} s  pico {pico / 2**20:8.1f} MiB")
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    directorio = tempfile.gettempdir()
+    ruta_db = os.path.join(directorio, "bench_story_perezosa.db")
+    print(f"Creando catálogo sintético de {num_productos} productos en {ruta_db}...")
+    _, SessionLocal = crear_catalogo_sintetico(ruta_db, num_productos)
+
+    def completo():
+        db = SessionLocal()
+        try:
+            productos = crud.obtener_productos_con_relaciones(db)
+        finally:
+            db.close()
+        pdf_utils.generar_catalogo_pdf_completo(os.path.join(directorio, "bench_completo.pdf"), productos)
+
+    def perezoso():
+        db = SessionLocal()
+        try:
+            pdf_utils.generar_catalogo_pdf_perezoso(os.path.join(directorio, "bench_perezoso.pdf"),
+                                                    lambda: crud.iterar_productos_con_relaciones(db))
+        finally:
+            db.close()
+
+    medir("completo", completo)
+    medir("perezoso", perezoso)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compara `obtener_productos_con_relaciones` (.all()) con la variante en streaming
+y con los registros ligeros (`obtener_productos_ligeros` / `iterar_productos_ligeros`).
+
+Uso:
+    python benchmarks/bench_streaming_fetch.py [num_productos] [chunk_size]
+
+Mide tiempo y pico de memoria (tracemalloc) al recorrer todo el catálogo sobre
+una tabla sintética en SQLite, que hace de sustituto de PostgreSQL.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+import crud
+
+def recorrer(productos) -> int:
+    """Consume los productos tocando una relación, como haría el renderizador."""
+    total = 0
+    for producto in productos:
+        _ = producto.marca
+        total += 1
+    return total
+
+def medir(nombre, funcion):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    total = funcion()
+    duracion = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<12} {total:>9} productos  {duracion:8.2f} s  pico {pico / 2**20:8.1f} MiB")
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    ruta_db = os.path.join(tempfile.gettempdir(), "bench_streaming_fetch.db")
+    print(f"Creando catálogo sintético de {num_productos} productos en {ruta_db}...")
+    _, SessionLocal = crear_catalogo_sintetico(ruta_db, num_productos)
+
+    def con_all():
+        db = SessionLocal()
+        try:
+            productos = crud.obtener_productos_con_relaciones(db)
+            return recorrer(productos)
+        finally:
+            db.close()
+
+    def con_streaming():
+        db = SessionLocal()
+        try:
+            return recorrer(crud.iterar_productos_con_relaciones(db, chunk_size))
+        finally:
+            db.close()
+
+    def ligeros():
+        db = SessionLocal()
+        try:
+            return recorrer(crud.obtener_productos_ligeros(db))
+        finally:
+            db.close()
+
+    def ligeros_streaming():
+        db = SessionLocal()
+        try:
+            return recorrer(crud.iterar_productos_ligeros(db, chunk_size))
+        finally:
+            db.close()
+
+    medir(".all()", con_all)
+    medir("streaming", con_streaming)
+    medir("ligeros", ligeros)
+    medir("ligeros str", ligeros_streaming)
+
+if __name__ == "__main__":
+    main()
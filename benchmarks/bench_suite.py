@@ -0,0 +1,212 @@
+"""Suite de benchmarks del pipeline del catálogo, por etapas y por tamaño.
+
+Uso:
+    python benchmarks/bench_suite.py [--tamanos 1000,10000] [--motor platypus|rapido]
+                                     [--salida resultados.json] [--base linea_base.json]
+                                     [--guardar-base] [--tolerancia 0.2] [--tracemalloc]
+
+Para cada tamaño se crea (o se reutiliza, si ya tiene ese número de productos)
+un catálogo sintético en SQLite y, en un proceso hijo, se mide por separado:
+
+* `consulta`: `crud.obtener_productos_ligeros`;
+* `story`: construcción del story en `pdf_utils` (índice y fichas);
+* `build`: `doc.build` sobre un búfer en memoria;
+* `escritura`: volcado del PDF a disco.
+
+De cada etapa se guarda la duración y el pico de memoria residente del proceso
+hasta ese momento (con `--tracemalloc`, además, el pico de memoria de Python de
+la etapa, a costa de ralentizarla). Los resultados se escriben en JSON. Con
+`--base` se comparan con una ejecución anterior guardada con `--guardar-base`: las
+etapas que empeoran más de `--tolerancia` se marcan como regresión y el script
+termina con código 1.
+
+100000 y 1000000 productos son tamaños válidos, pero el PDF completo de un millón
+de fichas tarda horas con el motor platypus; usa `--motor rapido` para esos tamaños.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import reportlab
+import sqlalchemy
+
+import crud
+import pdf_utils
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+ETAPAS = ("consulta", "story", "build", "escritura")
+
+def _rss_max_mb() -> float:
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KiB y macOS en bytes
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+class Medidor:
+    """Acumula, por etapa, la duración y la memoria de un proceso hijo."""
+
+    def __init__(self, con_tracemalloc: bool):
+        self.con_tracemalloc = con_tracemalloc
+        self.etapas = {}
+
+    @contextlib.contextmanager
+    def etapa(self, nombre: str):
+        if self.con_tracemalloc:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            resultado = {"segundos": round(time.perf_counter() - t0, 4), "rss_max_mb": round(_rss_max_mb(), 1)}
+            if self.con_tracemalloc:
+                resultado["python_pico_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+                tracemalloc.stop()
+            self.etapas[nombre] = resultado
+
+def medir_tamano(ruta_db: str, motor: str, con_tracemalloc: bool) -> dict:
+    """Ejecuta las cuatro etapas sobre la base `ruta_db` (en el proceso hijo)."""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=create_engine(f"sqlite:///{ruta_db}"))
+    medidor = Medidor(con_tracemalloc)
+    salida = os.path.join(tempfile.gettempdir(), "bench_suite.pdf")
+    with medidor.etapa("consulta"):
+        db = SessionLocal()
+        try:
+            productos = crud.obtener_productos_ligeros(db)
+        finally:
+            db.close()
+
+    with medidor.etapa("story"):
+        bufer = io.BytesIO()
+        doc = pdf_utils._crear_doc_template(bufer)
+        story = list(pdf_utils._iterar_story_indice(productos))
+        story.extend(pdf_utils._iterar_story_productos(productos, doc, motor=motor))
+
+    with medidor.etapa("build"):
+        doc.build(story, onFirstPage=pdf_utils._decorar_pagina, onLaterPages=pdf_utils._decorar_pagina,
+                  canvasmaker=pdf_utils.CanvasNumerosIndice)
+
+    with medidor.etapa("escritura"):
+        with open(salida, "wb") as f:
+            f.write(bufer.getbuffer())
+
+    return {"productos": len(productos), "paginas": doc.page, "bytes_pdf": bufer.getbuffer().nbytes,
+            "etapas": medidor.etapas}
+
+def preparar_base(num_productos: int) -> str:
+    """Devuelve la ruta de una base sintética con `num_productos`, creándola si hace falta."""
+    ruta_db = os.path.join(tempfile.gettempdir(), f"bench_suite_{num_productos}.db")
+    if os.path.exists(ruta_db):
+        SessionLocal = sessionmaker(bind=create_engine(f"sqlite:///{ruta_db}"))
+        db = SessionLocal()
+        try:
+            if crud.contar_productos(db) == num_productos:
+                return ruta_db
+        except Exception:
+            pass # Base incompleta o de otro esquema: se vuelve a crear
+        finally:
+            db.close()
+    print(f"Creando catálogo sintético de {num_productos} productos en {ruta_db}...")
+    crear_catalogo_sintetico(ruta_db, num_productos)
+    return ruta_db
+
+def comparar(resultados: dict, base: dict, tolerancia: float):
+    """
+    Devuelve las regresiones `(tamaño, etapa, métrica, base, actual)` respecto a
+    `base` y el número de tamaños comparados (sólo los medidos igual que en la base).
+    """
+    regresiones, comparados = [], 0
+    for tamano, actual in resultados["tamanos"].items():
+        anterior = base.get("tamanos", {}).get(tamano)
+        if not anterior or any(anterior.get(k) != actual[k] for k in ("motor", "tracemalloc")):
+            continue
+        comparados += 1
+        for etapa, medida in actual["etapas"].items():
+            medida_base = anterior["etapas"].get(etapa)
+            if not medida_base:
+                continue
+            for metrica in ("segundos", "rss_max_mb"):
+                # Por debajo de 50 ms el ruido domina: no se marca como regresión
+                if metrica == "segundos" and medida[metrica] < 0.05:
+                    continue
+                if medida[metrica] > medida_base[metrica] * (1 + tolerancia):
+                    regresiones.append((tamano, etapa, metrica, medida_base[metrica], medida[metrica]))
+    return regresiones, comparados
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks por etapas del catálogo.")
+    parser.add_argument("--tamanos", default="1000,10000",
+                        help="Números de productos separados por comas (p. ej. 1000,10000,100000,1000000).")
+    parser.add_argument("--motor", choices=pdf_utils.MOTORES, default=pdf_utils.MOTOR_PLATYPUS)
+    parser.add_argument("--salida", default=os.path.join(DIRECTORIO, "resultados_suite.json"))
+    parser.add_argument("--base", default=os.path.join(DIRECTORIO, "linea_base.json"),
+                        help="Resultados de referencia con los que comparar.")
+    parser.add_argument("--guardar-base", action="store_true", help="Guardar estos resultados como referencia.")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="Empeoramiento relativo permitido antes de marcar una regresión.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Medir también el pico de memoria de Python.")
+    parser.add_argument("--hijo", help=argparse.SUPPRESS) # Ruta de la base a medir (uso interno)
+    args = parser.parse_args()
+
+    if args.hijo:
+        print(json.dumps(medir_tamano(args.hijo, args.motor, args.tracemalloc)))
+        return
+
+    resultados = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entorno": {"python": platform.python_version(), "plataforma": platform.platform(),
+                    "cpus": os.cpu_count(), "reportlab": reportlab.Version, "sqlalchemy": sqlalchemy.__version__},
+        "tamanos": {},
+    }
+    for num_productos in (int(n) for n in args.tamanos.split(",")):
+        ruta_db = preparar_base(num_productos)
+        # Un proceso por tamaño, para que el pico de memoria residente sea el de ese tamaño
+        comando = [sys.executable, os.path.abspath(__file__), "--hijo", ruta_db, "--motor", args.motor]
+        if args.tracemalloc:
+            comando.append("--tracemalloc")
+        salida = subprocess.run(comando, check=True, capture_output=True, text=True).stdout
+        medida = json.loads(salida.strip().splitlines()[-1])
+        medida["motor"] = args.motor
+        medida["tracemalloc"] = args.tracemalloc
+        resultados["tamanos"][str(num_productos)] = medida
+
+        print(f"{num_productos} productos ({medida['paginas']} páginas, {medida['bytes_pdf'] / 2**20:.1f} MiB):")
+        for etapa in ETAPAS:
+            e = medida["etapas"][etapa]
+            extra = f", python {e['python_pico_mb']:.1f} MiB" if "python_pico_mb" in e else ""
+            print(f"  {etapa:<10} {e['segundos']:9.3f} s  rss máx {e['rss_max_mb']:8.1f} MiB{extra}")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.guardar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Línea base guardada en {args.base}")
+        return
+
+    if os.path.exists(args.base):
+        with open(args.base, encoding="utf-8") as f:
+            regresiones, comparados = comparar(resultados, json.load(f), args.tolerancia)
+        for tamano, etapa, metrica, antes, ahora in regresiones:
+            print(f"REGRESIÓN {tamano} productos, {etapa}, {metrica}: {antes} -> {ahora}")
+        if regresiones:
+            sys.exit(1)
+        print(f"Sin regresiones respecto a {args.base} en {comparados} tamaños comparables "
+              f"(tolerancia {args.tolerancia:.0%}).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Tamaño y tiempo de escritura del PDF antes y después de las optimizaciones de salida.
+
+Uso:
+    python benchmarks/bench_tamano_pdf.py [num_productos] [imagenes_distintas] [productos_por_tramo]
+
+Sobre un catálogo sintético con fotos repetidas (`imagenes_distintas` JPEG
+locales repartidos entre los productos) se genera:
+
+* `completo`: un solo documento (`pdf_utils.construir_catalogo`);
+* `tramos`: el índice y tramos de `productos_por_tramo` fichas unidos con
+  `pdf_paralelo.unir_tramos`, como en los modos `--procesos` e `--incremental`.
+
+"antes" usa la codificación ASCII85 de ReportLab y une los tramos sin eliminar
+objetos repetidos; "después", flujos sólo con Flate y objetos deduplicados. Si
+`pikepdf` está instalado se mide además `pdf_utils.optimizar_pdf` (flujos de
+objetos y linealización) sobre el resultado de "después".
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from PIL import Image as PILImage
+from reportlab import rl_config
+from sqlalchemy import update
+
+import crud
+import imagenes
+import models
+import pdf_paralelo
+import pdf_utils
+
+def crear_fotos(directorio: str, cantidad: int):
+    """JPEG de 1200x900 con un degradado distinto cada uno."""
+    rutas = []
+    for n in range(cantidad):
+        imagen = PILImage.linear_gradient("L").resize((1200, 900)).convert("RGB")
+        imagen = PILImage.merge("RGB", [canal.point(lambda v, k=k: (v + 37 * n * (k + 1)) % 256)
+                                        for k, canal in enumerate(imagen.split())])
+        rutas.append(os.path.join(directorio, f"foto_{n:03d}.jpg"))
+        imagen.save(rutas[-1], "JPEG", quality=85)
+    return rutas
+
+def completo(ruta, productos, cargador, deduplicar):
+    pdf_utils.construir_catalogo(ruta, productos, cargador)
+
+def por_tramos(ruta, productos, cargador, deduplicar, productos_por_tramo):
+    directorio = os.path.dirname(ruta)
+    ruta_indice = os.path.join(directorio, "indice.pdf")
+    indice = (ruta_indice, *pdf_utils.renderizar_indice_tramo(ruta_indice, productos))
+    tramos = []
+    for n, inicio in enumerate(range(0, len(productos), productos_por_tramo)):
+        ruta_tramo = os.path.join(directorio, f"tramo_{n}.pdf")
+        tramos.append((ruta_tramo, *pdf_utils.renderizar_tramo_productos(
+            ruta_tramo, productos[inicio:inicio + productos_por_tramo], cargador)))
+    pdf_paralelo.unir_tramos(ruta, indice, tramos, deduplicar=deduplicar)
+
+def medir(funcion, ruta, *args):
+    t0 = time.perf_counter()
+    funcion(ruta, *args)
+    return time.perf_counter() - t0, os.path.getsize(ruta)
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    distintas = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    productos_por_tramo = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    directorio = tempfile.mkdtemp(prefix="bench_tamano_pdf_")
+    engine, SessionLocal = crear_catalogo_sintetico(os.path.join(directorio, "catalogo.db"), num_productos)
+    fotos = crear_fotos(directorio, distintas)
+    with engine.begin() as conn:
+        for pid in range(1, num_productos + 1):
+            conn.execute(update(models.Producto).where(models.Producto.id == pid)
+                         .values(imagen_url=fotos[pid % distintas]))
+    db = SessionLocal()
+    try:
+        productos = crud.obtener_productos_ligeros(db)
+    finally:
+        db.close()
+
+    cargador = imagenes.CargadorImagenes(os.path.join(directorio, "miniaturas"))
+    for producto_obj in productos: # Miniaturas ya creadas: sólo se mide el PDF
+        cargador.obtener(producto_obj.imagen_url)
+
+    print(f"{num_productos} productos, {distintas} fotos distintas, tramos de {productos_por_tramo}")
+    for nombre, funcion, extra in (("completo", completo, ()), ("tramos", por_tramos, (productos_por_tramo,))):
+        ruta = os.path.join(directorio, f"{nombre}.pdf")
+        rl_config.useA85 = 1
+        antes = medir(funcion, ruta, productos, cargador, False, *extra)
+        rl_config.useA85 = 0
+        despues = medir(funcion, ruta, productos, cargador, True, *extra)
+        print(f"{nombre:<9} antes   {antes[0]:7.2f} s  {antes[1] / 2**20:8.2f} MiB")
+        print(f"{'':<9} después {despues[0]:7.2f} s  {despues[1] / 2**20:8.2f} MiB  "
+              f"({100 * (1 - despues[1] / antes[1]):.0f}% menos)")
+        t0 = time.perf_counter()
+        if pdf_utils.optimizar_pdf(ruta, linealizar=True):
+            tamano = os.path.getsize(ruta)
+            print(f"{'':<9} +pikepdf {time.perf_counter() - t0:6.2f} s  {tamano / 2**20:8.2f} MiB  "
+                  f"({100 * (1 - tamano / antes[1]):.0f}% menos)")
+
+    cargador.cerrar()
+    shutil.rmtree(directorio)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Lectura y maquetación solapadas (`main.py --tuberia`) frente al streaming en un solo hilo.
+
+Uso:
+    python benchmarks/bench_tuberia.py [num_productos] [latencias_ms] [motor]
+
+Por defecto con `--motor lista`, cuya maquetación es lo bastante rápida para que
+leer y maquetar tarden lo mismo en orden de magnitud.
+
+Sobre un catálogo sintético en SQLite, los productos se leen por páginas de
+`FETCH_CHUNK_SIZE` con `crud.iterar_productos_filtrados` (una consulta por
+página) y, para simular la ida y vuelta a un PostgreSQL remoto, cada consulta
+espera además `latencia_ms` (se prueban varias, p. ej. `0,20`). Se mide:
+
+* `lectura`: sólo leer los productos (con fichas, dos pasadas: índice y fichas);
+* `maquetacion`: generar el PDF desde una lista ya en memoria;
+* `streaming`: leer y maquetar en el mismo hilo (`--streaming`);
+* `tuberia`: leer en un hilo productor con cola acotada (`lectura_anticipada`).
+
+`streaming` debería acercarse a la suma de las dos primeras y `tuberia` al mayor de ellas.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+RUTA_DB = os.path.join(tempfile.gettempdir(), "bench_tuberia.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{RUTA_DB}" # Antes de importar los módulos del proyecto
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+from sqlalchemy import event
+
+import crud
+import database
+import lectura_anticipada
+import pdf_utils
+
+def cronometrar(funcion) -> float:
+    t0 = time.perf_counter()
+    funcion()
+    return time.perf_counter() - t0
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latencias = [float(l) for l in sys.argv[2].split(",")] if len(sys.argv) > 2 else [0.0, 20.0]
+    motor = sys.argv[3] if len(sys.argv) > 3 else pdf_utils.MOTOR_LISTA
+
+    engine, SessionLocal = crear_catalogo_sintetico(RUTA_DB, num_productos)
+    # `SessionLocal` para el hilo principal y `database.SessionLectura` para el productor, sobre la misma base
+    latencia = {"s": 0.0}
+    for motor_bd in (engine, database.obtener_engine_lectura()):
+        event.listen(motor_bd, "before_cursor_execute", lambda *a: time.sleep(latencia["s"]))
+
+    ruta_pdf = os.path.join(tempfile.gettempdir(), "bench_tuberia.pdf")
+    orden, pasadas = ("categoria", 1) if motor == pdf_utils.MOTOR_LISTA else ("id", 2) # La lista no tiene índice
+    leer = lambda db: crud.iterar_productos_filtrados(db, orden=orden)
+    db = SessionLocal()
+    try:
+        productos = list(leer(db))
+        print(f"{'latencia':>9} {'lectura':>9} {'maquetacion':>12} {'suma':>8} {'streaming':>10} {'tuberia':>9}")
+        for latencia_ms in latencias:
+            latencia["s"] = latencia_ms / 1000
+            t_lectura = cronometrar(lambda: [sum(1 for _ in leer(db)) for _ in range(pasadas)])
+            latencia["s"] = 0.0
+            t_maquetacion = cronometrar(lambda: pdf_utils.generar_catalogo_pdf_perezoso(
+                ruta_pdf, lambda: productos, None, motor))
+            latencia["s"] = latencia_ms / 1000
+            t_streaming = cronometrar(lambda: pdf_utils.generar_catalogo_pdf_perezoso(
+                ruta_pdf, lambda: leer(db), None, motor))
+            t_tuberia = cronometrar(lambda: pdf_utils.generar_catalogo_pdf_perezoso(
+                ruta_pdf, lambda: lectura_anticipada.leer_en_segundo_plano(leer), None, motor))
+            print(f"{latencia_ms:7.0f}ms {t_lectura:8.2f}s {t_maquetacion:11.2f}s {t_lectura + t_maquetacion:7.2f}s "
+                  f"{t_streaming:9.2f}s {t_tuberia:8.2f}s")
+    finally:
+        db.close()
+        engine.dispose()
+        database.obtener_engine_lectura().dispose()
+        os.remove(RUTA_DB)
+        os.remove(ruta_pdf)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Variantes del catálogo en una sola ejecución (`main.py --variantes`) frente a una ejecución por variante.
+
+Uso:
+    python benchmarks/bench_variantes.py [num_productos] [num_tarifas]
+
+Sobre un catálogo sintético sin imágenes, para cada número de tarifas de precio
+(p. ej. `1,2,4,8`) se generan las variantes `t1,...,tN`, que sólo se diferencian en
+el precio, y después el conjunto habitual
+`t1,t2,t1:sin_stock,t1:destacados`. Se mide:
+
+* `separadas`: una lectura y una generación completa por variante, como al lanzar
+  `main.py` una vez por variante;
+* `juntas`: `variantes_catalogo.generar_variantes` con todas, tras una sola lectura.
+
+Con las variantes de tarifa, `juntas` debería crecer mucho menos que `separadas`:
+cada tarifa adicional sólo estampa sus precios sobre el PDF base.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from catalogo_sintetico import crear_catalogo_sintetico
+
+import crud
+import variantes_catalogo
+
+def main():
+    num_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_tarifas = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 2, 4, 8]
+
+    directorio = tempfile.mkdtemp(prefix="bench_variantes_")
+    try:
+        engine, SessionLocal = crear_catalogo_sintetico(os.path.join(directorio, "catalogo.db"), num_productos)
+        tarifas = {f"t{n}": Decimal(1) - Decimal("0.05") * (n - 1) for n in range(1, max(num_tarifas + [2]) + 1)}
+
+        def leer():
+            db = SessionLocal()
+            try:
+                return crud.obtener_productos_ligeros(db)
+            finally:
+                db.close()
+
+        def medir(texto: str):
+            variantes = variantes_catalogo.leer_variantes(texto, tarifas)
+            salida = os.path.join(directorio, "salida")
+            t0 = time.perf_counter()
+            for variante in variantes:
+                variantes_catalogo.generar_variantes(salida, leer(), [variante], tarifas)
+            separadas = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            resultados = variantes_catalogo.generar_variantes(salida, leer(), variantes, tarifas)
+            juntas = time.perf_counter() - t0
+            shutil.rmtree(salida)
+            megas = sum(tamano for _, _, tamano in resultados) / 2**20
+            print(f"{texto[:40]:<40} {len(variantes):9} {separadas:9.1f}s {juntas:7.1f}s "
+                  f"{separadas / juntas:7.1f}x {megas:7.1f}MiB")
+
+        print(f"{'variantes':<40} {'num':>9} {'separadas':>10} {'juntas':>8} {'ahorro':>8} {'total':>10}")
+        for n in num_tarifas:
+            medir(",".join(f"t{k}" for k in range(1, n + 1)))
+        medir("t1,t2,t1:sin_stock,t1:destacados")
+        engine.dispose()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Generación de catálogos sintéticos en SQLite para los benchmarks.
+
+Crea las tablas a partir de `models` y las llena con inserciones masivas
+(`executemany` vía SQLAlchemy Core), sin pasar por el ORM ni por Faker,
+para poder construir tablas grandes en pocos segundos.
+"""
+
+import os
+import random
+import sys
+
+# Añade la raíz del proyecto al sys.path (igual que alembic/env.py)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# `config` lee DATABASE_URL al importarse (el engine se crea en la primera sesión);
+# apuntarla a SQLite si no se indicó otra base de datos (los procesos hijos
+# heredan esta variable).
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(project_root, "benchmarks", "bench_catalogo.db"))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+import models
+
+PALABRAS = ("inversor", "panel", "solar", "cable", "batería", "regulador", "soporte",
+            "conector", "lámpara", "sensor", "módulo", "controlador", "kit", "fusible")
+
+def crear_engine_sqlite(ruta_db: str):
+    """Crea (desde cero) una base SQLite con el esquema de `models`."""
+    if os.path.exists(ruta_db):
+        os.remove(ruta_db)
+    engine = create_engine(f"sqlite:///{ruta_db}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+def poblar_catalogo(engine, num_productos: int, num_marcas: int = 50, num_categorias: int = 10,
+                    subcategorias_por_categoria: int = 5, seed: int = 42, lote: int = 10000):
+    """Inserta un catálogo sintético reproducible de `num_productos` productos."""
+    rnd = random.Random(seed)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Marca), [
+            {"id": i, "nombre": f"Marca {i:04d}", "logo_url": None} for i in range(1, num_marcas + 1)
+        ])
+        conn.execute(insert(models.Categoria), [
+            {"id": i, "nombre": f"Categoría {i:03d}", "icono": "fa-circle"} for i in range(1, num_categorias + 1)
+        ])
+        subcats = []
+        for cat_id in range(1, num_categorias + 1):
+            for j in range(subcategorias_por_categoria):
+                subcats.append({"id": len(subcats) + 1, "nombre": f"Subcategoría {cat_id}-{j}", "categoria_id": cat_id})
+        conn.execute(insert(models.Subcategoria), subcats)
+
+        for inicio in range(0, num_productos, lote):
+            filas = []
+            for pid in range(inicio + 1, min(inicio + lote, num_productos) + 1):
+                cat_id = rnd.randint(1, num_categorias)
+                sub_id = (cat_id - 1) * subcategorias_por_categoria + rnd.randint(1, subcategorias_por_categoria)
+                nombre = " ".join(rnd.choice(PALABRAS) for _ in range(3)).capitalize()
+                filas.append({
+                    "id": pid,
+                    "nombre": nombre,
+                    "descripcion": " ".join(rnd.choice(PALABRAS) for _ in range(30)),
+                    "precio": round(rnd.uniform(5.99, 2999.99), 2),
+                    "marca_id": rnd.randint(1, num_marcas),
+                    "categoria_id": cat_id,
+                    "subcategoria_id": sub_id,
+                    "codigo": f"{pid:013d}",
+                    "stock": rnd.randint(0, 100),
+                    "imagen_url": None,
+                    "destacado": rnd.random() < 0.2,
+                })
+            conn.execute(insert(models.Producto), filas)
+
+def crear_catalogo_sintetico(ruta_db: str, num_productos: int, **kwargs):
+    """Crea la base, la puebla y devuelve `(engine, SessionLocal)` ligados a ella."""
+    engine = crear_engine_sqlite(ruta_db)
+    poblar_catalogo(engine, num_productos, **kwargs)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,98 @@
+"""Búsqueda de texto completo en el nombre y la descripción de los productos.
+
+En PostgreSQL la migración `c3a9e5f17d20` añade a `productos` la columna
+generada `busqueda` (`tsvector` con el nombre de peso A y la descripción de
+peso B) y un índice GIN sobre ella. En SQLite, para pruebas locales, se usa
+una tabla virtual FTS5 `productos_fts` con el contenido de `productos`,
+mantenida al día con triggers; la crea la misma migración o, en bases
+creadas con `Base.metadata.create_all` (benchmarks, `seed_db`), la primera búsqueda.
+
+La consulta admite palabras (deben aparecer todas), frases entre comillas y
+palabras excluidas con `-`, p. ej. `inversor "onda pura" -kit`. En PostgreSQL se
+interpreta con `websearch_to_tsquery` y la configuración `spanish` (con
+lematización); en SQLite cada palabra se busca como prefijo, sin distinguir
+acentos, que es lo más parecido sin un lematizador.
+"""
+
+import re
+from typing import List
+
+from sqlalchemy import column, func, literal_column, select, table, text
+
+# Configuración de texto de la columna `productos.busqueda` (ver la migración)
+IDIOMA_PG = "spanish"
+
+_SQL_FTS5 = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+        nombre, descripcion, content='productos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre, descripcion ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+        INSERT INTO productos_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+    END""",
+    "INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')",
+)
+
+# Peso del nombre frente a la descripción en bm25 (en PostgreSQL, los pesos A y B de `ts_rank`)
+_PESOS_BM25 = (10.0, 1.0)
+
+def asegurar_indice_sqlite(conn):
+    """Crea y llena `productos_fts` y sus triggers si la base SQLite aún no los tiene."""
+    existe = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'productos_fts'")).first()
+    if existe is None:
+        for sentencia in _SQL_FTS5:
+            conn.execute(text(sentencia))
+
+def _terminos(consulta: str) -> List[tuple]:
+    """`[(excluido, texto)]` de las frases entre comillas y las palabras de `consulta`."""
+    return [(signo == "-", frase or palabra)
+            for signo, frase, palabra in re.findall(r'(-?)(?:"([^"]*)"|([^\s"]+))', consulta)
+            if (frase or palabra).strip()]
+
+def consulta_fts5(consulta: str) -> str:
+    """Traduce `consulta` a la sintaxis MATCH de FTS5; cadena vacía si no hay términos que buscar."""
+    incluidos, excluidos = [], []
+    for excluido, termino in _terminos(consulta):
+        palabras = re.findall(r"\w+", termino)
+        if not palabras:
+            continue
+        # Palabras sueltas por prefijo; las frases, tal cual
+        expresion = f'"{palabras[0]}"*' if len(palabras) == 1 else '"' + " ".join(palabras) + '"'
+        (excluidos if excluido else incluidos).append(expresion)
+    if not incluidos: # FTS5 no admite una consulta sólo con exclusiones
+        return ""
+    return " AND ".join(incluidos) + "".join(f" NOT {e}" for e in excluidos)
+
+def seleccion_coincidencias(dialecto: str, consulta: str, limite: int = None):
+    """
+    Subconsulta `(id, rango)` de los productos que coinciden con `consulta`,
+    con `rango` mayor cuanto más relevante; con `limite`, sólo los más relevantes
+    (así sólo se leen de `productos` esas filas). None si la consulta no tiene términos.
+    """
+    if dialecto == "sqlite":
+        expresion = consulta_fts5(consulta)
+        if not expresion:
+            return None
+        fts = table("productos_fts", column("rowid"))
+        rango = -func.bm25(literal_column("productos_fts"), *_PESOS_BM25)
+        seleccion = (select(fts.c.rowid.label("id"), rango.label("rango"))
+                     .where(literal_column("productos_fts").op("MATCH")(expresion)))
+    else:
+        if not _terminos(consulta):
+            return None
+        productos = table("productos", column("id"), column("busqueda"))
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{IDIOMA_PG}'::regconfig"), consulta)
+        seleccion = (select(productos.c.id, func.ts_rank_cd(productos.c.busqueda, tsquery).label("rango"))
+                     .where(productos.c.busqueda.op("@@")(tsquery)))
+    if limite:
+        seleccion = seleccion.order_by(literal_column("rango").desc(), literal_column("id")).limit(limite)
+    return seleccion.subquery("coincidencias")
+
@@ -0,0 +1,160 @@
+"""Caché persistente en disco de fichas de producto renderizadas.
+
+Cada grupo de 4 productos empieza en una página nueva (el catálogo fuerza un
+`PageBreak` cada 4 fichas), así que sus páginas sólo dependen de esos 4 productos.
+La caché guarda, por grupo, un PDF con sus páginas y un JSON con el número de
+páginas y las anclas `#prod_<codigo>`. La clave combina, para cada producto, id,
+`fecha_actualizado` y los nombres de marca/categoría/subcategoría que se muestran
+(renombrar una marca no cambia `fecha_actualizado` del producto), más
+`pdf_utils.VERSION_DISENO` y el motor de renderizado.
+
+La caché tiene un tamaño máximo: al terminar se eliminan las entradas usadas hace
+más tiempo (según su fecha de modificación, que se actualiza en cada acierto).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from crud import ProductoLigero
+import pdf_paralelo # Usa pypdf para unir los grupos
+import pdf_utils
+
+log = logging.getLogger(__name__)
+
+def _partes_clave(producto_obj: ProductoLigero) -> Tuple:
+    fecha = producto_obj.fecha_actualizado.isoformat() if producto_obj.fecha_actualizado else ""
+    return (
+        producto_obj.id,
+        fecha,
+        producto_obj.marca.nombre if producto_obj.marca else None,
+        producto_obj.categoria.nombre if producto_obj.categoria else None,
+        producto_obj.subcategoria.nombre if producto_obj.subcategoria else None,
+    )
+
+def agrupar_por_pagina(productos: Iterable[ProductoLigero], tamano: int = 4) -> Iterator[List[ProductoLigero]]:
+    """Agrupa los productos en bloques de `tamano` (los que comparten salto de página)."""
+    grupo = []
+    for producto_obj in productos:
+        grupo.append(producto_obj)
+        if len(grupo) == tamano:
+            yield grupo
+            grupo = []
+    if grupo:
+        yield grupo
+
+class CacheFichas:
+    """Caché de grupos de fichas renderizadas, con desalojo por tamaño y estadísticas."""
+
+    def __init__(self, directorio: str, max_bytes: int, motor: str = pdf_utils.MOTOR_PLATYPUS):
+        self.directorio = directorio
+        self.motor = motor
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.bytes_en_uso = None
+        os.makedirs(directorio, exist_ok=True)
+
+    def clave(self, grupo: List[ProductoLigero], imagenes=None) -> str:
+        partes = [pdf_utils.VERSION_DISENO, self.motor] + [_partes_clave(p) for p in grupo]
+        if imagenes:
+            # La miniatura (o su ausencia) también forma parte de la ficha
+            partes += [getattr(imagenes.obtener(p.imagen_url), "ruta", None) for p in grupo]
+        datos = json.dumps(partes)
+        return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+    def _rutas(self, clave: str) -> Tuple[str, str]:
+        base = os.path.join(self.directorio, clave)
+        return base + ".pdf", base + ".json"
+
+    def obtener(self, clave: str) -> Optional[Tuple[str, int, dict]]:
+        """Devuelve `(ruta_pdf, num_paginas, anclas)` si el grupo está en caché."""
+        ruta_pdf, ruta_meta = self._rutas(clave)
+        try:
+            with open(ruta_meta, encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(ruta_pdf)
+            os.utime(ruta_meta)
+        except (OSError, ValueError):
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        anclas = {k: tuple(v) for k, v in meta["anclas"].items()}
+        return ruta_pdf, meta["num_paginas"], anclas
+
+    def renderizar(self, clave: str, grupo: List[ProductoLigero], imagenes=None) -> Tuple[str, int, dict]:
+        """Renderiza el grupo, lo guarda en la caché y devuelve lo mismo que `obtener`."""
+        ruta_pdf, ruta_meta = self._rutas(clave)
+        temporal = ruta_pdf + ".tmp"
+        num_paginas, anclas = pdf_utils.renderizar_tramo_productos(temporal, grupo, imagenes, self.motor)
+        os.replace(temporal, ruta_pdf)
+        # El JSON se escribe al final: una entrada sin JSON se trata como fallo
+        with open(ruta_meta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"num_paginas": num_paginas, "anclas": anclas}, f)
+        os.replace(ruta_meta + ".tmp", ruta_meta)
+        return ruta_pdf, num_paginas, anclas
+
+    def obtener_o_renderizar(self, grupo: List[ProductoLigero], imagenes=None) -> Tuple[str, int, dict]:
+        clave = self.clave(grupo, imagenes)
+        return self.obtener(clave) or self.renderizar(clave, grupo, imagenes)
+
+    def podar(self) -> int:
+        """Elimina las entradas menos usadas recientemente hasta quedar bajo `max_bytes`."""
+        entradas = {}
+        for nombre in os.listdir(self.directorio):
+            clave, extension = os.path.splitext(nombre)
+            if extension not in (".pdf", ".json"):
+                continue
+            estado = os.stat(os.path.join(self.directorio, nombre))
+            tamano, mtime = entradas.get(clave, (0, 0))
+            entradas[clave] = (tamano + estado.st_size, max(mtime, estado.st_mtime))
+
+        total = sum(tamano for tamano, _ in entradas.values())
+        for clave, (tamano, _) in sorted(entradas.items(), key=lambda e: e[1][1]):
+            if total <= self.max_bytes:
+                break
+            for ruta in self._rutas(clave):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            total -= tamano
+            self.desalojos += 1
+        self.bytes_en_uso = total
+        return self.desalojos
+
+    def informe(self) -> str:
+        consultas = self.aciertos + self.fallos
+        tasa = 100.0 * self.aciertos / consultas if consultas else 0.0
+        texto = (f"Caché de fichas: {self.aciertos} aciertos, {self.fallos} fallos ({tasa:.1f}% de aciertos), "
+                 f"{self.desalojos} entradas desalojadas")
+        if self.bytes_en_uso is not None:
+            texto += f", {self.bytes_en_uso / 2**20:.1f} MiB en uso de {self.max_bytes / 2**20:.0f} MiB"
+        return texto + "."
+
+def generar_catalogo_pdf_incremental(nombre_archivo: str, productos: Iterable[ProductoLigero],
+                                     resumen: Iterable, cache: CacheFichas, imagenes=None):
+    """
+    Genera el catálogo reutilizando de la caché los grupos de fichas que no han cambiado
+    y renderizando sólo los grupos sucios. El índice se renderiza siempre (con
+    `resumen`, filas `(id, nombre, codigo)`), y todo se une como en el modo paralelo.
+    """
+    if imagenes:
+        productos = imagenes.anticipar(productos)
+    tramos = [cache.obtener_o_renderizar(grupo, imagenes) for grupo in agrupar_por_pagina(productos)]
+    if not tramos:
+        log.warning("No se encontraron productos para generar el catálogo.")
+        return
+
+    with tempfile.TemporaryDirectory(prefix="catalogo_indice_") as directorio:
+        ruta_indice = os.path.join(directorio, "indice.pdf")
+        paginas_indice, enlaces, numeros = pdf_utils.renderizar_indice_tramo(ruta_indice, resumen)
+        log.info(f"Uniendo {len(tramos)} grupos de fichas en {nombre_archivo}...")
+        total_paginas = pdf_paralelo.unir_tramos(nombre_archivo, (ruta_indice, paginas_indice, enlaces, numeros),
+                                                 tramos)
+
+    cache.podar()
+    log.info(f"PDF '{nombre_archivo}' generado exitosamente ({total_paginas} páginas).")
+    log.info(cache.informe())
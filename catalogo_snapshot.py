@@ -0,0 +1,108 @@
+"""Copia desnormalizada del catálogo (`catalogo_snapshot`) para las lecturas de la generación.
+
+Cada generación une `productos` con `marcas`, `categorias` y `subcategorias`
+mientras la aplicación sigue escribiendo en esas tablas. `catalogo_snapshot`
+guarda el resultado de esa unión, una fila por producto con los nombres ya
+resueltos, y la generación (`main.py --snapshot`) la lee con una sola consulta
+sin joins, en orden de `id`.
+
+En PostgreSQL es una vista materializada que crea la migración `d5f8a2c61b47`,
+con un índice único por `id` para refrescarla con `REFRESH MATERIALIZED VIEW
+CONCURRENTLY` sin bloquear sus lecturas. En SQLite, para pruebas locales, es una
+tabla que se actualiza de forma incremental: sólo se reescriben los productos
+nuevos, los que tienen otra `fecha_actualizado` o una posterior al refresco
+anterior y aquellos cuya marca, categoría o subcategoría cambió de nombre, y se
+borran los que ya no existen. La crea la misma migración o, en bases creadas con
+`Base.metadata.create_all` (benchmarks, `seed_db`), el primer uso
+(`asegurar_snapshot_sqlite`).
+
+`catalogo_snapshot_estado` guarda, en una sola fila, la huella de los datos
+(`crud.obtener_huella_catalogo`) calculada en la misma transacción que el último
+refresco: es la huella de lo que contiene la copia, y la que usa el almacén de
+catálogos al generar desde ella.
+
+Los cambios que no pasan por el ORM y no actualizan `fecha_actualizado` no llegan
+a la tabla de SQLite hasta que se borra y se vuelve a llenar; la vista de
+PostgreSQL se recalcula entera en cada refresco.
+"""
+
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, String, Text, column, table, text
+
+# Los mismos tipos que `models.Producto`, para que `precio` llegue como Decimal y las fechas como datetime
+SNAPSHOT = table(
+    "catalogo_snapshot",
+    column("id", Integer), column("nombre", String), column("descripcion", Text), column("precio", Numeric(10, 2)),
+    column("codigo", String), column("stock", Integer), column("imagen_url", String), column("destacado", Boolean),
+    column("fecha_actualizado", DateTime(timezone=True)),
+    column("marca_id", Integer), column("marca_nombre", String),
+    column("categoria_id", Integer), column("categoria_nombre", String),
+    column("subcategoria_id", Integer), column("subcategoria_nombre", String),
+)
+
+ESTADO = table("catalogo_snapshot_estado", column("id", Integer), column("huella", String),
+               column("refrescado_en", DateTime(timezone=True)))
+
+_COLUMNAS = ", ".join(c.name for c in SNAPSHOT.c)
+
+# La unión que guarda la copia (el mismo SQL que la migración `d5f8a2c61b47`)
+_SELECT_PLANO = """SELECT p.id, p.nombre, p.descripcion, p.precio, p.codigo, p.stock, p.imagen_url, p.destacado,
+        p.fecha_actualizado, p.marca_id, m.nombre AS marca_nombre, p.categoria_id, c.nombre AS categoria_nombre,
+        p.subcategoria_id, s.nombre AS subcategoria_nombre
+    FROM productos p
+    LEFT JOIN marcas m ON m.id = p.marca_id
+    LEFT JOIN categorias c ON c.id = p.categoria_id
+    LEFT JOIN subcategorias s ON s.id = p.subcategoria_id"""
+
+_SQL_SQLITE = (
+    """CREATE TABLE IF NOT EXISTS catalogo_snapshot (
+        id INTEGER NOT NULL PRIMARY KEY, nombre VARCHAR(255) NOT NULL, descripcion TEXT,
+        precio NUMERIC(10, 2) NOT NULL, codigo VARCHAR(50), stock INTEGER, imagen_url VARCHAR(255),
+        destacado BOOLEAN, fecha_actualizado DATETIME, marca_id INTEGER, marca_nombre VARCHAR(100),
+        categoria_id INTEGER NOT NULL, categoria_nombre VARCHAR(100), subcategoria_id INTEGER,
+        subcategoria_nombre VARCHAR(100))""",
+    "CREATE INDEX IF NOT EXISTS ix_catalogo_snapshot_categoria_id_id ON catalogo_snapshot (categoria_id, id)",
+    """CREATE TABLE IF NOT EXISTS catalogo_snapshot_estado (
+        id INTEGER NOT NULL PRIMARY KEY, huella VARCHAR(64) NOT NULL, refrescado_en DATETIME NOT NULL)""",
+)
+
+# Refresco incremental en SQLite: nuevos, modificados y renombrados. `fecha_actualizado` tiene
+# resolución de segundos: los modificados desde el segundo del refresco anterior se reescriben
+# siempre, aunque conserven la fecha que ya tenía la copia.
+_SQL_ACTUALIZAR_SQLITE = f"""INSERT INTO catalogo_snapshot ({_COLUMNAS})
+    {_SELECT_PLANO}
+    LEFT JOIN catalogo_snapshot a ON a.id = p.id
+    WHERE a.id IS NULL OR a.fecha_actualizado IS NOT p.fecha_actualizado
+        OR p.fecha_actualizado >= (SELECT refrescado_en FROM catalogo_snapshot_estado WHERE id = 1)
+        OR a.marca_nombre IS NOT m.nombre OR a.categoria_nombre IS NOT c.nombre
+        OR a.subcategoria_nombre IS NOT s.nombre
+    ON CONFLICT (id) DO UPDATE SET {", ".join(f"{c.name} = excluded.{c.name}" for c in SNAPSHOT.c if c.name != "id")}"""
+
+_SQL_BORRAR_SQLITE = "DELETE FROM catalogo_snapshot WHERE id NOT IN (SELECT id FROM productos)"
+
+_SQL_REFRESCAR_PG = "REFRESH MATERIALIZED VIEW CONCURRENTLY catalogo_snapshot"
+
+_SQL_ESTADO = """INSERT INTO catalogo_snapshot_estado (id, huella, refrescado_en) VALUES (1, :huella, CURRENT_TIMESTAMP)
+    ON CONFLICT (id) DO UPDATE SET huella = excluded.huella, refrescado_en = excluded.refrescado_en"""
+
+def asegurar_snapshot_sqlite(conn):
+    """Crea `catalogo_snapshot` (vacía) y su tabla de estado si la base SQLite aún no las tiene."""
+    existe = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'catalogo_snapshot_estado'")).first()
+    if existe is None:
+        for sentencia in _SQL_SQLITE:
+            conn.execute(text(sentencia))
+
+def refrescar(conn, huella: str) -> tuple:
+    """
+    Pone al día la copia dentro de la transacción de `conn` y guarda `huella`
+    como la de su contenido. Devuelve `(escritas, borradas)`: en SQLite, las filas
+    reescritas y eliminadas; en PostgreSQL, `(None, None)` (el refresco no lo informa).
+    """
+    if conn.dialect.name == "sqlite":
+        asegurar_snapshot_sqlite(conn)
+        escritas = conn.execute(text(_SQL_ACTUALIZAR_SQLITE)).rowcount
+        borradas = conn.execute(text(_SQL_BORRAR_SQLITE)).rowcount
+    else:
+        conn.execute(text(_SQL_REFRESCAR_PG))
+        escritas = borradas = None
+    conn.execute(text(_SQL_ESTADO), {"huella": huella})
+    return escritas, borradas
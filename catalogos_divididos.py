@@ -0,0 +1,200 @@
+"""Varios catálogos en una sola ejecución: por categoría, por marca o por volúmenes.
+
+Los productos se leen una vez y se reparten en salidas (una por categoría o por
+marca, o una sola con todo el catálogo). Las fichas de todas las salidas se
+renderizan en tramos, en un pool de procesos como en `pdf_paralelo`, y cada
+salida se monta después con su propio índice con `pdf_paralelo.unir_tramos`.
+
+Con `max_paginas` o `max_bytes` cada salida se corta en volúmenes que no superan
+ese límite. Los cortes se hacen entre grupos de 4 fichas, que siempre empiezan
+en una página nueva, así que las páginas de un volumen son las mismas que tendría
+un catálogo sólo con sus productos y se toman del tramo ya renderizado sin volver
+a dibujarlas. Como el índice y el tamaño final sólo se conocen al montar el
+volumen, si se pasa del límite se monta de nuevo con menos grupos. Un grupo que
+por sí solo supera el límite forma un volumen aparte (y se avisa).
+"""
+
+import logging
+import math
+import os
+import re
+import tempfile
+import unicodedata
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import Dict, Iterable, List
+
+from formato_ficha import ancla_producto
+import imagenes
+import pdf_paralelo
+import pdf_utils
+
+log = logging.getLogger(__name__)
+
+CRITERIOS = ("categoria", "marca")
+
+# Páginas [primera, primera + paginas) del tramo número `tramo` con las fichas de `productos`
+Grupo = namedtuple("Grupo", "tramo primera paginas productos")
+
+def repartir_productos(productos: Iterable, criterio: str = None) -> Dict[str, List]:
+    """Agrupa los productos por el nombre de su `criterio` (`CRITERIOS`), conservando el orden."""
+    if not criterio:
+        return {"": list(productos)}
+    salidas = {}
+    for producto_obj in productos:
+        relacion = getattr(producto_obj, criterio)
+        salidas.setdefault(relacion.nombre if relacion else f"Sin {criterio}", []).append(producto_obj)
+    return salidas
+
+def nombres_base(prefijo: str, salidas: Iterable[str]) -> Dict[str, str]:
+    """
+    Nombre de archivo (sin extensión) de cada salida: `prefijo_<salida>` con la
+    salida reducida a minúsculas ASCII, dígitos y guiones bajos, y un sufijo
+    numérico si dos salidas quedan igual.
+    """
+    nombres, usados = {}, set()
+    for salida in salidas:
+        base = prefijo
+        if salida:
+            texto = unicodedata.normalize("NFKD", salida).encode("ascii", "ignore").decode()
+            base += "_" + (re.sub(r"[^A-Za-z0-9]+", "_", texto).strip("_").lower() or "sin_nombre")
+        nombre, n = base, 1
+        while nombre in usados:
+            n += 1
+            nombre = f"{base}_{n}"
+        usados.add(nombre)
+        nombres[salida] = nombre
+    return nombres
+
+# --- Trabajo en los procesos hijos ---
+def _renderizar_tramo(ruta: str, productos: List, con_imagenes: bool, motor: str):
+    cargador = imagenes.CargadorImagenes() if con_imagenes else None
+    try:
+        num_paginas, anclas = pdf_utils.renderizar_tramo_productos(ruta, productos, cargador, motor)
+    finally:
+        if cargador:
+            cargador.cerrar()
+    return ruta, num_paginas, anclas
+
+def _montar_volumen(ruta: str, grupos: List[Grupo], tramos: Dict[int, tuple], directorio_temporal: str):
+    """Une el índice de los productos de `grupos` y sus páginas; devuelve `(páginas, bytes)`."""
+    ruta_indice = os.path.join(directorio_temporal, f"indice_{os.path.basename(ruta)}")
+    productos = [p for grupo in grupos for p in grupo.productos]
+    indice = (ruta_indice, *pdf_utils.renderizar_indice_tramo(ruta_indice, productos))
+
+    piezas = []
+    for num_tramo, consecutivos in groupby(grupos, key=lambda g: g.tramo):
+        consecutivos = list(consecutivos)
+        ruta_tramo, _, anclas = tramos[num_tramo]
+        primera = consecutivos[0].primera
+        num_paginas = sum(g.paginas for g in consecutivos)
+        anclas = {clave: (pagina - primera, x, y) for clave, (pagina, x, y) in anclas.items()
+                  if primera < pagina <= primera + num_paginas}
+        piezas.append((ruta_tramo, num_paginas, anclas, primera))
+    paginas = pdf_paralelo.unir_tramos(ruta, indice, piezas)
+    os.remove(ruta_indice)
+    return paginas, os.path.getsize(ruta)
+
+def _montar_salida(ruta_base: str, grupos: List[Grupo], tramos: Dict[int, tuple], max_paginas: int,
+                   max_bytes: int, directorio_temporal: str):
+    """
+    Monta la salida en `ruta_base.pdf` o, con límites, en los volúmenes
+    `ruta_base_vol01.pdf`, `ruta_base_vol02.pdf`... Devuelve `[(ruta, páginas, bytes)]`.
+    """
+    if not max_paginas and not max_bytes:
+        ruta = f"{ruta_base}.pdf"
+        return [(ruta, *_montar_volumen(ruta, grupos, tramos, directorio_temporal))]
+
+    # Estimaciones iniciales, que se corrigen con cada volumen montado
+    paginas_indice = 1
+    bytes_por_pagina = (sum(os.path.getsize(tramos[n][0]) for n in {g.tramo for g in grupos})
+                        / max(1, sum(g.paginas for g in grupos)))
+    volumenes, inicio = [], 0
+    while inicio < len(grupos):
+        ruta = f"{ruta_base}_vol{len(volumenes) + 1:02d}.pdf"
+        presupuesto = math.inf
+        while True:
+            limite = min(max_paginas or math.inf, max_bytes / bytes_por_pagina if max_bytes else math.inf)
+            presupuesto = min(presupuesto, limite - paginas_indice)
+            fin, acumuladas = inicio + 1, grupos[inicio].paginas
+            while fin < len(grupos) and acumuladas + grupos[fin].paginas <= presupuesto:
+                acumuladas += grupos[fin].paginas
+                fin += 1
+            paginas, tamano = _montar_volumen(ruta, grupos[inicio:fin], tramos, directorio_temporal)
+            paginas_indice = paginas - acumuladas
+            bytes_por_pagina = tamano / paginas
+            excede = (max_paginas and paginas > max_paginas) or (max_bytes and tamano > max_bytes)
+            if not excede or fin == inicio + 1:
+                break
+            presupuesto = acumuladas - 1 # Cada reintento lleva al menos una página menos
+        if excede:
+            log.warning(f"{ruta}: un grupo de fichas no cabe en el límite ({paginas} páginas, {tamano} bytes).")
+        volumenes.append((ruta, paginas, tamano))
+        inicio = fin
+    return volumenes
+
+# --- Proceso principal ---
+def _grupos_de_tramo(num_tramo: int, productos: List, num_paginas: int, anclas: dict) -> List[Grupo]:
+    """
+    Divide un tramo en grupos de 4 fichas según la página del ancla de la primera
+    ficha de cada grupo. Si esa ficha no tiene código (ni ancla), el grupo se une al anterior.
+    """
+    cortes = [(0, 0)]
+    for i in range(4, len(productos), 4):
+        codigo = productos[i].codigo
+        ancla = anclas.get(ancla_producto(codigo)) if codigo else None
+        if ancla:
+            cortes.append((i, ancla[0] - 1))
+    cortes.append((len(productos), num_paginas))
+    return [Grupo(num_tramo, pagina, siguiente - pagina, productos[i:j])
+            for (i, pagina), (j, siguiente) in zip(cortes, cortes[1:])]
+
+def generar_catalogos_divididos(directorio: str, productos: List, criterio: str = None, max_paginas: int = None,
+                                max_bytes: int = None, num_procesos: int = None,
+                                productos_por_tramo: int = pdf_paralelo.PRODUCTOS_POR_TRAMO,
+                                con_imagenes: bool = False, motor: str = pdf_utils.MOTOR_PLATYPUS,
+                                prefijo: str = "catalogo") -> List[tuple]:
+    """
+    Genera en `directorio` un catálogo por cada valor de `criterio` (o uno solo sin
+    criterio), cortado en volúmenes si se indica `max_paginas` o `max_bytes`.
+    `productos` son los de `crud.obtener_productos_ligeros`, que se envían a los
+    procesos hijos sin volver a leer la base de datos. Devuelve `[(ruta, páginas, bytes)]`.
+    """
+    salidas = repartir_productos(productos, criterio)
+    nombres = nombres_base(prefijo, salidas)
+    os.makedirs(directorio, exist_ok=True)
+    num_procesos = num_procesos or os.cpu_count() or 1
+    productos_por_tramo = max(4, productos_por_tramo - productos_por_tramo % 4)
+    log.info(f"Generando {len(salidas)} catálogos con {len(productos)} productos y {num_procesos} procesos...")
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="catalogos_divididos_") as directorio_temporal:
+        with ProcessPoolExecutor(max_workers=num_procesos) as pool:
+            # Tramos de todas las salidas, empezando por las más grandes para repartir mejor la carga
+            pendientes = {}
+            for salida, lista in sorted(salidas.items(), key=lambda item: -len(item[1])):
+                tramos = []
+                for inicio in range(0, len(lista), productos_por_tramo):
+                    ruta = os.path.join(directorio_temporal, f"tramo_{len(pendientes):04d}_{len(tramos):05d}.pdf")
+                    trozo = lista[inicio:inicio + productos_por_tramo]
+                    tramos.append((trozo, pool.submit(_renderizar_tramo, ruta, trozo, con_imagenes, motor)))
+                pendientes[salida] = tramos
+
+            # Cada salida se monta también en el pool, después de sus tramos
+            montajes = []
+            for salida, tramos in pendientes.items():
+                renderizados, grupos = {}, []
+                for num_tramo, (trozo, futuro) in enumerate(tramos):
+                    renderizados[num_tramo] = futuro.result()
+                    _, num_paginas, anclas = renderizados[num_tramo]
+                    grupos.extend(_grupos_de_tramo(num_tramo, trozo, num_paginas, anclas))
+                montajes.append(pool.submit(_montar_salida, os.path.join(directorio, nombres[salida]), grupos,
+                                            renderizados, max_paginas, max_bytes, directorio_temporal))
+            for futuro in montajes:
+                resultados.extend(futuro.result())
+
+    for ruta, paginas, tamano in resultados:
+        log.info(f"  {ruta}: {paginas} páginas, {tamano / 2**20:.1f} MiB")
+    log.info(f"Generados {len(resultados)} PDF en '{directorio}'.")
+    return resultados
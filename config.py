@@ -10,10 +10,70 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "catalog_db")
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# DATABASE_URL completa tiene prioridad (p. ej. "sqlite:///catalogo_local.db" para pruebas locales)
+DATABASE_URL = os.getenv("DATABASE_URL", f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+# Réplica de sólo lectura para las lecturas del catálogo (database.SessionLectura); vacía, se lee del primario
+DATABASE_URL_LECTURA = os.getenv("DATABASE_URL_LECTURA", "")
+
+# Pool de conexiones de cada engine (database.py): conexiones fijas, adicionales en picos, segundos de
+# espera por una conexión libre, segundos antes de reciclar una conexión y comprobación antes de usarla
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_LECTURA_POOL_SIZE = int(os.getenv("DB_LECTURA_POOL_SIZE", "3"))
+DB_LECTURA_POOL_MAX_OVERFLOW = int(os.getenv("DB_LECTURA_POOL_MAX_OVERFLOW", "2"))
+# Límite de tiempo por sentencia en las sesiones de cada engine, en milisegundos (0: sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_LECTURA_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_LECTURA_STATEMENT_TIMEOUT_MS", "0"))
+
+# Tamaño de bloque para las lecturas en streaming (cursor del lado del servidor)
+FETCH_CHUNK_SIZE = int(os.getenv("FETCH_CHUNK_SIZE", "1000"))
+# Bloques leídos por adelantado en la cola de main.py --tuberia (lectura_anticipada.py)
+LECTURA_BLOQUES_COLA = int(os.getenv("LECTURA_BLOQUES_COLA", "4"))
 
 # Configuración del PDF
 PDF_FILENAME = "catalogo_productos_final.pdf"
 
+# Almacén de los últimos catálogos generados, por huella de los datos (almacen_catalogos.py)
+ALMACEN_DIR = os.getenv("ALMACEN_DIR", os.path.join(".cache", "catalogos"))
+ALMACEN_GENERACIONES = int(os.getenv("ALMACEN_GENERACIONES", "5"))
+
+# Directorio de los catálogos por categoría/marca o por volúmenes (main.py --dividir-por, --max-paginas, --max-mb)
+CATALOGOS_DIR = os.getenv("CATALOGOS_DIR", "catalogos")
+
+# Tarifas de las variantes del catálogo (main.py --variantes): "nombre:factor" sobre el precio de la base de datos
+TARIFAS_PRECIO = os.getenv("TARIFAS_PRECIO", "minorista:1,distribuidor:0.8")
+
+# Índice del catálogo (indice_catalogo.py): columnas por página y número de página de cada producto
+INDICE_COLUMNAS = int(os.getenv("INDICE_COLUMNAS", "1"))
+INDICE_NUMEROS_PAGINA = os.getenv("INDICE_NUMEROS_PAGINA", "1") == "1"
+
+# Caché de fichas renderizadas para la regeneración incremental (main.py --incremental)
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(".cache", "fichas"))
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "2048"))
+
+# Tramos y manifiesto de la generación reanudable (main.py --reanudable / --reanudar)
+REANUDABLE_DIR = os.getenv("REANUDABLE_DIR", os.path.join(".cache", "reanudable"))
+
+# Servicio HTTP de catálogos bajo demanda (servicio_catalogo.py)
+SERVICIO_HOST = os.getenv("SERVICIO_HOST", "127.0.0.1")
+SERVICIO_PUERTO = int(os.getenv("SERVICIO_PUERTO", "8000"))
+SERVICIO_CACHE_MB = int(os.getenv("SERVICIO_CACHE_MB", "256"))     # PDF generados que se guardan en memoria
+SERVICIO_RENDERS = int(os.getenv("SERVICIO_RENDERS", "2"))         # Catálogos que se generan a la vez
+
+# Nivel de los mensajes de log (DEBUG muestra cada producto añadido al PDF)
+LOG_NIVEL = os.getenv("LOG_NIVEL", "INFO")
+
 # Otras configuraciones
-IMG_DIR = "img" 
\ No newline at end of file
+IMG_DIR = "img"
+
+# Imágenes de producto (imagenes.py): las miniaturas se guardan en IMG_DIR/miniaturas
+IMG_MAX_HILOS = int(os.getenv("IMG_MAX_HILOS", "8"))           # Descargas/conversiones simultáneas
+IMG_TIMEOUT = float(os.getenv("IMG_TIMEOUT", "5"))             # Segundos por descarga HTTP
+IMG_ESPERA_MAX = float(os.getenv("IMG_ESPERA_MAX", "2"))       # Espera máxima por imagen al renderizar
+IMG_PRESUPUESTO_ESPERA = float(os.getenv("IMG_PRESUPUESTO_ESPERA", "30")) # Espera total máxima por ejecución
+IMG_DPI = 150                                                  # Resolución de impresión de las miniaturas
+IMG_ANCHO_MAX = 2.5 * 72                                       # Tamaño máximo en la ficha (puntos)
+IMG_ALTO_MAX = 1.5 * 72 
\ No newline at end of file
@@ -1,16 +1,60 @@
 """Funciones CRUD (Create, Read, Update, Delete) para la base de datos."""
 
+import hashlib
+import logging
+from collections import namedtuple
+from sqlalchemy import false, func, select, tuple_
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import busqueda
+import catalogo_snapshot
 import models # Importar todos los modelos para evitar importaciones circulares y para referencia
+from config import FETCH_CHUNK_SIZE
+
+log = logging.getLogger(__name__)
+
+# Registros ligeros para el renderizado: tuplas sin seguimiento de la sesión, con
+# los mismos nombres de atributo que `models.Producto`. `marca`, `categoria` y
+# `subcategoria` son `Relacion` compartidas entre todos los productos que las usan.
+Relacion = namedtuple("Relacion", "id nombre")
+ProductoLigero = namedtuple(
+    "ProductoLigero",
+    "id nombre descripcion precio codigo stock imagen_url destacado fecha_actualizado marca categoria subcategoria",
+)
+
+_COLUMNAS_LIGERAS = (
+    models.Producto.id, models.Producto.nombre, models.Producto.descripcion, models.Producto.precio,
+    models.Producto.codigo, models.Producto.stock, models.Producto.imagen_url, models.Producto.destacado,
+    models.Producto.fecha_actualizado, models.Producto.marca_id, models.Producto.categoria_id,
+    models.Producto.subcategoria_id,
+)
+
+Tablas = Tuple[Dict[int, Relacion], Dict[int, Relacion], Dict[int, Relacion]]
+
+# Filtros de `obtener_pagina_productos`; None (o False en `con_stock`) no filtra.
+# `precio_min` y `precio_max` son inclusivos.
+FiltroProductos = namedtuple(
+    "FiltroProductos", "categoria_id subcategoria_id marca_id destacado con_stock precio_min precio_max",
+    defaults=(None, None, None, None, False, None, None),
+)
+
+# Claves de la paginación por clave (keyset): columnas no nulas que terminan en
+# `id`, con los índices `ix_productos_<columna>_id` (ver `models`). `marca_id` y
+# `subcategoria_id` admiten NULL y no sirven de clave, pero filtrar por ellas con
+# la clave `id` usa sus índices.
+ORDENES_PAGINACION = {
+    "id": (models.Producto.id,),
+    "categoria": (models.Producto.categoria_id, models.Producto.id),
+    "precio": (models.Producto.precio, models.Producto.id),
+}
 
 def obtener_productos_con_relaciones(db: Session) -> List[models.Producto]:
     """
     Obtiene la lista de todos los productos de la base de datos con sus relaciones 
     (marca, categoría, subcategoría) cargadas eficientemente.
     """
-    print("Obteniendo todos los productos con sus relaciones...")
+    log.info("Obteniendo todos los productos con sus relaciones...")
     try:
         productos = (
             db.query(models.Producto)
@@ -22,11 +66,309 @@ def obtener_productos_con_relaciones(db: Session) -> List[models.Producto]:
             .order_by(models.Producto.id) # Opcional: ordenar los productos
             .all()
         )
-        print(f"Se encontraron {len(productos)} productos.")
+        log.info(f"Se encontraron {len(productos)} productos.")
         return productos
     except Exception as e:
-        print(f"Error al obtener productos: {e}")
+        log.error(f"Error al obtener productos: {e}")
+        return []
+
+def iterar_productos_con_relaciones(db: Session, chunk_size: int = FETCH_CHUNK_SIZE) -> Iterator[models.Producto]:
+    """
+    Variante en streaming de `obtener_productos_con_relaciones`.
+
+    Lee los productos en bloques de `chunk_size` filas mediante un cursor del lado
+    del servidor (`yield_per` activa `stream_results`), de modo que la memoria no
+    crece con el tamaño del catálogo. Las relaciones muchos-a-uno se siguen cargando
+    con `joinedload`, que es compatible con `yield_per`.
+
+    La sesión debe permanecer abierta mientras se consume el iterador.
+    """
+    log.info(f"Obteniendo productos en streaming (bloques de {chunk_size})...")
+    query = (
+        db.query(models.Producto)
+        .options(
+            joinedload(models.Producto.marca),
+            joinedload(models.Producto.categoria),
+            joinedload(models.Producto.subcategoria)
+        )
+        .order_by(models.Producto.id)
+        .yield_per(chunk_size)
+    )
+    total = 0
+    for producto in query:
+        total += 1
+        yield producto
+    log.info(f"Se leyeron {total} productos en streaming.")
+
+def contar_productos(db: Session) -> int:
+    """Devuelve el número total de productos sin cargarlos en memoria."""
+    return db.query(models.Producto).count()
+
+def obtener_resumen_productos(db: Session) -> List:
+    """
+    Devuelve filas ligeras `(id, nombre, codigo)` de todos los productos, ordenadas
+    por id. Bastan para construir el índice y repartir el catálogo en tramos.
+    """
+    return (
+        db.query(models.Producto.id, models.Producto.nombre, models.Producto.codigo)
+        .order_by(models.Producto.id)
+        .all()
+    )
+
+def cargar_tablas_relacionadas(db: Session) -> Tablas:
+    """Devuelve diccionarios `id -> Relacion` de marcas, categorías y subcategorías."""
+    return tuple(
+        {fila.id: Relacion(fila.id, fila.nombre) for fila in db.execute(select(modelo.id, modelo.nombre))}
+        for modelo in (models.Marca, models.Categoria, models.Subcategoria)
+    )
+
+def _proyectar(filas, tablas: Tablas) -> Iterator[ProductoLigero]:
+    marcas, categorias, subcategorias = tablas
+    for (id_, nombre, descripcion, precio, codigo, stock, imagen_url, destacado, fecha,
+         marca_id, categoria_id, subcategoria_id) in filas:
+        yield ProductoLigero(id_, nombre, descripcion, precio, codigo, stock, imagen_url, destacado, fecha,
+                             marcas.get(marca_id), categorias.get(categoria_id), subcategorias.get(subcategoria_id))
+
+def _filtrar_por_nombres(consulta, tablas: Tablas, categoria: str = None, marca: str = None,
+                        destacado: bool = None):
+    """Restringe `consulta` a los productos de la categoría y la marca con esos nombres."""
+    marcas, categorias, _ = tablas
+    if categoria is not None:
+        ids = [r.id for r in categorias.values() if r.nombre == categoria]
+        consulta = consulta.where(models.Producto.categoria_id.in_(ids))
+    if marca is not None:
+        ids = [r.id for r in marcas.values() if r.nombre == marca]
+        consulta = consulta.where(models.Producto.marca_id.in_(ids))
+    if destacado is not None:
+        consulta = consulta.where(models.Producto.destacado.is_(destacado))
+    return consulta
+
+def obtener_productos_ligeros(db: Session, categoria: str = None, marca: str = None,
+                              destacado: bool = None) -> List[ProductoLigero]:
+    """
+    Alternativa ligera a `obtener_productos_con_relaciones`: lee sólo las columnas
+    que muestra el catálogo, sin crear objetos ORM ni repetir en cada fila los
+    datos de marca y categoría (las tablas pequeñas se leen una vez aparte).
+    Opcionalmente, sólo los de una categoría o marca (por nombre) o los destacados.
+    """
+    log.info("Obteniendo todos los productos (registros ligeros)...")
+    tablas = cargar_tablas_relacionadas(db)
+    consulta = _filtrar_por_nombres(select(*_COLUMNAS_LIGERAS), tablas, categoria, marca, destacado)
+    filas = db.execute(consulta.order_by(models.Producto.id))
+    productos = list(_proyectar(filas, tablas))
+    log.info(f"Se encontraron {len(productos)} productos.")
+    return productos
+
+def iterar_productos_ligeros(db: Session, chunk_size: int = FETCH_CHUNK_SIZE) -> Iterator[ProductoLigero]:
+    """
+    Variante en streaming de `obtener_productos_ligeros`, en bloques de
+    `chunk_size` filas. La sesión debe permanecer abierta mientras se consume.
+    """
+    log.info(f"Obteniendo productos ligeros en streaming (bloques de {chunk_size})...")
+    tablas = cargar_tablas_relacionadas(db)
+    filas = db.execute(
+        select(*_COLUMNAS_LIGERAS).order_by(models.Producto.id).execution_options(yield_per=chunk_size)
+    )
+    total = 0
+    for producto in _proyectar(filas, tablas):
+        total += 1
+        yield producto
+    log.info(f"Se leyeron {total} productos en streaming.")
+
+def obtener_productos_ligeros_por_rango_id(db: Session, id_desde: int, id_hasta: int,
+                                           tablas: Tablas = None) -> List[ProductoLigero]:
+    """Registros ligeros de los productos con `id_desde <= id <= id_hasta`."""
+    filas = db.execute(
+        select(*_COLUMNAS_LIGERAS)
+        .where(models.Producto.id.between(id_desde, id_hasta))
+        .order_by(models.Producto.id)
+    )
+    return list(_proyectar(filas, tablas or cargar_tablas_relacionadas(db)))
+
+def _aplicar_filtro(consulta, filtro: FiltroProductos):
+    if filtro.categoria_id is not None:
+        consulta = consulta.where(models.Producto.categoria_id == filtro.categoria_id)
+    if filtro.subcategoria_id is not None:
+        consulta = consulta.where(models.Producto.subcategoria_id == filtro.subcategoria_id)
+    if filtro.marca_id is not None:
+        consulta = consulta.where(models.Producto.marca_id == filtro.marca_id)
+    if filtro.destacado is not None:
+        # La misma expresión que el índice parcial `ix_productos_destacados`
+        consulta = consulta.where(models.PRODUCTO_DESTACADO if filtro.destacado
+                                  else models.Producto.destacado == false())
+    if filtro.con_stock:
+        consulta = consulta.where(models.PRODUCTO_CON_STOCK) # Ídem con `ix_productos_con_stock`
+    if filtro.precio_min is not None:
+        consulta = consulta.where(models.Producto.precio >= filtro.precio_min)
+    if filtro.precio_max is not None:
+        consulta = consulta.where(models.Producto.precio <= filtro.precio_max)
+    return consulta
+
+def obtener_pagina_productos(db: Session, filtro: FiltroProductos = FiltroProductos(), orden: str = "id",
+                             despues_de: tuple = None, limite: int = FETCH_CHUNK_SIZE,
+                             tablas: Tablas = None) -> Tuple[List[ProductoLigero], Optional[tuple]]:
+    """
+    Página de hasta `limite` registros ligeros que cumplen `filtro`, ordenados por
+    la clave `orden` (`ORDENES_PAGINACION`) y posteriores a la clave `despues_de`.
+
+    Devuelve `(productos, siguiente)`: `siguiente` es la clave del último producto,
+    que se pasa como `despues_de` para pedir la página siguiente, o None si no hay
+    más. A diferencia de OFFSET, cada página cuesta lo mismo sea cual sea su
+    posición: la consulta empieza en la clave dentro del índice. Los ids de la
+    página se eligen en una subconsulta que sólo usa columnas de los índices y
+    después se leen esas filas por clave primaria.
+    """
+    claves = ORDENES_PAGINACION[orden]
+    seleccion = _aplicar_filtro(select(*claves), filtro)
+    if despues_de is not None:
+        # Una columna de la clave fijada por el filtro no se compara: con `categoria_id = ?`
+        # la condición queda en `id > ?` y SQLite la usa como rango dentro del índice.
+        fijas = {"categoria_id": filtro.categoria_id}
+        comparadas = [(c, v) for c, v in zip(claves, despues_de) if fijas.get(c.key) is None]
+        seleccion = seleccion.where(tuple_(*(c for c, _ in comparadas)) > tuple_(*(v for _, v in comparadas)))
+    seleccion = seleccion.order_by(*claves).limit(limite).subquery()
+    filas = db.execute(
+        select(*_COLUMNAS_LIGERAS)
+        .join(seleccion, models.Producto.id == seleccion.c.id)
+        .order_by(*(seleccion.c[columna.key] for columna in claves))
+    ).all()
+    productos = list(_proyectar(filas, tablas or cargar_tablas_relacionadas(db)))
+    siguiente = tuple(getattr(filas[-1], columna.key) for columna in claves) if len(filas) == limite else None
+    return productos, siguiente
+
+def iterar_productos_filtrados(db: Session, filtro: FiltroProductos = FiltroProductos(), orden: str = "id",
+                               chunk_size: int = FETCH_CHUNK_SIZE) -> Iterator[ProductoLigero]:
+    """
+    Recorre todos los productos que cumplen `filtro`, página a página con
+    `obtener_pagina_productos`. Cada página es una consulta corta, sin cursor
+    abierto entre páginas.
+    """
+    tablas = cargar_tablas_relacionadas(db)
+    siguiente = None
+    while True:
+        productos, siguiente = obtener_pagina_productos(db, filtro, orden, siguiente, chunk_size, tablas)
+        yield from productos
+        if siguiente is None:
+            return
+
+def buscar_productos(db: Session, consulta: str, filtro: FiltroProductos = FiltroProductos(),
+                     limite: int = None) -> List[ProductoLigero]:
+    """
+    Registros ligeros de los productos cuyo nombre o descripción coinciden con
+    `consulta` (sintaxis en `busqueda`), del más al menos relevante, opcionalmente
+    restringidos con `filtro` y a los `limite` primeros. Usa el índice de texto
+    completo: GIN sobre `productos.busqueda` en PostgreSQL y FTS5 en SQLite.
+    """
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "sqlite":
+        with db.get_bind().begin() as conn: # En su propia transacción, para que quede creado
+            busqueda.asegurar_indice_sqlite(conn)
+    # Sin filtro, el límite se aplica ya al elegir los más relevantes
+    sin_filtro = filtro == FiltroProductos()
+    coincidencias = busqueda.seleccion_coincidencias(dialecto, consulta, limite if sin_filtro else None)
+    if coincidencias is None:
+        log.warning(f"La búsqueda '{consulta}' no tiene términos que buscar.")
         return []
+    seleccion = _aplicar_filtro(
+        select(*_COLUMNAS_LIGERAS).join(coincidencias, models.Producto.id == coincidencias.c.id), filtro
+    ).order_by(coincidencias.c.rango.desc(), models.Producto.id)
+    if limite:
+        seleccion = seleccion.limit(limite)
+    productos = list(_proyectar(db.execute(seleccion), cargar_tablas_relacionadas(db)))
+    log.info(f"La búsqueda '{consulta}' encontró {len(productos)} productos.")
+    return productos
+
+def obtener_huella_catalogo(db: Session) -> str:
+    """
+    Resumen (hash) del estado de los datos que muestra el catálogo: número de
+    productos, id máximo, `fecha_actualizado` más reciente y los nombres de marcas,
+    categorías y subcategorías (renombrarlas no cambia `fecha_actualizado` del
+    producto). Cambia con cualquier alta, baja o modificación hecha a través del
+    ORM, que actualiza `fecha_actualizado`, sin leer los productos.
+    """
+    resumen = db.execute(
+        select(func.count(models.Producto.id), func.max(models.Producto.id), func.max(models.Producto.fecha_actualizado))
+    ).one()
+    tablas = [sorted(tabla.values()) for tabla in cargar_tablas_relacionadas(db)]
+    return hashlib.sha256(repr((tuple(resumen), tablas)).encode()).hexdigest()
+
+def _asegurar_snapshot(db: Session):
+    if db.get_bind().dialect.name == "sqlite":
+        with db.get_bind().begin() as conn: # En su propia transacción, para que quede creada
+            catalogo_snapshot.asegurar_snapshot_sqlite(conn)
+
+def refrescar_catalogo_snapshot(db: Session) -> str:
+    """
+    Pone al día `catalogo_snapshot` (ver `catalogo_snapshot`) y devuelve la huella
+    de los datos que contiene. La huella se calcula en la misma transacción que el
+    refresco (REPEATABLE READ en PostgreSQL), así que corresponde exactamente a la copia.
+    """
+    engine = db.get_bind()
+    opciones = {} if engine.dialect.name == "sqlite" else {"isolation_level": "REPEATABLE READ"}
+    with engine.connect().execution_options(**opciones) as conn, conn.begin():
+        huella = obtener_huella_catalogo(conn)
+        escritas, borradas = catalogo_snapshot.refrescar(conn, huella)
+    if escritas is None:
+        log.info("Vista materializada catalogo_snapshot refrescada.")
+    else:
+        log.info(f"catalogo_snapshot al día: {escritas} filas escritas y {borradas} eliminadas.")
+    return huella
+
+def obtener_huella_snapshot(db: Session) -> Optional[str]:
+    """
+    Huella de los datos de `catalogo_snapshot` (la de `obtener_huella_catalogo` en
+    su último refresco), o None si nunca se ha refrescado.
+    """
+    _asegurar_snapshot(db)
+    return db.execute(select(catalogo_snapshot.ESTADO.c.huella)).scalar()
+
+def _proyectar_snapshot(filas) -> Iterator[ProductoLigero]:
+    marcas, categorias, subcategorias = {}, {}, {} # Una `Relacion` por id, como en `cargar_tablas_relacionadas`
+    for (id_, nombre, descripcion, precio, codigo, stock, imagen_url, destacado, fecha,
+         marca_id, marca, categoria_id, categoria, subcategoria_id, subcategoria) in filas:
+        if marca is not None:
+            marca = marcas.get(marca_id) or marcas.setdefault(marca_id, Relacion(marca_id, marca))
+        if categoria is not None:
+            categoria = (categorias.get(categoria_id)
+                         or categorias.setdefault(categoria_id, Relacion(categoria_id, categoria)))
+        if subcategoria is not None:
+            subcategoria = (subcategorias.get(subcategoria_id)
+                            or subcategorias.setdefault(subcategoria_id, Relacion(subcategoria_id, subcategoria)))
+        yield ProductoLigero(id_, nombre, descripcion, precio, codigo, stock, imagen_url, destacado, fecha,
+                             marca, categoria, subcategoria)
+
+def _consulta_snapshot(orden: str):
+    snapshot = catalogo_snapshot.SNAPSHOT
+    claves = (snapshot.c.categoria_id, snapshot.c.id) if orden == "categoria" else (snapshot.c.id,)
+    return select(*snapshot.c).order_by(*claves)
+
+def obtener_productos_snapshot(db: Session, orden: str = "id") -> List[ProductoLigero]:
+    """
+    Los mismos registros ligeros que `obtener_productos_ligeros`, leídos de
+    `catalogo_snapshot` con una sola consulta sin joins, en orden de `id` (o,
+    con `orden="categoria"`, de `(categoria_id, id)`). Reflejan los datos del
+    último `refrescar_catalogo_snapshot`.
+    """
+    log.info("Obteniendo todos los productos de catalogo_snapshot...")
+    _asegurar_snapshot(db)
+    productos = list(_proyectar_snapshot(db.execute(_consulta_snapshot(orden))))
+    log.info(f"Se encontraron {len(productos)} productos.")
+    return productos
+
+def iterar_productos_snapshot(db: Session, orden: str = "id",
+                              chunk_size: int = FETCH_CHUNK_SIZE) -> Iterator[ProductoLigero]:
+    """
+    Variante en streaming de `obtener_productos_snapshot`, en bloques de
+    `chunk_size` filas. La sesión debe permanecer abierta mientras se consume.
+    """
+    log.info(f"Obteniendo productos de catalogo_snapshot en streaming (bloques de {chunk_size})...")
+    _asegurar_snapshot(db)
+    filas = db.execute(_consulta_snapshot(orden).execution_options(yield_per=chunk_size))
+    total = 0
+    for producto in _proyectar_snapshot(filas):
+        total += 1
+        yield producto
+    log.info(f"Se leyeron {total} productos en streaming.")
 
 # Aquí se podrían añadir más funciones CRUD en el futuro:
 # def obtener_producto_por_id(db: Session, producto_id: int) -> models.Producto | None:
@@ -1,20 +1,207 @@
-"""Configuración de la Base de Datos SQLAlchemy"""
+"""Configuración de la Base de Datos SQLAlchemy
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+El engine se crea en la primera sesión (o al pedir `database.engine`), no al
+importar el módulo: así importar `models` o ejecutar `main.py --help` no carga el
+driver de la base de datos ni abre el pool.
+
+Hay dos fábricas de sesiones:
+
+* `SessionLocal`, sobre `DATABASE_URL` (el primario): escrituras, `seed_db`,
+  el refresco de `catalogo_snapshot` y las migraciones (que usan la misma URL).
+* `SessionLectura`, para las lecturas del catálogo (generación, exportación,
+  servicio HTTP): sobre `DATABASE_URL_LECTURA`, una réplica de sólo lectura con su
+  propio engine y su propio pool (`DB_LECTURA_POOL_*`), o sobre el primario si
+  no se configura. Lo que se lee de la réplica puede ir algo por detrás del primario.
 
-from config import DATABASE_URL # Importar la URL desde config.py
+Cada pool tiene un tamaño fijo más un desbordamiento acotado, espera como mucho
+`DB_POOL_TIMEOUT` segundos por una conexión libre, recicla las conexiones tras
+`DB_POOL_RECYCLE` segundos y las comprueba antes de usarlas (`DB_POOL_PRE_PING`),
+de modo que una generación larga no ocupa más conexiones de las previstas ni
+falla por una conexión cortada. `metricas_pools` e `informe_pools` resumen su uso.
 
-engine = create_engine(DATABASE_URL)
+Las sesiones pueden limitar lo que tarda cada sentencia (`timeout_ms`, por
+defecto `DB_STATEMENT_TIMEOUT_MS` o `DB_LECTURA_STATEMENT_TIMEOUT_MS`). En
+PostgreSQL es `SET LOCAL statement_timeout`, que sólo dura la transacción de la
+sesión. En SQLite, para pruebas locales, se interrumpe la sentencia si tarda más
+hasta su primera fila (el resto de filas de una lectura en streaming no cuenta).
+Una sentencia interrumpida lanza `sqlalchemy.exc.OperationalError`.
+"""
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+from config import (DATABASE_URL, DATABASE_URL_LECTURA, DB_POOL_SIZE, DB_POOL_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_LECTURA_POOL_SIZE, DB_LECTURA_POOL_MAX_OVERFLOW,
+                    DB_STATEMENT_TIMEOUT_MS, DB_LECTURA_STATEMENT_TIMEOUT_MS)
 
 Base = declarative_base()
 
+# Cada cuántas instrucciones de SQLite se comprueba el límite de tiempo de la sentencia
+_INSTRUCCIONES_SQLITE = 1000
+
+def _opciones_pool(url: str, tamano: int, desbordamiento: int) -> dict:
+    if make_url(url).get_backend_name() == "sqlite" and make_url(url).database in (None, "", ":memory:"):
+        return {} # SQLite en memoria usa un pool de una conexión por hilo, sin estas opciones
+    return {"pool_size": tamano, "max_overflow": desbordamiento, "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": DB_POOL_PRE_PING}
+
+def _limitar_sentencias(session, transaccion, conexion):
+    """`after_begin`: aplica el `timeout_ms` de la sesión a la conexión que empieza a usar."""
+    timeout_ms = session.info.get("timeout_ms")
+    if not timeout_ms:
+        return
+    if conexion.dialect.name == "postgresql":
+        conexion.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+    elif conexion.dialect.name == "sqlite":
+        conexion.info["timeout_ms"] = timeout_ms # Lo usan los eventos de `_escuchar_sqlite` hasta el checkin
+
+def _escuchar_sqlite(engine):
+    def antes_de_ejecutar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        timeout_ms = conexion.info.get("timeout_ms")
+        if timeout_ms:
+            limite = time.monotonic() + timeout_ms / 1000
+            conexion.connection.driver_connection.set_progress_handler(
+                lambda: time.monotonic() > limite, _INSTRUCCIONES_SQLITE)
+
+    def despues_de_ejecutar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        if conexion.info.get("timeout_ms"):
+            conexion.connection.driver_connection.set_progress_handler(None, 0)
+
+    def al_devolver(conexion_dbapi, registro):
+        if registro.info.pop("timeout_ms", None):
+            conexion_dbapi.set_progress_handler(None, 0)
+
+    event.listen(engine, "before_cursor_execute", antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", despues_de_ejecutar)
+    event.listen(engine, "checkin", al_devolver)
+
+class _Conexiones:
+    """Engine de una URL, creado la primera vez que se pide, con su fábrica de sesiones y sus métricas."""
+
+    def __init__(self, nombre: str, url: str, tamano: int, desbordamiento: int, timeout_ms: int):
+        self.nombre = nombre
+        self.url = url
+        self.timeout_ms = timeout_ms
+        self._tamano = tamano
+        self._desbordamiento = desbordamiento
+        self._engine = None
+        self._cerrojo = threading.Lock()
+        self._fabrica = sessionmaker(autocommit=False, autoflush=False)
+        event.listen(self._fabrica, "after_begin", _limitar_sentencias)
+        self.contadores = {"conexiones_abiertas": 0, "checkouts": 0, "en_uso": 0, "max_en_uso": 0}
+
+    def _contar(self, engine):
+        contadores, cerrojo = self.contadores, threading.Lock()
+
+        def al_conectar(*_):
+            with cerrojo:
+                contadores["conexiones_abiertas"] += 1
+
+        def al_prestar(*_):
+            with cerrojo:
+                contadores["checkouts"] += 1
+                contadores["en_uso"] += 1
+                contadores["max_en_uso"] = max(contadores["max_en_uso"], contadores["en_uso"])
+
+        def al_devolver(*_):
+            with cerrojo:
+                contadores["en_uso"] -= 1
+
+        event.listen(engine, "connect", al_conectar)
+        event.listen(engine, "checkout", al_prestar)
+        event.listen(engine, "checkin", al_devolver)
+
+    def engine(self):
+        if self._engine is None:
+            with self._cerrojo:
+                if self._engine is None:
+                    engine = create_engine(self.url, **_opciones_pool(self.url, self._tamano, self._desbordamiento))
+                    if engine.dialect.name == "sqlite":
+                        _escuchar_sqlite(engine)
+                    self._contar(engine)
+                    self._fabrica.configure(bind=engine)
+                    self._engine = engine
+        return self._engine
+
+    def sesion(self, timeout_ms: int = None):
+        self.engine()
+        return self._fabrica(info={"timeout_ms": self.timeout_ms if timeout_ms is None else timeout_ms})
+
+    def metricas(self) -> dict:
+        """Uso del pool: tamaño, conexiones prestadas y libres, desbordamiento y contadores acumulados."""
+        metricas = {"url": make_url(self.url).render_as_string(hide_password=True), **self.contadores}
+        if self._engine is not None:
+            pool = self._engine.pool
+            for clave, metodo in (("tamano", "size"), ("prestadas", "checkedout"), ("libres", "checkedin"),
+                                  ("desbordamiento", "overflow")):
+                if hasattr(pool, metodo):
+                    metricas[clave] = getattr(pool, metodo)()
+        return metricas
+
+    def descartar(self):
+        if self._engine is not None:
+            self._engine.dispose(close=False)
+            self.contadores["en_uso"] = 0
+
+_primario = _Conexiones("primario", DATABASE_URL, DB_POOL_SIZE, DB_POOL_MAX_OVERFLOW, DB_STATEMENT_TIMEOUT_MS)
+_replica = (_Conexiones("lectura", DATABASE_URL_LECTURA, DB_LECTURA_POOL_SIZE, DB_LECTURA_POOL_MAX_OVERFLOW,
+                        DB_LECTURA_STATEMENT_TIMEOUT_MS)
+            if DATABASE_URL_LECTURA else None)
+
+def obtener_engine():
+    """El engine de `DATABASE_URL`, creado la primera vez que se pide."""
+    return _primario.engine()
+
+def obtener_engine_lectura():
+    """El engine de las lecturas del catálogo: el de `DATABASE_URL_LECTURA` o, sin réplica, el del primario."""
+    return (_replica or _primario).engine()
+
+def SessionLocal(timeout_ms: int = None):
+    """Nueva sesión sobre el primario; `timeout_ms` sustituye a `DB_STATEMENT_TIMEOUT_MS` (0: sin límite)."""
+    return _primario.sesion(timeout_ms)
+
+def SessionLectura(timeout_ms: int = None):
+    """
+    Nueva sesión para leer el catálogo, sobre la réplica si está configurada; sin
+    ella, sobre el primario. `timeout_ms` sustituye al límite por defecto (0: sin límite).
+    """
+    if _replica is None:
+        if timeout_ms is None: # Sobre el primario, con el límite de las lecturas si se configuró
+            timeout_ms = DB_LECTURA_STATEMENT_TIMEOUT_MS or None
+        return _primario.sesion(timeout_ms)
+    return _replica.sesion(timeout_ms)
+
+def metricas_pools() -> dict:
+    """`{"primario": {...}, "lectura": {...}}` con las métricas de cada pool (sin réplica, sólo el primario)."""
+    return {conexiones.nombre: conexiones.metricas() for conexiones in (_primario, _replica) if conexiones}
+
+def informe_pools() -> str:
+    partes = []
+    for nombre, metricas in metricas_pools().items():
+        partes.append(f"{nombre}: {metricas['checkouts']} préstamos, como mucho {metricas['max_en_uso']} "
+                      f"conexiones a la vez, {metricas['conexiones_abiertas']} abiertas")
+    return "Pools de conexiones: " + "; ".join(partes) + "."
+
+def descartar_conexiones_heredadas():
+    """En un proceso hijo: olvida las conexiones del padre sin cerrarlas (las sigue usando el padre)."""
+    _primario.descartar()
+    if _replica:
+        _replica.descartar()
+
+def __getattr__(nombre):
+    # `database.engine` y `from database import engine` siguen funcionando
+    if nombre == "engine":
+        return obtener_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
 # Función para obtener una sesión de DB (opcional, pero puede ser útil para dependencias)
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -0,0 +1,172 @@
+"""Exportación del catálogo a HTML, CSV y JSON Lines, sin pasar por ReportLab.
+
+Los exportadores reciben los mismos registros que `pdf_utils` (los de
+`crud.iterar_productos_ligeros` o `crud.obtener_productos_ligeros`) y escriben
+cada producto con los textos de su ficha (`formato_ficha.textos_ficha`): marca,
+"Categoría > Subcategoría", precio y stock con el mismo formato que el PDF. La
+descripción se exporta completa, sin el recorte de la ficha.
+
+Cada producto se escribe en cuanto llega, así que la memoria no depende del
+tamaño del catálogo, y `exportar_catalogo` alimenta todos los formatos pedidos
+desde una sola pasada por los productos. Cada archivo se escribe en un temporal
+que sustituye al destino al terminar, de modo que un error no deja una
+exportación a medias en su lugar.
+"""
+
+import csv
+import html
+import json
+import logging
+import os
+from contextlib import ExitStack
+from typing import Dict, Iterable
+
+from formato_ficha import TITULO_CATALOGO, ancla_producto, textos_ficha
+
+log = logging.getLogger(__name__)
+
+COLUMNAS = ("id", "codigo", "nombre", "marca", "categoria", "precio", "stock", "destacado", "descripcion",
+            "imagen_url")
+
+def registro_exportacion(producto_obj) -> dict:
+    """Campos exportados de un producto, con los textos de la ficha del PDF."""
+    textos = textos_ficha(producto_obj)
+    return {"id": producto_obj.id, "codigo": textos.codigo, "nombre": textos.nombre, "marca": textos.marca,
+            "categoria": textos.categoria, "precio": textos.precio, "stock": textos.stock,
+            "destacado": textos.destacado, "descripcion": textos.descripcion, "imagen_url": producto_obj.imagen_url}
+
+class Exportador:
+    """Escribe productos en `ruta` uno a uno; usar como gestor de contexto."""
+
+    extension = ""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.productos = 0
+        self._temporal = f"{ruta}.{os.getpid()}.tmp"
+        self._archivo = None
+
+    def __enter__(self):
+        self._archivo = open(self._temporal, "w", encoding="utf-8", newline="")
+        self._inicio()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            if tipo is None:
+                self._fin()
+        finally:
+            self._archivo.close()
+        if tipo is None:
+            os.replace(self._temporal, self.ruta)
+        else:
+            os.remove(self._temporal)
+        return False
+
+    def escribir(self, producto_obj):
+        self.escribir_registro(registro_exportacion(producto_obj))
+
+    def escribir_registro(self, registro: dict):
+        """Escribe un registro de `registro_exportacion`, que puede modificar (pasar una copia si se reutiliza)."""
+        self._escribir(registro)
+        self.productos += 1
+
+    def _inicio(self):
+        pass
+
+    def _escribir(self, registro: dict):
+        raise NotImplementedError
+
+    def _fin(self):
+        pass
+
+class ExportadorCSV(Exportador):
+    """CSV con cabecera (`COLUMNAS`); `destacado` como 1 o 0."""
+
+    extension = "csv"
+
+    def _inicio(self):
+        self._csv = csv.writer(self._archivo)
+        self._csv.writerow(COLUMNAS)
+
+    def _escribir(self, registro: dict):
+        registro["destacado"] = int(registro["destacado"])
+        self._csv.writerow([registro[columna] for columna in COLUMNAS])
+
+class ExportadorJSONL(Exportador):
+    """Un objeto JSON por línea, con las claves de `COLUMNAS`."""
+
+    extension = "jsonl"
+
+    def _escribir(self, registro: dict):
+        self._archivo.write(json.dumps(registro, ensure_ascii=False))
+        self._archivo.write("\n")
+
+class ExportadorHTML(Exportador):
+    """Página HTML con una ficha (`<article>`) por producto, con el mismo `id` que el ancla del PDF."""
+
+    extension = "html"
+
+    def _inicio(self):
+        titulo = html.escape(TITULO_CATALOGO)
+        self._archivo.write(
+            "<!DOCTYPE html>\n<html lang=\"es\">\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{titulo}</title>\n"
+            "<style>\n"
+            "body { font-family: Helvetica, Arial, sans-serif; max-width: 50em; margin: auto; }\n"
+            "article { border-bottom: 1px solid #ccc; padding: 1em 0; }\n"
+            "dl { display: grid; grid-template-columns: 8em 1fr; margin: 0.5em 0; }\n"
+            "dt { font-weight: bold; }\n"
+            ".destacado { color: #666; font-style: italic; text-align: center; }\n"
+            "</style>\n</head>\n<body>\n"
+            f"<h1>{titulo}</h1>\n"
+        )
+
+    def _escribir(self, registro: dict):
+        e = lambda valor: html.escape(str(valor))
+        ancla = f' id="{e(ancla_producto(registro["codigo"]))}"' if registro["codigo"] else ""
+        partes = [f"<article{ancla}>\n<h2>{e(registro['nombre'])}</h2>\n"]
+        if registro["imagen_url"]:
+            partes.append(f'<img src="{e(registro["imagen_url"])}" alt="{e(registro["nombre"])}" loading="lazy">\n')
+        partes.append(f"<dl>\n<dt>Marca:</dt><dd>{e(registro['marca'])}</dd>\n"
+                      f"<dt>Categoría:</dt><dd>{e(registro['categoria'])}</dd>\n")
+        if registro["codigo"]:
+            partes.append(f"<dt>Código:</dt><dd>{e(registro['codigo'])}</dd>\n")
+        partes.append(f"<dt>Precio:</dt><dd>{e(registro['precio'])}</dd>\n"
+                      f"<dt>Stock:</dt><dd>{e(registro['stock'])}</dd>\n</dl>\n"
+                      f"<p>{e(registro['descripcion'])}</p>\n")
+        if registro["destacado"]:
+            partes.append('<p class="destacado">-- Producto Destacado --</p>\n')
+        partes.append("</article>\n")
+        self._archivo.write("".join(partes))
+
+    def _fin(self):
+        self._archivo.write("</body>\n</html>\n")
+
+FORMATOS = {clase.extension: clase for clase in (ExportadorHTML, ExportadorCSV, ExportadorJSONL)}
+
+def rutas_exportacion(directorio: str, prefijo: str, formatos: Iterable[str]) -> Dict[str, str]:
+    """`formato -> ruta` de los archivos `directorio/prefijo.<formato>`."""
+    return {formato: os.path.join(directorio, f"{prefijo}.{formato}") for formato in formatos}
+
+def exportar_catalogo(productos: Iterable, rutas: Dict[str, str]) -> int:
+    """
+    Escribe `productos` en cada formato de `rutas` (`formato -> ruta`, formatos de
+    `FORMATOS`) recorriéndolos una sola vez. Devuelve el número de productos.
+    """
+    desconocidos = set(rutas) - set(FORMATOS)
+    if desconocidos:
+        raise ValueError(f"Formatos no soportados: {', '.join(sorted(desconocidos))}")
+    exportadores = [FORMATOS[formato](ruta) for formato, ruta in rutas.items()]
+    total = 0
+    with ExitStack() as pila:
+        for exportador in exportadores:
+            pila.enter_context(exportador)
+        for producto_obj in productos:
+            registro = registro_exportacion(producto_obj) # Una vez por producto, no por formato
+            for exportador in exportadores:
+                exportador.escribir_registro(dict(registro))
+            total += 1
+    for exportador in exportadores:
+        log.info(f"  {exportador.ruta}: {exportador.productos} productos, {os.path.getsize(exportador.ruta) / 2**20:.1f} MiB")
+    return total
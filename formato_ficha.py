@@ -0,0 +1,55 @@
+"""Textos de la ficha de producto, comunes al PDF (`pdf_utils`, `render_rapido`) y a `exportadores`.
+
+No depende de ReportLab: los exportadores lo usan sin cargar el motor del PDF, y
+`main` y `almacen_catalogos` toman de aquí los motores y la versión del diseño
+(que `pdf_utils` reexporta) para no importar ReportLab hasta que hay que dibujar.
+"""
+
+from collections import namedtuple
+
+# Versión del diseño de las fichas: incrementarla al cambiar estilos o layout
+# invalida las fichas guardadas en la caché de renderizado (cache_render.py).
+VERSION_DISENO = 3
+
+# Motores de renderizado de las fichas: tablas de platypus o dibujo directo en el
+# canvas; `lista` no dibuja fichas sino una lista de precios compacta (lista_precios.py)
+MOTOR_PLATYPUS = "platypus"
+MOTOR_RAPIDO = "rapido"
+MOTOR_LISTA = "lista"
+MOTORES = (MOTOR_PLATYPUS, MOTOR_RAPIDO, MOTOR_LISTA)
+
+TITULO_CATALOGO = "Tesla SAS - Catálogo de Productos"
+
+# Longitud máxima de la descripción en la ficha del PDF
+DESCRIPCION_MAX = 250
+
+# Valores ya formateados tal como se muestran en la ficha; `codigo` puede ser None
+TextosFicha = namedtuple("TextosFicha", "nombre marca categoria codigo precio stock descripcion destacado")
+
+def ancla_producto(codigo: str) -> str:
+    """Nombre del destino de la ficha (enlaces del índice del PDF, `id` en HTML)."""
+    return f"prod_{codigo.replace(' ', '_')}"
+
+def texto_precio(precio) -> str:
+    """Precio tal como se muestra en la ficha, p. ej. "$1234.50"."""
+    return f"${precio:.2f}" if precio is not None else "N/A"
+
+def textos_ficha(producto_obj) -> TextosFicha:
+    """Textos de la ficha de un `models.Producto` o `crud.ProductoLigero`."""
+    categoria = producto_obj.categoria.nombre if producto_obj.categoria else "N/A"
+    if producto_obj.subcategoria:
+        categoria += f" > {producto_obj.subcategoria.nombre}"
+    return TextosFicha(
+        producto_obj.nombre or 'Nombre no disponible',
+        producto_obj.marca.nombre if producto_obj.marca else "N/A",
+        categoria,
+        producto_obj.codigo,
+        texto_precio(producto_obj.precio),
+        str(producto_obj.stock) if producto_obj.stock is not None else "N/A",
+        producto_obj.descripcion or 'Descripción no disponible.',
+        bool(producto_obj.destacado),
+    )
+
+def recortar_descripcion(descripcion: str, maximo: int = DESCRIPCION_MAX) -> str:
+    """Descripción recortada a `maximo` caracteres (con "...") para la ficha del PDF."""
+    return descripcion if len(descripcion) <= maximo else descripcion[:maximo - 3] + "..."
@@ -0,0 +1,170 @@
+"""Generación del catálogo por tramos con puntos de control, reanudable tras una interrupción.
+
+Un catálogo muy grande puede tardar horas en generarse en un solo documento, y
+si el proceso muere (memoria, despliegue, un corte de la base de datos) hay que
+empezar de cero. Aquí el catálogo se genera como en el modo paralelo
+(`pdf_paralelo`): el índice y tramos de `PRODUCTOS_POR_TRAMO` productos
+consecutivos por rango de id, que después se unen en un único PDF. Cada tramo
+se escribe en `REANUDABLE_DIR` y, en cuanto termina, se anota en
+`manifiesto.json` con su rango de ids, su número de páginas y sus anclas.
+
+`main.py --reanudar` (o `--resume`) lee el manifiesto, renderiza sólo los
+tramos que faltan y hace la unión final, con el motor y las imágenes con que se
+empezó. Los rangos se toman del manifiesto, así
+que el orden de los productos y la numeración de las páginas son los mismos que
+en una ejecución sin interrupciones. Si los datos (`crud.obtener_huella_catalogo`)
+o el diseño cambiaron desde que se empezó, los tramos ya hechos no sirven y se
+empieza de nuevo. Al terminar se borran los tramos y el manifiesto.
+"""
+
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+from config import INDICE_COLUMNAS, INDICE_NUMEROS_PAGINA, REANUDABLE_DIR
+import crud
+import database
+from formato_ficha import MOTOR_PLATYPUS, VERSION_DISENO
+import pdf_paralelo
+
+log = logging.getLogger(__name__)
+
+VERSION_MANIFIESTO = 2
+
+def _ruta_manifiesto(directorio: str) -> str:
+    return os.path.join(directorio, "manifiesto.json")
+
+def leer_manifiesto(directorio: str = REANUDABLE_DIR) -> Optional[dict]:
+    """Manifiesto de la generación interrumpida en `directorio`, o None si no hay ninguna."""
+    try:
+        with open(_ruta_manifiesto(directorio), encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifiesto if manifiesto.get("version") == VERSION_MANIFIESTO else None
+
+def _guardar_manifiesto(directorio: str, manifiesto: dict):
+    # Reemplazo atómico: una interrupción deja el manifiesto anterior o el nuevo, nunca uno a medias
+    ruta = _ruta_manifiesto(directorio)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta + ".tmp", ruta)
+
+def _opciones_diseno() -> list:
+    return [VERSION_DISENO, INDICE_COLUMNAS, INDICE_NUMEROS_PAGINA]
+
+def _manifiesto_valido(manifiesto: dict, huella: str) -> bool:
+    if manifiesto["huella"] != huella:
+        log.warning("Los datos cambiaron desde que empezó la generación interrumpida; se empieza de nuevo.")
+        return False
+    if manifiesto["diseno"] != _opciones_diseno():
+        log.warning("El diseño o el índice cambiaron desde que empezó la generación interrumpida; "
+                    "se empieza de nuevo.")
+        return False
+    return True
+
+def _renderizar(directorio: str, manifiesto: dict, pendientes: list, num_procesos: int):
+    """Renderiza el índice (si falta) y los tramos `pendientes`, anotando cada uno al terminar."""
+    trabajos = {} # Número de tramo (None para el índice) -> (función, argumentos...)
+    if manifiesto["indice"] is None:
+        trabajos[None] = (pdf_paralelo._renderizar_indice, os.path.join(directorio, "indice.pdf"))
+    for n in pendientes:
+        desde, hasta = manifiesto["rangos"][n]
+        trabajos[n] = (pdf_paralelo._renderizar_tramo, os.path.join(directorio, f"tramo_{n:05d}.pdf"),
+                       desde, hasta, manifiesto["con_imagenes"], manifiesto["motor"])
+
+    def anotar(n, resultado: tuple):
+        if n is None:
+            ruta, *datos = resultado
+            manifiesto["indice"] = [os.path.basename(ruta), *datos]
+        else:
+            (ruta, *datos), faltantes = resultado
+            manifiesto["tramos"][str(n)] = [os.path.basename(ruta), *datos]
+            manifiesto["faltantes"][str(n)] = faltantes # Imágenes sustituidas por el marcador en el tramo
+            log.info(f"Tramo {n + 1} de {len(manifiesto['rangos'])} terminado "
+                     f"({len(manifiesto['tramos'])} hechos).")
+        _guardar_manifiesto(directorio, manifiesto)
+
+    if num_procesos <= 1:
+        for n, (funcion, *argumentos) in trabajos.items():
+            anotar(n, funcion(*argumentos))
+        return
+    with ProcessPoolExecutor(max_workers=num_procesos, initializer=pdf_paralelo._inicializar_proceso) as pool:
+        futuros = {pool.submit(funcion, *argumentos): n for n, (funcion, *argumentos) in trabajos.items()}
+        error = None
+        for futuro in as_completed(futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e: # Se anotan los demás tramos antes de relanzarlo
+                error = error or e
+                continue
+            anotar(futuros[futuro], resultado)
+    if error:
+        raise error
+
+def generar_catalogo_pdf_reanudable(nombre_archivo: str, directorio: str = REANUDABLE_DIR, reanudar: bool = False,
+                                    num_procesos: int = 1,
+                                    productos_por_tramo: int = pdf_paralelo.PRODUCTOS_POR_TRAMO,
+                                    con_imagenes: bool = False, motor: str = MOTOR_PLATYPUS) -> Optional[dict]:
+    """
+    Genera el catálogo por tramos, guardando cada tramo y el manifiesto en
+    `directorio` a medida que terminan (con `num_procesos > 1`, en un pool de
+    procesos). Con `reanudar=True` continúa la generación interrumpida que haya
+    en `directorio`, con su motor y sus imágenes, si los datos no han cambiado.
+    Devuelve None si no se escribió `nombre_archivo`; si no, las opciones con que
+    se generó, `{"motor", "con_imagenes"}` (al reanudar, las del manifiesto), y
+    `"faltantes"`, las imágenes sustituidas por el marcador de posición en todos los tramos.
+    """
+    db = database.SessionLectura()
+    try:
+        huella = crud.obtener_huella_catalogo(db)
+        manifiesto = leer_manifiesto(directorio) if reanudar else None
+        if manifiesto is not None and not _manifiesto_valido(manifiesto, huella):
+            manifiesto = None
+        if manifiesto is None:
+            ids = [fila.id for fila in crud.obtener_resumen_productos(db)]
+    finally:
+        db.close()
+
+    if manifiesto is None:
+        if reanudar:
+            log.warning(f"No hay una generación interrumpida que reanudar en {directorio}; se empieza de nuevo.")
+        if not ids:
+            log.warning("No se encontraron productos para generar el catálogo.")
+            return None
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.makedirs(directorio)
+        manifiesto = {"version": VERSION_MANIFIESTO, "huella": huella, "diseno": _opciones_diseno(),
+                      "motor": motor, "con_imagenes": con_imagenes,
+                      "rangos": pdf_paralelo._repartir_en_tramos(ids, productos_por_tramo),
+                      "indice": None, "tramos": {}, "faltantes": {}}
+        _guardar_manifiesto(directorio, manifiesto)
+    elif (manifiesto["motor"], manifiesto["con_imagenes"]) != (motor, con_imagenes):
+        log.info(f"Se reanuda con las opciones con que se empezó: motor '{manifiesto['motor']}', "
+                 f"{'con' if manifiesto['con_imagenes'] else 'sin'} imágenes.")
+
+    # Un tramo anotado cuyo archivo falta (borrado a mano) se vuelve a renderizar
+    existe = lambda anotado: os.path.exists(os.path.join(directorio, anotado[0]))
+    manifiesto["tramos"] = {n: anotado for n, anotado in manifiesto["tramos"].items() if existe(anotado)}
+    if manifiesto["indice"] and not existe(manifiesto["indice"]):
+        manifiesto["indice"] = None
+    pendientes = [n for n in range(len(manifiesto["rangos"])) if str(n) not in manifiesto["tramos"]]
+    log.info(f"Generación por tramos en {directorio}: {len(manifiesto['rangos']) - len(pendientes)} de "
+             f"{len(manifiesto['rangos'])} tramos ya hechos; se renderizan {len(pendientes)}.")
+    _renderizar(directorio, manifiesto, pendientes, num_procesos)
+
+    archivo_indice, *datos_indice = manifiesto["indice"]
+    tramos = [(os.path.join(directorio, archivo), *datos)
+              for archivo, *datos in (manifiesto["tramos"][str(n)] for n in range(len(manifiesto["rangos"])))]
+    log.info(f"Uniendo {len(tramos)} tramos en {nombre_archivo}...")
+    total_paginas = pdf_paralelo.unir_tramos(nombre_archivo, (os.path.join(directorio, archivo_indice),
+                                                              *datos_indice), tramos)
+    shutil.rmtree(directorio, ignore_errors=True)
+    log.info(f"PDF '{nombre_archivo}' generado exitosamente ({total_paginas} páginas).")
+    return {"motor": manifiesto["motor"], "con_imagenes": manifiesto["con_imagenes"],
+            "faltantes": sum(manifiesto["faltantes"].get(str(n), 0) for n in range(len(manifiesto["rangos"])))}
@@ -0,0 +1,210 @@
+"""Carga de imágenes de producto para el catálogo.
+
+`CargadorImagenes` resuelve `Producto.imagen_url` (rutas locales relativas a
+`IMG_DIR` o absolutas, `file://` y `http(s)://`) en un pool de hilos acotado,
+reduce cada imagen una sola vez a la resolución de impresión de la ficha y guarda
+la miniatura en una caché en disco bajo `IMG_DIR`, con el nombre derivado del hash
+del contenido original. El renderizador recibe miniaturas listas para incrustar.
+
+Las imágenes lentas o inexistentes no bloquean el build: el renderizador espera
+cada imagen como mucho `IMG_ESPERA_MAX` segundos y, en total, no más de
+`IMG_PRESUPUESTO_ESPERA`; si no llega a tiempo se usa el marcador de posición
+(la descarga sigue en segundo plano y queda en caché para la próxima ejecución).
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Iterable, Iterator, Optional
+
+from PIL import Image as PILImage
+
+from config import (IMG_DIR, IMG_MAX_HILOS, IMG_TIMEOUT, IMG_ESPERA_MAX, IMG_PRESUPUESTO_ESPERA,
+                    IMG_DPI, IMG_ANCHO_MAX, IMG_ALTO_MAX)
+
+# Ruta del archivo de miniatura y tamaño de impresión en puntos
+MiniaturaProducto = namedtuple("MiniaturaProducto", "ruta ancho alto")
+
+log = logging.getLogger(__name__)
+
+TAMANO_MAX_ORIGEN = 20 * 2**20 # No descargar imágenes de más de 20 MiB
+
+class CargadorImagenes:
+    """Resuelve, reduce y cachea en disco las imágenes de producto en segundo plano."""
+
+    def __init__(self, directorio_cache: str = os.path.join(IMG_DIR, "miniaturas"),
+                 max_hilos: int = IMG_MAX_HILOS, timeout: float = IMG_TIMEOUT,
+                 espera_max: float = IMG_ESPERA_MAX, presupuesto_espera: float = IMG_PRESUPUESTO_ESPERA,
+                 ancho_max: float = IMG_ANCHO_MAX, alto_max: float = IMG_ALTO_MAX, dpi: int = IMG_DPI):
+        self.directorio_cache = directorio_cache
+        self.timeout = timeout
+        self.espera_max = espera_max
+        self.presupuesto_espera = presupuesto_espera
+        self.ancho_max = ancho_max
+        self.alto_max = alto_max
+        self.dpi = dpi
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="imagenes")
+        self._futuros = {}
+        self._lock = threading.Lock()
+        self._ruta_indice = os.path.join(directorio_cache, "indice.json")
+        self._indice = self._cargar_indice()
+        self.estadisticas = {"cache": 0, "procesadas": 0, "fallidas": 0, "sin_tiempo": 0}
+        os.makedirs(directorio_cache, exist_ok=True)
+
+    # --- API para el renderizador ---
+    def solicitar(self, url: Optional[str]):
+        """Encola la carga de `url` si no se había pedido ya."""
+        if not url:
+            return
+        with self._lock:
+            if url not in self._futuros:
+                self._futuros[url] = self._pool.submit(self._procesar, url)
+
+    def anticipar(self, productos: Iterable, ventana: int = 64) -> Iterator:
+        """
+        Devuelve los mismos productos, pidiendo las imágenes de los `ventana`
+        siguientes antes de entregar cada uno, para solapar descargas y layout.
+        """
+        pendientes = deque()
+        for producto_obj in productos:
+            self.solicitar(producto_obj.imagen_url)
+            pendientes.append(producto_obj)
+            if len(pendientes) > ventana:
+                yield pendientes.popleft()
+        yield from pendientes
+
+    def obtener(self, url: Optional[str]) -> Optional[MiniaturaProducto]:
+        """Devuelve la miniatura de `url`, o None si no existe o no llegó a tiempo."""
+        if not url:
+            return None
+        self.solicitar(url)
+        futuro = self._futuros[url]
+        espera = min(self.espera_max, max(self.presupuesto_espera, 0.0))
+        inicio = time.perf_counter()
+        try:
+            return futuro.result(timeout=espera)
+        except TimeoutError:
+            self._contar("sin_tiempo")
+            return None
+        finally:
+            self.presupuesto_espera -= time.perf_counter() - inicio
+
+    def cerrar(self):
+        """Guarda el índice de la caché y libera el pool sin esperar descargas pendientes."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            # Otros procesos (modo paralelo) pueden haber guardado entradas entretanto
+            indice = self._cargar_indice()
+            indice.update(self._indice)
+            self._indice = indice
+            temporal = f"{self._ruta_indice}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self._indice, f)
+            os.replace(temporal, self._ruta_indice)
+
+    def _contar(self, clave: str):
+        with self._lock:
+            self.estadisticas[clave] += 1
+
+    def faltantes(self) -> int:
+        """Imágenes que se sustituyeron por el marcador de posición: no disponibles o sin llegar a tiempo."""
+        return self.estadisticas["fallidas"] + self.estadisticas["sin_tiempo"]
+
+    def informe(self) -> str:
+        e = self.estadisticas
+        return (f"Imágenes: {e['cache']} desde caché, {e['procesadas']} procesadas, "
+                f"{e['fallidas']} no disponibles, {e['sin_tiempo']} sin llegar a tiempo.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # --- Trabajo en los hilos ---
+    def _cargar_indice(self) -> dict:
+        try:
+            with open(self._ruta_indice, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _ruta_local(self, url: str) -> Optional[str]:
+        """Ruta en disco para URLs locales (`file://`, absolutas o relativas a IMG_DIR)."""
+        partes = urllib.parse.urlparse(url)
+        if partes.scheme == "file":
+            return urllib.request.url2pathname(partes.path)
+        if partes.scheme in ("http", "https"):
+            return None
+        if os.path.isabs(url) or os.path.exists(url):
+            return url
+        return os.path.join(IMG_DIR, url)
+
+    def _leer_origen(self, url: str, ruta_local: Optional[str]) -> bytes:
+        if ruta_local is not None:
+            with open(ruta_local, "rb") as f:
+                return f.read(TAMANO_MAX_ORIGEN)
+        with urllib.request.urlopen(url, timeout=self.timeout) as respuesta:
+            return respuesta.read(TAMANO_MAX_ORIGEN)
+
+    def _procesar(self, url: str) -> Optional[MiniaturaProducto]:
+        try:
+            ruta_local = self._ruta_local(url)
+            # Las imágenes locales se revalidan por fecha y tamaño; las remotas no
+            validador = None
+            if ruta_local is not None:
+                estado = os.stat(ruta_local)
+                validador = f"{estado.st_mtime_ns}:{estado.st_size}"
+
+            with self._lock:
+                entrada = self._indice.get(url)
+            if entrada and entrada["validador"] == validador and os.path.exists(entrada["ruta"]):
+                self._contar("cache")
+                return MiniaturaProducto(entrada["ruta"], entrada["ancho"], entrada["alto"])
+
+            datos = self._leer_origen(url, ruta_local)
+            miniatura = self._crear_miniatura(datos)
+            with self._lock:
+                self._indice[url] = {"validador": validador, "ruta": miniatura.ruta,
+                                     "ancho": miniatura.ancho, "alto": miniatura.alto}
+            self._contar("procesadas")
+            return miniatura
+        except Exception as e:
+            log.warning(f"Imagen no disponible ({url}): {e}")
+            self._contar("fallidas")
+            return None
+
+    def _crear_miniatura(self, datos: bytes) -> MiniaturaProducto:
+        """Reduce la imagen al tamaño máximo de la ficha a `dpi` y la guarda por hash de contenido."""
+        parametros = f"{self.ancho_max}x{self.alto_max}@{self.dpi}".encode()
+        clave = hashlib.sha256(datos + parametros).hexdigest()
+        ruta = os.path.join(self.directorio_cache, clave[:2], clave + ".jpg")
+
+        if os.path.exists(ruta):
+            with PILImage.open(ruta) as existente:
+                ancho_px, alto_px = existente.size
+        else:
+            with PILImage.open(io.BytesIO(datos)) as imagen:
+                imagen.thumbnail((round(self.ancho_max * self.dpi / 72), round(self.alto_max * self.dpi / 72)))
+                if imagen.mode in ("RGBA", "LA", "P"):
+                    imagen = imagen.convert("RGBA")
+                    fondo = PILImage.new("RGB", imagen.size, "white")
+                    fondo.paste(imagen, mask=imagen.getchannel("A"))
+                    imagen = fondo
+                elif imagen.mode != "RGB":
+                    imagen = imagen.convert("RGB")
+                ancho_px, alto_px = imagen.size
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                temporal = f"{ruta}.{threading.get_ident()}.tmp"
+                imagen.save(temporal, "JPEG", quality=85, optimize=True)
+                os.replace(temporal, ruta)
+
+        return MiniaturaProducto(ruta, ancho_px * 72 / self.dpi, alto_px * 72 / self.dpi)
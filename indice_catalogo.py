@@ -0,0 +1,171 @@
+"""Índice del catálogo maquetado por páginas, en una o varias columnas.
+
+Antes el índice era una única `Table` con una fila por producto, que platypus
+volvía a medir y partir página tras página (coste que crece mal con el número de
+filas). Aquí las entradas se maquetan una sola vez con métricas de fuente
+cacheadas y se consumen en streaming: `SeccionIndice` toma del iterador sólo las
+entradas que caben en la página actual, entrega una `PaginaIndice` y deja el resto
+para la siguiente, así que el coste es lineal y la memoria no depende del tamaño
+del catálogo.
+
+Con `con_numeros=True` cada entrada muestra a la derecha la página real de la
+ficha. Ese número todavía no se conoce al dibujar el índice, así que la entrada
+llama a `canvas.numero_pagina_ancla(...)`: `pdf_utils.CanvasNumerosIndice` dibuja
+un formulario (XObject) que rellena al guardar el PDF, cuando ya sabe en qué
+página quedó cada ancla, y `pdf_utils.CanvasEnlacesDiferidos` registra la posición
+para estamparlo después de unir los tramos.
+"""
+
+from collections import namedtuple
+from typing import Iterable, List
+
+from reportlab.lib.colors import black, blue
+from reportlab.lib.units import inch
+from reportlab.platypus import Flowable
+
+from formato_ficha import ancla_producto
+from pdf_utils import STYLE_INDEX_ENTRY_FLUJO
+from render_rapido import MetricasTexto
+
+FUENTE = STYLE_INDEX_ENTRY_FLUJO.fontName
+TAMANO = STYLE_INDEX_ENTRY_FLUJO.fontSize
+INTERLINEADO = STYLE_INDEX_ENTRY_FLUJO.leading
+SANGRIA = STYLE_INDEX_ENTRY_FLUJO.leftIndent
+ESPACIO_ANTES = STYLE_INDEX_ENTRY_FLUJO.spaceBefore
+ESPACIO_COLUMNAS = 0.25 * inch
+ANCHO_NUMERO = 0.5 * inch # Reservado a la derecha de cada columna para el número de página
+
+# `lineas` es una lista de líneas, cada una una lista de `(x, texto, color)`
+EntradaIndice = namedtuple("EntradaIndice", "lineas altura ancla")
+
+def maquetar_entrada(fila, ancho_columna: float, metricas: MetricasTexto, con_numeros: bool) -> EntradaIndice:
+    """
+    Maqueta la entrada "Nombre - CODIGO" (código en azul) de un producto o de una
+    fila de `crud.obtener_resumen_productos`; sólo se usan `nombre` y `codigo`.
+    """
+    nombre = fila.nombre or "Producto sin nombre"
+    ancla = ancla_producto(fila.codigo) if fila.codigo else None
+    palabras = [(p, black) for p in f"{nombre} -".split()] + [(p, blue) for p in (fila.codigo or "N/A").split()]
+    ancho_max = ancho_columna - SANGRIA - (ANCHO_NUMERO if con_numeros else 0)
+
+    espacio = metricas.ancho(" ", FUENTE, TAMANO)
+    lineas, linea, x = [], [], 0.0
+    for texto, color in palabras:
+        ancho = metricas.ancho(texto, FUENTE, TAMANO)
+        if linea and x + espacio + ancho > ancho_max:
+            lineas.append(linea)
+            linea, x = [], 0.0
+        if linea:
+            x += espacio
+        # Las palabras seguidas del mismo color se dibujan con un solo drawString
+        if linea and linea[-1][2] == color:
+            linea[-1] = (linea[-1][0], f"{linea[-1][1]} {texto}", color)
+        else:
+            linea.append((x, texto, color))
+        x += ancho
+    lineas.append(linea)
+    return EntradaIndice(lineas, ESPACIO_ANTES + len(lineas) * INTERLINEADO, ancla)
+
+class PaginaIndice(Flowable):
+    """Flowable con las entradas del índice de una página, ya repartidas en columnas."""
+
+    def __init__(self, columnas: List[List[EntradaIndice]], ancho_columna: float, con_numeros: bool):
+        super().__init__()
+        self.columnas = columnas
+        self.ancho_columna = ancho_columna
+        self.con_numeros = con_numeros
+        self.altura = max(sum(e.altura for e in columna) for columna in columnas)
+
+    def wrap(self, availWidth, availHeight):
+        return availWidth, self.altura
+
+    def draw(self):
+        canv = self.canv
+        canv.setFont(FUENTE, TAMANO)
+        for n, columna in enumerate(self.columnas):
+            x_columna = n * (self.ancho_columna + ESPACIO_COLUMNAS)
+            y = self.altura
+            for entrada in columna:
+                y -= ESPACIO_ANTES
+                for k, linea in enumerate(entrada.lineas):
+                    base = y - TAMANO - k * INTERLINEADO
+                    for x, texto, color in linea:
+                        canv.setFillColor(color)
+                        canv.drawString(x_columna + SANGRIA + x, base, texto)
+                y_inferior = y - len(entrada.lineas) * INTERLINEADO
+                if entrada.ancla:
+                    canv.linkRect("", entrada.ancla, (x_columna + SANGRIA, y_inferior, x_columna + self.ancho_columna, y),
+                                  relative=1)
+                    if self.con_numeros:
+                        canv.numero_pagina_ancla(entrada.ancla, x_columna + self.ancho_columna, y - TAMANO,
+                                                 FUENTE, TAMANO)
+                y = y_inferior
+        canv.setFillColor(black)
+
+class SeccionIndice(Flowable):
+    """
+    Resto del índice pendiente de colocar. En cada página platypus la parte
+    (`split`) en una `PaginaIndice` con las entradas que caben y una nueva
+    `SeccionIndice` con las siguientes, que se siguen leyendo de `filas`.
+
+    Se asume el mismo ancho de frame en todas las páginas (como en
+    `SimpleDocTemplate`): las entradas pendientes se maquetaron con ese ancho.
+    """
+
+    def __init__(self, filas: Iterable, columnas: int = 1, con_numeros: bool = True, pendientes=None,
+                 metricas: MetricasTexto = None):
+        super().__init__()
+        self._filas = iter(filas)
+        self.num_columnas = max(1, columnas)
+        self.con_numeros = con_numeros
+        self._pendientes = pendientes or []
+        self._metricas = metricas or MetricasTexto()
+        self._pagina = None
+
+    def _ancho_columna(self, availWidth: float) -> float:
+        return (availWidth - (self.num_columnas - 1) * ESPACIO_COLUMNAS) / self.num_columnas
+
+    def _repartir(self, availWidth: float, availHeight: float):
+        """Reparte las entradas en columnas de `availHeight`; devuelve `(columnas, colocadas, completo)`."""
+        ancho_columna = self._ancho_columna(availWidth)
+        columnas, altura, i = [[]], 0.0, 0
+        while True:
+            if i == len(self._pendientes):
+                fila = next(self._filas, None)
+                if fila is None:
+                    return columnas, i, True
+                self._pendientes.append(maquetar_entrada(fila, ancho_columna, self._metricas, self.con_numeros))
+            entrada = self._pendientes[i]
+            if altura + entrada.altura > availHeight:
+                if columnas[-1] and len(columnas) < self.num_columnas:
+                    columnas.append([])
+                    altura = 0.0
+                # Sólo en un frame vacío se coloca una entrada que no cabe, para no quedarse sin avanzar
+                en_frame_vacio = not i and getattr(getattr(self, "_frame", None), "_atTop", False)
+                if altura + entrada.altura > availHeight and not en_frame_vacio:
+                    return columnas, i, False
+            columnas[-1].append(entrada)
+            altura += entrada.altura
+            i += 1
+
+    def wrap(self, availWidth, availHeight):
+        columnas, colocadas, completo = self._repartir(availWidth, availHeight)
+        if not completo or not colocadas:
+            self._pagina = None
+            return availWidth, availHeight + 1 # No cabe: platypus llamará a split
+        self._pagina = PaginaIndice(columnas, self._ancho_columna(availWidth), self.con_numeros)
+        return availWidth, self._pagina.altura
+
+    def split(self, availWidth, availHeight):
+        columnas, colocadas, completo = self._repartir(availWidth, availHeight)
+        if not colocadas:
+            return []
+        partes = [PaginaIndice(columnas, self._ancho_columna(availWidth), self.con_numeros)]
+        if not completo:
+            partes.append(SeccionIndice(self._filas, self.num_columnas, self.con_numeros,
+                                        self._pendientes[colocadas:], self._metricas))
+        return partes
+
+    def draw(self):
+        self._pagina.canv = self.canv
+        self._pagina.draw()
@@ -0,0 +1,199 @@
+"""Instrumentación de la generación del catálogo: fases, contadores y tiempos por ficha.
+
+`Perfil` mide tiempos exclusivos por fase: al entrar en una fase anidada se pausa
+la exterior, de modo que en el modo perezoso, donde la consulta, la construcción
+del story y el layout se intercalan, cada segundo se atribuye a una sola fase y
+la suma de las fases es el tiempo total. Las fases habituales son:
+
+* `consulta`: lectura de productos (`crud`);
+* `story`: creación de flowables (`pdf_utils`, `render_rapido`, `indice_catalogo`);
+* `layout`: `doc.build` sin lo anterior (wrap/split/draw de platypus);
+* `escritura`: `canvas.save()`, que serializa y escribe el PDF.
+
+Además cuenta productos, páginas y bytes, y registra por ficha el tiempo de
+maquetación (wrap/split) y de dibujo, conservando sólo las más lentas. `informe()`
+devuelve un diccionario listo para volcar a JSON.
+"""
+
+import heapq
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from reportlab.platypus import Flowable
+
+log = logging.getLogger(__name__)
+
+FICHAS_EN_CURSO = 32 # Fichas recientes aún abiertas (una ficha partida se dibuja en varias páginas)
+
+class Perfil:
+    """Tiempos por fase, contadores y tiempos por ficha de una generación."""
+
+    def __init__(self, fichas_lentas: int = 20):
+        self.fases = {}
+        self.contadores = {}
+        self._pila = [] # [nombre, inicio del tramo actual]
+        self._inicio = time.perf_counter()
+        self._fichas_lentas = fichas_lentas
+        self._en_curso = OrderedDict() # clave -> [maquetar, dibujar]
+        self._lentas = [] # montículo de (total, clave, maquetar, dibujar)
+        self._fichas = {"num": 0, "maquetar": 0.0, "dibujar": 0.0}
+
+    # --- Fases ---
+    def _acumular_tramo(self, ahora: float):
+        if self._pila:
+            nombre, inicio = self._pila[-1]
+            self.fases[nombre] = self.fases.get(nombre, 0.0) + ahora - inicio
+
+    @contextmanager
+    def fase(self, nombre: str):
+        """Atribuye a `nombre` el tiempo del bloque, sin contar sus fases anidadas."""
+        ahora = time.perf_counter()
+        self._acumular_tramo(ahora)
+        self._pila.append([nombre, ahora])
+        try:
+            yield
+        finally:
+            ahora = time.perf_counter()
+            self._acumular_tramo(ahora)
+            self._pila.pop()
+            if self._pila:
+                self._pila[-1][1] = ahora
+
+    def medir_iterador(self, iterable: Iterable, nombre: str) -> Iterator:
+        """Devuelve los mismos elementos, atribuyendo a `nombre` el tiempo de obtener cada uno."""
+        iterador = iter(iterable)
+        while True:
+            with self.fase(nombre):
+                try:
+                    elemento = next(iterador)
+                except StopIteration:
+                    return
+            yield elemento
+
+    # --- Contadores ---
+    def contar(self, nombre: str, cantidad: int = 1):
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def contar_iterador(self, iterable: Iterable, nombre: str) -> Iterator:
+        """Devuelve los mismos elementos, sumando uno a `nombre` por cada uno."""
+        for elemento in iterable:
+            self.contar(nombre)
+            yield elemento
+
+    # --- Fichas ---
+    def registrar_ficha(self, clave: str, maquetar: float = 0.0, dibujar: float = 0.0):
+        """Suma tiempos de maquetación y dibujo a la ficha `clave`."""
+        tiempos = self._en_curso.get(clave)
+        if tiempos is None:
+            tiempos = self._en_curso[clave] = [0.0, 0.0]
+            while len(self._en_curso) > FICHAS_EN_CURSO:
+                self._cerrar_ficha(*self._en_curso.popitem(last=False))
+        tiempos[0] += maquetar
+        tiempos[1] += dibujar
+
+    def _cerrar_ficha(self, clave: str, tiempos):
+        maquetar, dibujar = tiempos
+        self._fichas["num"] += 1
+        self._fichas["maquetar"] += maquetar
+        self._fichas["dibujar"] += dibujar
+        entrada = (maquetar + dibujar, clave, maquetar, dibujar)
+        if len(self._lentas) < self._fichas_lentas:
+            heapq.heappush(self._lentas, entrada)
+        elif entrada > self._lentas[0]:
+            heapq.heapreplace(self._lentas, entrada)
+
+    def envolver_canvas(self, canvasmaker):
+        """Subclase de `canvasmaker` que cuenta páginas y mide `save()` como `escritura`."""
+        perfil = self
+
+        class CanvasPerfilado(canvasmaker):
+            def showPage(self):
+                perfil.contar("paginas")
+                super().showPage()
+
+            def save(self):
+                with perfil.fase("escritura"):
+                    super().save()
+
+        return CanvasPerfilado
+
+    # --- Informe ---
+    def informe(self) -> dict:
+        while self._en_curso:
+            self._cerrar_ficha(*self._en_curso.popitem(last=False))
+        num = self._fichas["num"]
+        return {
+            "segundos_total": round(time.perf_counter() - self._inicio, 4),
+            "fases": {nombre: round(segundos, 4) for nombre, segundos in self.fases.items()},
+            "contadores": dict(self.contadores),
+            "fichas": {
+                "num": num,
+                "maquetar_medio_ms": round(1000 * self._fichas["maquetar"] / num, 3) if num else 0.0,
+                "dibujar_medio_ms": round(1000 * self._fichas["dibujar"] / num, 3) if num else 0.0,
+                "mas_lentas": [{"ficha": clave, "maquetar_ms": round(1000 * maquetar, 3),
+                                "dibujar_ms": round(1000 * dibujar, 3)}
+                               for _, clave, maquetar, dibujar in sorted(self._lentas, reverse=True)],
+            },
+        }
+
+    def guardar(self, ruta: str):
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.informe(), f, indent=2, ensure_ascii=False)
+        log.info(f"Informe de rendimiento guardado en {ruta}")
+
+    def resumen(self) -> str:
+        informe = self.informe()
+        fases = ", ".join(f"{nombre} {segundos:.2f} s" for nombre, segundos in informe["fases"].items())
+        contadores = ", ".join(f"{nombre} {valor}" for nombre, valor in informe["contadores"].items())
+        return f"Tiempos: {fases}. Contadores: {contadores}."
+
+def clave_ficha(producto_obj) -> str:
+    """Identificador legible de una ficha para el informe."""
+    return producto_obj.codigo or f"id {producto_obj.id}"
+
+class FlowablePerfilado(Flowable):
+    """
+    Envuelve el flowable de una ficha y atribuye a `clave` el tiempo de sus
+    wrap/split (maquetación) y de su dibujo. Las partes de un split se envuelven
+    igual, así que una ficha partida entre páginas acumula todo su coste.
+    """
+
+    def __init__(self, contenido: Flowable, clave: str, perfil: Perfil):
+        super().__init__()
+        self.contenido = contenido
+        self.clave = clave
+        self.perfil = perfil
+        self.hAlign = getattr(contenido, "hAlign", "LEFT")
+
+    def wrap(self, availWidth, availHeight):
+        inicio = time.perf_counter()
+        self.width, self.height = self.contenido.wrapOn(getattr(self, "canv", None), availWidth, availHeight)
+        self.perfil.registrar_ficha(self.clave, maquetar=time.perf_counter() - inicio)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        inicio = time.perf_counter()
+        partes = self.contenido.splitOn(getattr(self, "canv", None), availWidth, availHeight)
+        self.perfil.registrar_ficha(self.clave, maquetar=time.perf_counter() - inicio)
+        return [FlowablePerfilado(parte, self.clave, self.perfil) for parte in partes]
+
+    def getSpaceBefore(self):
+        return self.contenido.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self.contenido.getSpaceAfter()
+
+    def draw(self):
+        inicio = time.perf_counter()
+        self.contenido.drawOn(self.canv, 0, 0)
+        self.perfil.registrar_ficha(self.clave, dibujar=time.perf_counter() - inicio)
+
+def contar_bytes(perfil: Perfil, ruta):
+    """Suma a `bytes_pdf` el tamaño del archivo `ruta` (si es una ruta y no un búfer)."""
+    if perfil and isinstance(ruta, str) and os.path.exists(ruta):
+        perfil.contar("bytes_pdf", os.path.getsize(ruta))
@@ -0,0 +1,101 @@
+"""Lectura de productos en un hilo aparte, solapada con la maquetación del PDF.
+
+En el modo streaming, cada bloque de productos se lee de la base de datos cuando
+la maquetación lo pide, así que el tiempo total es la suma de ambos. Con
+`leer_en_segundo_plano` un hilo productor lee los productos con su propia sesión
+y los deja, en bloques de `FETCH_CHUNK_SIZE`, en una cola de como mucho
+`LECTURA_BLOQUES_COLA` bloques; el hilo que maqueta los toma de la cola a medida
+que los necesita. Mientras la base de datos responde (red, disco) el GIL queda
+libre para la maquetación, de modo que el tiempo total se acerca al mayor de los
+dos en lugar de a su suma.
+
+Si la cola está llena el productor espera (contrapresión): en memoria hay como
+mucho `LECTURA_BLOQUES_COLA` bloques más el que se está leyendo y el que se está
+maquetando, sea cual sea el tamaño del catálogo. Los errores de lectura se
+relanzan en el hilo que consume, y si éste deja de consumir el productor se
+detiene y cierra su sesión.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+from config import FETCH_CHUNK_SIZE, LECTURA_BLOQUES_COLA
+
+log = logging.getLogger(__name__)
+
+_FIN = object()
+# Cada cuánto comprueba el productor, con la cola llena, si el consumidor terminó
+_ESPERA_COLA_LLENA = 0.1
+
+class _ErrorLectura:
+    """Excepción del productor, para relanzarla en el consumidor."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+def leer_en_segundo_plano(leer: Callable[..., Iterable], max_bloques: int = LECTURA_BLOQUES_COLA,
+                          tamano_bloque: int = FETCH_CHUNK_SIZE) -> Iterator:
+    """
+    Devuelve los productos de `leer(db)` (p. ej. `crud.iterar_productos_ligeros`),
+    leídos en un hilo aparte con una sesión propia (`database.SessionLectura`) y
+    entregados a través de una cola de como mucho `max_bloques` bloques.
+    """
+    from database import SessionLectura # Las sesiones no se comparten entre hilos
+
+    cola = queue.Queue(maxsize=max(1, max_bloques))
+    detener = threading.Event()
+    esperas = {"lectura": 0.0, "maquetacion": 0.0}
+
+    def poner(elemento) -> bool:
+        inicio = time.perf_counter()
+        try:
+            while not detener.is_set():
+                try:
+                    cola.put(elemento, timeout=_ESPERA_COLA_LLENA)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        finally:
+            esperas["lectura"] += time.perf_counter() - inicio
+
+    def producir():
+        db = SessionLectura()
+        try:
+            bloque = []
+            for producto_obj in leer(db):
+                bloque.append(producto_obj)
+                if len(bloque) >= tamano_bloque:
+                    if not poner(bloque):
+                        return
+                    bloque = []
+            if bloque and not poner(bloque):
+                return
+            poner(_FIN)
+        except BaseException as e:
+            poner(_ErrorLectura(e))
+        finally:
+            db.close()
+
+    hilo = threading.Thread(target=producir, name="lectura_productos", daemon=True)
+    hilo.start()
+    total = 0
+    try:
+        while True:
+            inicio = time.perf_counter()
+            bloque = cola.get()
+            esperas["maquetacion"] += time.perf_counter() - inicio
+            if bloque is _FIN:
+                break
+            if isinstance(bloque, _ErrorLectura):
+                raise bloque.error
+            total += len(bloque)
+            yield from bloque
+    finally:
+        detener.set()
+        hilo.join()
+        log.info(f"Lectura anticipada: {total} productos; la maquetación esperó {esperas['maquetacion']:.2f} s "
+                 f"a la base de datos y la lectura {esperas['lectura']:.2f} s por la cola llena.")
@@ -0,0 +1,234 @@
+"""Lista de precios compacta: una fila por producto, agrupada por categoría.
+
+Las fichas (`pdf_utils.generar_elemento_producto`, `render_rapido`) ocupan un
+cuarto de página cada una, así que un catálogo de 100000 productos son 25000
+páginas. La lista de precios (`pdf_utils.MOTOR_LISTA`, `python main.py --motor
+lista`) muestra en una fila código, nombre, marca, precio y stock, con los mismos
+textos que la ficha (`formato_ficha.textos_ficha`), y cabe entre 40 y 55
+productos por página. Los productos se agrupan en secciones por categoría: cada
+cambio de categoría abre una sección (con su entrada en el panel de marcadores
+del PDF) y, si una sección sigue en la página siguiente, la página empieza
+repitiendo su título con "(continuación)". Las filas sólo agrupan productos
+consecutivos: la entrada debe venir ordenada por categoría (ver
+`ordenar_por_categoria` y la clave `categoria` de `crud.ORDENES_PAGINACION`).
+
+Como el índice (`indice_catalogo`), `SeccionLista` consume los productos de un
+iterador página a página: cada fila se maqueta una vez, con los textos recortados
+a una línea con métricas de fuente cacheadas por carácter, y sólo se guardan las
+filas de la página en curso, así que el coste es lineal y la memoria no depende
+del número de productos. Las filas no llevan ancla `prod_<codigo>` ni imagen:
+con cientos de miles de productos, los destinos con nombre por sí solos
+añadirían varios MiB al PDF.
+"""
+
+import itertools
+from collections import namedtuple
+from typing import Iterable, Iterator, List
+
+from reportlab.lib.colors import Color, black
+from reportlab.lib.units import inch
+from reportlab.platypus import Flowable, Paragraph, Spacer
+
+from formato_ficha import textos_ficha
+from pdf_utils import STYLE_HEADING1, STYLE_NORMAL, STYLE_SMALL
+from render_rapido import MetricasTexto
+
+FUENTE = "Helvetica"
+FUENTE_NEGRITA = "Helvetica-Bold"
+TAMANO = 8
+ALTO_FILA = 11
+ALTO_CABECERA = 16 # Fila con los títulos de las columnas, al principio de cada página
+ALTO_SECCION = 18
+TAMANO_SECCION = 10
+RELLENO = 3 # Separación horizontal entre columnas
+GRIS_CEBRA = Color(0.93, 0.93, 0.93)
+GRIS_CABECERA = Color(0.8, 0.8, 0.8)
+
+# (título, fracción del ancho, alineada a la derecha)
+COLUMNAS = (("Código", 0.17, False), ("Producto", 0.43, False), ("Marca", 0.18, False),
+            ("Precio", 0.13, True), ("Stock", 0.09, True))
+
+# `celdas`: `(x, texto)` ya recortados y alineados; `seccion`: título de la categoría
+FilaLista = namedtuple("FilaLista", "celdas destacado seccion")
+
+def ordenar_por_categoria(productos: Iterable) -> List:
+    """Productos agrupados por categoría (por id), conservando el orden dentro de cada una."""
+    return sorted(productos, key=lambda p: p.categoria.id if p.categoria else -1)
+
+def _seccion(producto_obj) -> str:
+    return producto_obj.categoria.nombre if producto_obj.categoria else "Sin categoría"
+
+def _recortar(texto: str, fuente: str, ancho_max: float, metricas: MetricasTexto):
+    """`(texto, ancho)` de `texto` recortado con "..." para caber en `ancho_max`."""
+    anchos = [metricas.ancho(c, fuente, TAMANO) for c in texto]
+    total = sum(anchos)
+    if total <= ancho_max:
+        return texto, total
+    puntos = metricas.ancho("...", fuente, TAMANO)
+    ancho = 0.0
+    for n, ancho_caracter in enumerate(anchos):
+        if ancho + ancho_caracter + puntos > ancho_max:
+            return texto[:n].rstrip() + "...", ancho + puntos
+        ancho += ancho_caracter
+    return texto, total
+
+def _columnas(ancho_total: float) -> List[tuple]:
+    """`(x_inicio, ancho_util, a_la_derecha)` de cada columna para `ancho_total`."""
+    columnas, x = [], 0.0
+    for _, fraccion, derecha in COLUMNAS:
+        ancho = fraccion * ancho_total
+        columnas.append((x + RELLENO, ancho - 2 * RELLENO, derecha))
+        x += ancho
+    return columnas
+
+def maquetar_fila(producto_obj, columnas: List[tuple], metricas: MetricasTexto) -> FilaLista:
+    """Textos de la fila de un producto, recortados a una línea y colocados en sus columnas."""
+    textos = textos_ficha(producto_obj)
+    valores = (textos.codigo or "N/A", textos.nombre, textos.marca, textos.precio, textos.stock)
+    celdas = []
+    for n, (valor, (x, ancho, derecha)) in enumerate(zip(valores, columnas)):
+        fuente = FUENTE_NEGRITA if n == 1 and textos.destacado else FUENTE
+        texto, ancho_texto = _recortar(valor, fuente, ancho, metricas)
+        celdas.append((x + ancho - ancho_texto if derecha else x, texto))
+    return FilaLista(celdas, textos.destacado, _seccion(producto_obj))
+
+class PaginaLista(Flowable):
+    """
+    Flowable con la parte de la lista de una página: `elementos` son
+    `("seccion", titulo, clave)` (clave None en las continuaciones) y `("fila", FilaLista)`.
+    """
+
+    def __init__(self, elementos: List[tuple], columnas: List[tuple]):
+        super().__init__()
+        self.elementos = elementos
+        self.columnas = columnas
+        self.altura = ALTO_CABECERA + sum(ALTO_SECCION if e[0] == "seccion" else ALTO_FILA for e in elementos)
+
+    def wrap(self, availWidth, availHeight):
+        self.ancho = availWidth
+        return availWidth, self.altura
+
+    def draw(self):
+        canv = self.canv
+        y = self.altura
+        canv.setFillColor(GRIS_CABECERA)
+        canv.rect(0, y - ALTO_CABECERA, self.ancho, ALTO_CABECERA, stroke=0, fill=1)
+        canv.setFillColor(black)
+        canv.setFont(FUENTE_NEGRITA, TAMANO)
+        for (titulo, _, derecha), (x, ancho, _) in zip(COLUMNAS, self.columnas):
+            if derecha:
+                canv.drawRightString(x + ancho, y - ALTO_CABECERA + 5, titulo)
+            else:
+                canv.drawString(x, y - ALTO_CABECERA + 5, titulo)
+        y -= ALTO_CABECERA
+
+        fuente_actual, par = None, False
+        for elemento in self.elementos:
+            if elemento[0] == "seccion":
+                _, titulo, clave = elemento
+                canv.setFont(FUENTE_NEGRITA, TAMANO_SECCION)
+                fuente_actual = None
+                canv.drawString(RELLENO, y - ALTO_SECCION + 5, titulo if clave else f"{titulo} (continuación)")
+                if clave:
+                    canv.bookmarkHorizontal(clave, 0, y)
+                    canv.addOutlineEntry(titulo, clave, level=0)
+                canv.line(0, y - ALTO_SECCION + 2, self.ancho, y - ALTO_SECCION + 2)
+                y -= ALTO_SECCION
+                par = False
+                continue
+            fila = elemento[1]
+            if par:
+                canv.setFillColor(GRIS_CEBRA)
+                canv.rect(0, y - ALTO_FILA, self.ancho, ALTO_FILA, stroke=0, fill=1)
+                canv.setFillColor(black)
+            par = not par
+            base = y - ALTO_FILA + 3
+            for n, (x, texto) in enumerate(fila.celdas):
+                fuente = FUENTE_NEGRITA if n == 1 and fila.destacado else FUENTE
+                if fuente != fuente_actual:
+                    canv.setFont(fuente, TAMANO)
+                    fuente_actual = fuente
+                canv.drawString(x, base, texto)
+            y -= ALTO_FILA
+
+class SeccionLista(Flowable):
+    """
+    Resto de la lista pendiente de colocar. En cada página platypus la parte
+    (`split`) en una `PaginaLista` con las filas que caben y una nueva
+    `SeccionLista` con las siguientes, que se siguen leyendo de `productos`.
+
+    Como en `indice_catalogo.SeccionIndice`, se asume el mismo ancho de frame en
+    todas las páginas.
+    """
+
+    def __init__(self, productos: Iterable, pendientes=None, seccion: str = None, leidos: int = 0,
+                 metricas: MetricasTexto = None):
+        super().__init__()
+        self._productos = iter(productos)
+        self._pendientes = pendientes or []
+        self._seccion = seccion # Sección de la última fila ya colocada
+        self._leidos = leidos # Productos leídos antes de `pendientes`, para las claves de las secciones
+        self._metricas = metricas or MetricasTexto()
+        self._pagina = None
+
+    def _repartir(self, availWidth: float, availHeight: float):
+        """Elementos de la página para `availHeight`; devuelve `(columnas, elementos, colocadas, completo)`."""
+        columnas = _columnas(availWidth)
+        elementos, altura, seccion, i = [], ALTO_CABECERA, self._seccion, 0
+        while True:
+            if i == len(self._pendientes):
+                producto_obj = next(self._productos, None)
+                if producto_obj is None:
+                    return columnas, elementos, i, True
+                self._pendientes.append(maquetar_fila(producto_obj, columnas, self._metricas))
+            fila = self._pendientes[i]
+            necesario = ALTO_FILA
+            if fila.seccion != seccion or not elementos:
+                necesario += ALTO_SECCION
+            # Sólo en un frame vacío se coloca lo que no cabe, para no quedarse sin avanzar
+            en_frame_vacio = not i and getattr(getattr(self, "_frame", None), "_atTop", False)
+            if altura + necesario > availHeight and not en_frame_vacio:
+                return columnas, elementos, i, False
+            if fila.seccion != seccion:
+                elementos.append(("seccion", fila.seccion, f"seccion_{self._leidos + i}"))
+            elif not elementos:
+                elementos.append(("seccion", fila.seccion, None))
+            elementos.append(("fila", fila))
+            altura += necesario
+            seccion = fila.seccion
+            i += 1
+
+    def wrap(self, availWidth, availHeight):
+        columnas, elementos, colocadas, completo = self._repartir(availWidth, availHeight)
+        if not completo or not colocadas:
+            self._pagina = None
+            return availWidth, availHeight + 1 # No cabe: platypus llamará a split
+        self._pagina = PaginaLista(elementos, columnas)
+        return self._pagina.wrap(availWidth, availHeight)
+
+    def split(self, availWidth, availHeight):
+        columnas, elementos, colocadas, completo = self._repartir(availWidth, availHeight)
+        if not colocadas:
+            return []
+        partes = [PaginaLista(elementos, columnas)]
+        if not completo:
+            partes.append(SeccionLista(self._productos, self._pendientes[colocadas:],
+                                       self._pendientes[colocadas - 1].seccion, self._leidos + colocadas,
+                                       self._metricas))
+        return partes
+
+    def draw(self):
+        self._pagina.canv = self.canv
+        self._pagina.draw()
+
+def iterar_story_lista(productos: Iterable) -> Iterator[Flowable]:
+    """Flowables de la lista de precios: título, leyenda y una `SeccionLista` con los productos."""
+    yield Paragraph("Lista de Precios", STYLE_HEADING1)
+    yield Paragraph("Los productos destacados aparecen en negrita.", STYLE_SMALL)
+    yield Spacer(1, 0.15 * inch)
+    productos = iter(productos)
+    primero = next(productos, None)
+    if primero is None:
+        yield Paragraph("No hay productos para mostrar.", STYLE_NORMAL)
+        return
+    yield SeccionLista(itertools.chain([primero], productos))
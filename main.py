@@ -1,22 +1,286 @@
 """Punto de entrada principal para la aplicación de generación de catálogos."""
 
+import argparse
+import contextlib
+import logging
 import os
 
 # Importar configuraciones y utilidades necesarias
-from config import PDF_FILENAME, IMG_DIR
-from database import SessionLocal, get_db # Usaremos SessionLocal directamente o get_db si se prefiere como dependencia
-import crud
-import pdf_utils
+from config import (PDF_FILENAME, IMG_DIR, RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB, LOG_NIVEL, CATALOGOS_DIR,
+                    ALMACEN_DIR, ALMACEN_GENERACIONES, REANUDABLE_DIR)
+from formato_ficha import MOTOR_LISTA, MOTOR_PLATYPUS, MOTORES
+# SQLAlchemy (database, crud, almacen_catalogos) se importa al leer la base de datos,
+# así que `--help` no lo carga. ReportLab (pdf_utils, instrumentacion) y PIL (imagenes)
+# se importan al generar el PDF: las ejecuciones que terminan antes (almacén,
+# --exportar, --help) no los cargan. Las lecturas del catálogo usan `SessionLectura`.
 
-def run_catalog_generation():
+log = logging.getLogger(__name__)
+
+def run_catalog_generation(streaming: bool = False, procesos: int = 1, incremental: bool = False,
+                           con_imagenes: bool = True, motor: str = MOTOR_PLATYPUS,
+                           ruta_perfil: str = None, dividir_por: str = None, max_paginas: int = None,
+                           max_mb: float = None, directorio_salida: str = CATALOGOS_DIR, forzar: bool = False,
+                           optimizar: bool = False, linealizar: bool = False, buscar: str = None,
+                           exportar: list = None, tuberia: bool = False, variantes: list = None,
+                           snapshot: bool = False, refrescar_snapshot: bool = False, reanudable: bool = False,
+                           reanudar: bool = False):
     """
     Orquesta la generación del catálogo de productos.
+
+    Con `streaming=True` los productos se leen en bloques y el PDF se construye
+    con un story perezoso, sin cargar el catálogo completo en memoria; con
+    `tuberia=True`, además, los bloques se leen en un hilo aparte mientras se
+    maqueta el PDF (`lectura_anticipada`).
+    Con `procesos > 1` el renderizado se reparte en tramos entre varios procesos.
+    Con `incremental=True` sólo se renderizan las fichas que cambiaron desde la
+    última ejecución; el resto se toma de la caché en disco.
+    Con `reanudable=True` el catálogo se genera por tramos que se guardan en
+    `REANUDABLE_DIR` a medida que terminan, y con `reanudar=True` se continúa la
+    generación que se interrumpió, sin repetir los tramos ya hechos (ver
+    `generacion_reanudable`); `procesos` es entonces el número de procesos del pool.
+    Con `con_imagenes=False` las fichas muestran el marcador en lugar de la imagen.
+    `motor` elige cómo se dibujan las fichas (ver `formato_ficha.MOTORES`); con
+    `MOTOR_LISTA` se genera una lista de precios compacta agrupada por
+    categoría, sin índice ni imágenes, en un solo documento.
+    Con `ruta_perfil` se mide cada fase y cada ficha (`instrumentacion.Perfil`) y se
+    guarda el informe en JSON; en los modos paralelo, incremental y reanudable sólo
+    se mide la generación completa, que ocurre en otros procesos o en la caché.
+    Con `dividir_por` ("categoria" o "marca"), `max_paginas` o `max_mb` se generan
+    en `directorio_salida` varios PDF en lugar de uno (ver `catalogos_divididos`);
+    `procesos` es entonces el número de procesos del pool (por defecto, uno por núcleo).
+    Si la huella de los datos y de las opciones coincide con la de una generación
+    guardada en `ALMACEN_DIR`, se copia ese PDF en lugar de generarlo, salvo con
+    `forzar=True` (ver `almacen_catalogos`).
+    Con `optimizar=True` cada PDF se reescribe con flujos de objetos y, con
+    `linealizar=True`, linealizado para la vista web (`pdf_utils.optimizar_pdf`, requiere pikepdf).
+    Con `buscar` el catálogo sólo incluye los productos que coinciden con esa
+    búsqueda de texto completo, del más al menos relevante (`crud.buscar_productos`).
+    Con `exportar` (formatos de `exportadores.FORMATOS`) no se genera el PDF: se
+    escriben en `directorio_salida` los archivos `catalogo.<formato>` pedidos, con
+    una sola lectura de los productos (ver `run_exportacion`).
+    Con `variantes` (de `variantes_catalogo.leer_variantes`) se escribe en
+    `directorio_salida` un PDF por variante (tarifa de precio, con o sin stock,
+    sólo destacados) con una sola lectura de los productos y las fichas del motor
+    rápido; las variantes que sólo cambian de tarifa comparten el mismo dibujo (ver
+    `run_catalog_generation_variantes`).
+    Con `snapshot=True` los productos se leen de `catalogo_snapshot`, la copia
+    desnormalizada del catálogo, sin unir las tablas que usa la aplicación (ver
+    `catalogo_snapshot`); con `refrescar_snapshot=True` sólo se pone al día esa
+    copia, sin generar nada.
     """
-    print("Iniciando generador de catálogos...")
-    
-    # Crear sesión de base de datos
-    # Opción 1: Usar SessionLocal directamente
+    log.info("Iniciando generador de catálogos...")
+    from database import informe_pools
+    import almacen_catalogos
+    perfil = None
+    if ruta_perfil:
+        import instrumentacion
+        perfil = instrumentacion.Perfil()
+
+    try:
+        if refrescar_snapshot:
+            with perfil.fase("snapshot") if perfil else contextlib.nullcontext():
+                _refrescar_snapshot()
+            return
+
+        if snapshot:
+            if buscar:
+                log.warning("La búsqueda usa el índice de texto completo de productos; se ignora --snapshot.")
+                snapshot = False
+            elif not _snapshot_refrescado():
+                return
+
+        if exportar:
+            run_exportacion(exportar, directorio_salida, buscar, perfil, snapshot)
+            return
+
+        if variantes:
+            if streaming or tuberia or procesos > 1 or incremental or dividir_por or max_paginas or max_mb:
+                log.warning("Las variantes se generan en memoria, una vez cada maquetación; se ignoran --streaming, "
+                            "--tuberia, --procesos, --incremental, --dividir-por, --max-paginas y --max-mb.")
+            run_catalog_generation_variantes(variantes, directorio_salida, con_imagenes, buscar, perfil, snapshot)
+            return
+
+        if dividir_por or max_paginas or max_mb:
+            if motor == MOTOR_LISTA:
+                log.error("La lista de precios (--motor lista) no se puede dividir con --dividir-por, "
+                          "--max-paginas ni --max-mb.")
+                return
+            run_catalog_generation_dividida(dividir_por, max_paginas, max_mb, directorio_salida,
+                                            procesos if procesos > 1 else None, con_imagenes, motor, perfil,
+                                            optimizar or linealizar, linealizar, snapshot)
+            return
+
+        almacen = almacen_catalogos.AlmacenCatalogos(ALMACEN_DIR, ALMACEN_GENERACIONES)
+        huella_de = lambda motor, con_imagenes: _huella_generacion(motor, con_imagenes, optimizar or linealizar,
+                                                                   linealizar, buscar, snapshot)
+        # Una generación interrumpida se reanuda aunque el almacén tenga el PDF: si no, sus tramos se quedarían
+        # en REANUDABLE_DIR. Su huella se calcula al terminar, con el motor y las imágenes con que se empezó.
+        pendiente = reanudar and _generacion_interrumpida()
+        huella = None
+        with perfil.fase("huella") if perfil else contextlib.nullcontext():
+            if not pendiente:
+                huella = huella_de(motor, con_imagenes)
+            if huella and not forzar and almacen.restaurar(huella, PDF_FILENAME):
+                log.info(f"Los datos no han cambiado: '{PDF_FILENAME}' se copia del almacén sin generarlo.")
+                return
+
+        antes = _estado_archivo(PDF_FILENAME)
+        opciones, faltantes = _generar_pdf_unico(streaming or tuberia, procesos, incremental, con_imagenes, motor,
+                                                 perfil, buscar, tuberia, snapshot, reanudable or reanudar, reanudar)
+        # Las funciones de generación registran sus errores sin lanzarlos: sólo se procesa un PDF recién escrito
+        if _estado_archivo(PDF_FILENAME) in (None, antes):
+            return
+        if faltantes:
+            # Como en `cache_render.CacheFichas.clave`: sin sus imágenes no es el PDF de la huella
+            log.warning(f"{faltantes} imágenes no estaban disponibles o no llegaron a tiempo: "
+                        f"'{PDF_FILENAME}' no se guarda en el almacén.")
+            huella = None
+        elif pendiente or opciones != (motor, con_imagenes):
+            huella = huella_de(*opciones)
+        if optimizar or linealizar:
+            import pdf_utils
+            with perfil.fase("optimizacion") if perfil else contextlib.nullcontext():
+                if not pdf_utils.optimizar_pdf(PDF_FILENAME, linealizar):
+                    return # No se guarda en el almacén un PDF sin las optimizaciones de su huella
+        if huella:
+            almacen.guardar(huella, PDF_FILENAME)
+    finally:
+        if perfil:
+            # Los modos paralelo, incremental y reanudable no lo miden; la exportación, las variantes y el refresco no escriben ese PDF
+            if "bytes_pdf" not in perfil.contadores and not (exportar or variantes or refrescar_snapshot):
+                instrumentacion.contar_bytes(perfil, PDF_FILENAME)
+            log.info(perfil.resumen())
+            perfil.guardar(ruta_perfil)
+        log.info(informe_pools())
+
+def _huella_generacion(motor: str, con_imagenes: bool, optimizar: bool, linealizar: bool, buscar: str,
+                       snapshot: bool):
+    """`almacen_catalogos.huella_generacion` en su propia sesión; None si no se puede calcular."""
+    import almacen_catalogos
+    from database import SessionLectura
+    db = SessionLectura()
+    try:
+        return almacen_catalogos.huella_generacion(db, motor, con_imagenes, optimizar, linealizar, buscar, snapshot)
+    except Exception as e:
+        log.warning(f"No se pudo calcular la huella de los datos; se genera el catálogo sin el almacén: {e}")
+        return None
+    finally:
+        db.close()
+
+def _generacion_interrumpida() -> bool:
+    """Indica si hay en `REANUDABLE_DIR` una generación interrumpida que `--reanudar` continuaría."""
+    import generacion_reanudable # Requiere pypdf, como el modo paralelo
+    if generacion_reanudable.leer_manifiesto(REANUDABLE_DIR) is None:
+        return False
+    log.info(f"Hay una generación interrumpida en {REANUDABLE_DIR}: se reanuda sin buscar el PDF en el almacén.")
+    return True
+
+def _refrescar_snapshot():
+    """Pone al día `catalogo_snapshot` (`crud.refrescar_catalogo_snapshot`)."""
+    import crud
+    from database import SessionLocal
     db = SessionLocal()
+    try:
+        crud.refrescar_catalogo_snapshot(db)
+    except Exception as e:
+        log.error(f"Error al refrescar catalogo_snapshot: {e}")
+    finally:
+        db.close()
+
+def _snapshot_refrescado() -> bool:
+    """Indica si `catalogo_snapshot` se ha refrescado alguna vez; si no, lo registra como error."""
+    import crud
+    from database import SessionLectura
+    db = SessionLectura()
+    try:
+        if crud.obtener_huella_snapshot(db) is not None:
+            return True
+        log.error("catalogo_snapshot no se ha refrescado nunca: ejecuta antes 'python main.py --refrescar-snapshot'.")
+    except Exception as e:
+        log.error(f"No se pudo leer catalogo_snapshot (¿falta la migración d5f8a2c61b47?): {e}")
+    finally:
+        db.close()
+    return False
+
+def _estado_archivo(ruta: str):
+    """`(mtime_ns, tamaño)` de `ruta`, o None si no existe."""
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return estado.st_mtime_ns, estado.st_size
+
+def _generar_pdf_unico(streaming: bool, procesos: int, incremental: bool, con_imagenes: bool, motor: str,
+                       perfil=None, buscar: str = None, tuberia: bool = False, snapshot: bool = False,
+                       reanudable: bool = False, reanudar: bool = False):
+    """
+    Genera `PDF_FILENAME` en el modo elegido (ver `run_catalog_generation`).
+    Devuelve `((motor, con_imagenes), faltantes)`: las opciones con que se generó
+    (al reanudar, las de la generación interrumpida) y cuántas imágenes se
+    sustituyeron por el marcador de posición porque no estaban disponibles o no
+    llegaron a tiempo.
+    """
+    opciones = (motor, con_imagenes)
+    if snapshot and (procesos > 1 or incremental or reanudable):
+        log.warning("Los modos --procesos, --incremental y --reanudable leen las tablas de productos; "
+                    "se ignora --snapshot.")
+        snapshot = False
+    if buscar and (streaming or procesos > 1 or incremental or reanudable):
+        log.warning("Con --buscar el catálogo se genera en un solo documento; se ignoran "
+                    "--streaming, --tuberia, --procesos, --incremental, --reanudable y --reanudar.")
+        streaming, procesos, incremental, reanudable = False, 1, False, False
+    if motor == MOTOR_LISTA:
+        # Los tramos y la caché de fichas cuentan con 4 fichas por página; la lista no tiene imágenes
+        if procesos > 1 or incremental or reanudable:
+            log.warning("La lista de precios se genera en un solo documento; se ignoran --procesos, --incremental, "
+                        "--reanudable y --reanudar.")
+            procesos, incremental, reanudable = 1, False, False
+        con_imagenes = False
+    if reanudable:
+        if incremental:
+            log.warning("La generación reanudable renderiza todos los tramos; se ignora --incremental.")
+        import generacion_reanudable # Requiere pypdf, como el modo paralelo
+        with perfil.fase("reanudable") if perfil else contextlib.nullcontext():
+            usadas = generacion_reanudable.generar_catalogo_pdf_reanudable(
+                PDF_FILENAME, REANUDABLE_DIR, reanudar, procesos, con_imagenes=con_imagenes, motor=motor)
+        if usadas is None:
+            return opciones, 0
+        return (usadas["motor"], usadas["con_imagenes"]), usadas["faltantes"]
+    if procesos > 1 and not incremental:
+        import pdf_paralelo # Sólo se necesita (junto con pypdf) en modo paralelo
+        with perfil.fase("paralelo") if perfil else contextlib.nullcontext():
+            faltantes = pdf_paralelo.generar_catalogo_pdf_paralelo(PDF_FILENAME, num_procesos=procesos,
+                                                                   con_imagenes=con_imagenes, motor=motor)
+        return opciones, faltantes or 0
+
+    import imagenes
+    cargador = imagenes.CargadorImagenes() if con_imagenes else None
+    try:
+        if incremental:
+            with perfil.fase("incremental") if perfil else contextlib.nullcontext():
+                run_catalog_generation_incremental(cargador, motor)
+        elif streaming:
+            run_catalog_generation_streaming(cargador, motor, perfil, tuberia, snapshot)
+        else:
+            run_catalog_generation_completa(cargador, motor, perfil, buscar, snapshot)
+    finally:
+        if cargador:
+            cargador.cerrar()
+            log.info(cargador.informe())
+    return opciones, cargador.faltantes() if cargador else 0
+
+def run_catalog_generation_completa(cargador=None, motor: str = MOTOR_PLATYPUS, perfil=None,
+                                   buscar: str = None, snapshot: bool = False):
+    """
+    Genera el catálogo cargando primero todos los productos en memoria; con
+    `buscar`, sólo los que coinciden con la búsqueda, por relevancia, y con
+    `snapshot=True`, leídos de `catalogo_snapshot`.
+    """
+    import crud
+    from database import SessionLectura
+    # Crear sesión de base de datos
+    # Opción 1: Usar SessionLectura directamente (réplica de lectura, o el primario si no hay)
+    db = SessionLectura()
     
     # Opción 2: Usar el generador get_db (más común con FastAPI, pero usable aquí)
     # db_generator = get_db()
@@ -25,23 +289,275 @@ def run_catalog_generation():
     productos_con_relaciones = []
     try:
         # 1. Obtener productos de la base de datos
-        productos_con_relaciones = crud.obtener_productos_con_relaciones(db)
+        with perfil.fase("consulta") if perfil else contextlib.nullcontext():
+            if buscar:
+                productos_con_relaciones = crud.buscar_productos(db, buscar)
+            elif snapshot:
+                productos_con_relaciones = crud.obtener_productos_snapshot(db)
+            else:
+                productos_con_relaciones = crud.obtener_productos_ligeros(db)
     except Exception as e:
-        print(f"Error durante la obtención de datos: {e}")
+        log.error(f"Error durante la obtención de datos: {e}")
         # Considerar si se debe continuar o no
     finally:
         db.close() # Asegurarse de cerrar la sesión
 
     if productos_con_relaciones:
         # 2. Generar PDF
-        pdf_utils.generar_catalogo_pdf_completo(PDF_FILENAME, productos_con_relaciones)
+        import pdf_utils
+        pdf_utils.generar_catalogo_pdf_completo(PDF_FILENAME, productos_con_relaciones, cargador, motor, perfil)
     else:
-        print("No se encontraron productos para generar el catálogo o la conexión/consulta falló.")
+        log.warning("No se encontraron productos para generar el catálogo o la conexión/consulta falló.")
+
+def run_catalog_generation_streaming(cargador=None, motor: str = MOTOR_PLATYPUS, perfil=None,
+                                     tuberia: bool = False, snapshot: bool = False):
+    """
+    Genera el catálogo leyendo los productos en streaming mientras se construye el PDF.
+    La sesión permanece abierta durante todo el build. Con `tuberia=True` cada
+    pasada por los productos se lee en un hilo aparte, con su propia sesión, y
+    llega a la maquetación a través de una cola acotada (`lectura_anticipada`).
+    Con `snapshot=True` los productos se leen de `catalogo_snapshot`.
+    """
+    import pdf_utils
+    import crud
+    from database import SessionLectura
+    db = SessionLectura()
+    try:
+        # Contar la copia es recorrerla: si se refrescó, se genera aunque esté vacía
+        if not snapshot and crud.contar_productos(db) == 0:
+            log.warning("No se encontraron productos para generar el catálogo.")
+            return
+        orden = "categoria" if motor == MOTOR_LISTA else "id" # La lista va agrupada por categoría
+        if snapshot:
+            leer = lambda sesion: crud.iterar_productos_snapshot(sesion, orden)
+        elif motor == MOTOR_LISTA:
+            leer = lambda sesion: crud.iterar_productos_filtrados(sesion, orden=orden)
+        else:
+            leer = crud.iterar_productos_ligeros
+        if tuberia:
+            import lectura_anticipada
+            obtener_productos = lambda: lectura_anticipada.leer_en_segundo_plano(leer)
+        else:
+            obtener_productos = lambda: leer(db)
+        pdf_utils.generar_catalogo_pdf_perezoso(PDF_FILENAME, obtener_productos, cargador, motor, perfil)
+    except Exception as e:
+        log.error(f"Error durante la generación en streaming: {e}")
+    finally:
+        db.close()
+
+def run_catalog_generation_incremental(cargador=None, motor: str = MOTOR_PLATYPUS):
+    """Genera el catálogo reutilizando las fichas renderizadas en ejecuciones anteriores."""
+    import cache_render
+    cache = cache_render.CacheFichas(RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB * 2**20, motor)
+    import crud
+    from database import SessionLectura
+    db = SessionLectura()
+    try:
+        cache_render.generar_catalogo_pdf_incremental(PDF_FILENAME, crud.iterar_productos_ligeros(db),
+                                                      crud.obtener_resumen_productos(db), cache, cargador)
+    except Exception as e:
+        log.error(f"Error durante la generación incremental: {e}")
+    finally:
+        db.close()
+
+def run_catalog_generation_dividida(dividir_por: str = None, max_paginas: int = None, max_mb: float = None,
+                                    directorio_salida: str = CATALOGOS_DIR, procesos: int = None,
+                                    con_imagenes: bool = True, motor: str = MOTOR_PLATYPUS, perfil=None,
+                                    optimizar: bool = False, linealizar: bool = False, snapshot: bool = False):
+    """
+    Genera varios catálogos (por categoría, por marca o por volúmenes) con una sola
+    lectura de productos (de `catalogo_snapshot` con `snapshot=True`).
+    """
+    import catalogos_divididos # Requiere pypdf, como el modo paralelo
+    import pdf_utils
+    import crud
+    from database import SessionLectura
+    db = SessionLectura()
+    try:
+        with perfil.fase("consulta") if perfil else contextlib.nullcontext():
+            productos = crud.obtener_productos_snapshot(db) if snapshot else crud.obtener_productos_ligeros(db)
+    finally:
+        db.close()
+    if not productos:
+        log.warning("No se encontraron productos para generar el catálogo.")
+        return
+    prefijo = "catalogo" if dividir_por else os.path.splitext(PDF_FILENAME)[0]
+    with perfil.fase("divididos") if perfil else contextlib.nullcontext():
+        resultados = catalogos_divididos.generar_catalogos_divididos(
+            directorio_salida, productos, dividir_por, max_paginas, int(max_mb * 2**20) if max_mb else None,
+            procesos, con_imagenes=con_imagenes, motor=motor, prefijo=prefijo)
+    if optimizar:
+        # Después de cortar los volúmenes: la optimización sólo reduce su tamaño
+        with perfil.fase("optimizacion") if perfil else contextlib.nullcontext():
+            for n, (ruta, paginas, _) in enumerate(resultados):
+                if not pdf_utils.optimizar_pdf(ruta, linealizar):
+                    break
+                resultados[n] = (ruta, paginas, os.path.getsize(ruta))
+    if perfil:
+        perfil.contar("paginas", sum(paginas for _, paginas, _ in resultados))
+        perfil.contar("bytes_pdf", sum(tamano for _, _, tamano in resultados))
+
+def run_catalog_generation_variantes(variantes: list, directorio_salida: str = CATALOGOS_DIR,
+                                     con_imagenes: bool = True, buscar: str = None, perfil=None,
+                                     snapshot: bool = False):
+    """
+    Genera en `directorio_salida` un catálogo por variante, `catalogo_<variante>.pdf`,
+    con una sola lectura de los productos (ver `variantes_catalogo`); con `buscar`,
+    sólo los que coinciden con la búsqueda, por relevancia, y con `snapshot=True`,
+    leídos de `catalogo_snapshot`.
+    """
+    import imagenes
+    import variantes_catalogo # Requiere pypdf, como el modo paralelo
+    import crud
+    from database import SessionLectura
+    db = SessionLectura()
+    try:
+        with perfil.fase("consulta") if perfil else contextlib.nullcontext():
+            if buscar:
+                productos = crud.buscar_productos(db, buscar)
+            elif snapshot:
+                productos = crud.obtener_productos_snapshot(db)
+            else:
+                productos = crud.obtener_productos_ligeros(db)
+    finally:
+        db.close()
+    if not productos:
+        log.warning("No se encontraron productos para generar el catálogo.")
+        return
+    cargador = imagenes.CargadorImagenes() if con_imagenes else None
+    try:
+        with perfil.fase("variantes") if perfil else contextlib.nullcontext():
+            resultados = variantes_catalogo.generar_variantes(directorio_salida, productos, variantes,
+                                                              imagenes=cargador)
+    finally:
+        if cargador:
+            cargador.cerrar()
+            log.info(cargador.informe())
+    if perfil:
+        perfil.contar("productos", len(productos))
+        perfil.contar("paginas", sum(paginas for _, paginas, _ in resultados))
+        perfil.contar("bytes_pdf", sum(tamano for _, _, tamano in resultados))
+
+def run_exportacion(formatos: list, directorio_salida: str = CATALOGOS_DIR, buscar: str = None, perfil=None,
+                    snapshot: bool = False):
+    """
+    Escribe el catálogo en cada uno de `formatos` (HTML, CSV, JSON Lines) sin
+    generar el PDF, recorriendo los productos una sola vez en streaming; con
+    `buscar`, sólo los que coinciden, por relevancia, y con `snapshot=True`,
+    leídos de `catalogo_snapshot`.
+    """
+    import exportadores
+    os.makedirs(directorio_salida, exist_ok=True)
+    rutas = exportadores.rutas_exportacion(directorio_salida, "catalogo", formatos)
+    import crud
+    from database import SessionLectura
+    db = SessionLectura()
+    try:
+        if buscar:
+            productos = crud.buscar_productos(db, buscar)
+        elif snapshot:
+            productos = crud.iterar_productos_snapshot(db)
+        else:
+            productos = crud.iterar_productos_ligeros(db)
+        with perfil.fase("exportacion") if perfil else contextlib.nullcontext():
+            total = exportadores.exportar_catalogo(productos, rutas)
+        if perfil:
+            perfil.contar("productos", total)
+        log.info(f"{total} productos exportados en {', '.join(rutas.values())}.")
+    except Exception as e:
+        log.error(f"Error durante la exportación: {e}")
+    finally:
+        db.close()
+
+def _formatos_exportacion(valor: str) -> list:
+    """Lista de formatos de `--exportar` ("csv,jsonl"), sin repetidos."""
+    import exportadores
+    formatos = list(dict.fromkeys(f.strip().lower() for f in valor.split(",") if f.strip()))
+    desconocidos = [f for f in formatos if f not in exportadores.FORMATOS]
+    if not formatos or desconocidos:
+        raise argparse.ArgumentTypeError(
+            f"formatos admitidos: {', '.join(exportadores.FORMATOS)} (separados por comas)")
+    return formatos
+
+def _variantes_catalogo(valor: str) -> list:
+    """Variantes de `--variantes` ("minorista,distribuidor,minorista:sin_stock")."""
+    import variantes_catalogo
+    try:
+        return variantes_catalogo.leer_variantes(valor)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generador del catálogo de productos en PDF.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Leer productos en bloques y construir el PDF de forma perezosa (memoria constante).")
+    parser.add_argument("--tuberia", action="store_true",
+                        help="Como --streaming, pero leyendo los productos en un hilo aparte mientras se maqueta "
+                             "el PDF (en memoria, como mucho LECTURA_BLOQUES_COLA bloques de FETCH_CHUNK_SIZE).")
+    parser.add_argument("--procesos", type=int, default=1,
+                        help="Renderizar en paralelo por tramos con este número de procesos (requiere pypdf).")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Reutilizar las fichas sin cambios guardadas en {RENDER_CACHE_DIR} (requiere pypdf).")
+    parser.add_argument("--reanudable", action="store_true",
+                        help=f"Generar por tramos guardados en {REANUDABLE_DIR} a medida que terminan, para poder "
+                             "reanudar con --reanudar si la generación se interrumpe (requiere pypdf).")
+    parser.add_argument("--reanudar", "--resume", action="store_true",
+                        help="Continuar la generación de --reanudable que se interrumpió, sin repetir los tramos "
+                             "ya hechos, y unir el catálogo.")
+    parser.add_argument("--sin-imagenes", action="store_true",
+                        help="No cargar las imágenes de producto (se muestra el marcador).")
+    parser.add_argument("--motor", choices=MOTORES, default=MOTOR_PLATYPUS,
+                        help="Motor de las fichas: tablas de platypus, dibujo directo en el canvas (más rápido) "
+                             "o 'lista', una lista de precios compacta por categoría (40-55 productos por página).")
+    parser.add_argument("--dividir-por", choices=["categoria", "marca"],
+                        help="Generar un catálogo por categoría o por marca (requiere pypdf).")
+    parser.add_argument("--max-paginas", type=int,
+                        help="Cortar cada catálogo en volúmenes de como mucho este número de páginas.")
+    parser.add_argument("--max-mb", type=float,
+                        help="Cortar cada catálogo en volúmenes de como mucho estos MiB (p. ej. para enviarlos por correo).")
+    parser.add_argument("--directorio-salida", default=CATALOGOS_DIR,
+                        help="Directorio de los PDF generados con --dividir-por, --max-paginas o --max-mb, "
+                             "de las exportaciones de --exportar y de las variantes de --variantes.")
+    parser.add_argument("--forzar", action="store_true",
+                        help=f"Generar el catálogo aunque coincida la huella de una generación guardada en {ALMACEN_DIR}.")
+    parser.add_argument("--optimizar", action="store_true",
+                        help="Reescribir el PDF con flujos de objetos comprimidos (requiere pikepdf).")
+    parser.add_argument("--linealizar", action="store_true",
+                        help="Como --optimizar, y además linealizar el PDF para abrirlo en la web antes de descargarlo entero.")
+    parser.add_argument("--buscar", metavar="TEXTO",
+                        help='Incluir sólo los productos que coinciden con esta búsqueda, p. ej. \'inversor "onda pura" -kit\'.')
+    parser.add_argument("--exportar", metavar="FORMATOS", type=_formatos_exportacion,
+                        help="En lugar del PDF, exportar a html, csv y/o jsonl (p. ej. 'csv,jsonl') en "
+                             "--directorio-salida, con una sola lectura de los productos.")
+    parser.add_argument("--variantes", metavar="VARIANTES", type=_variantes_catalogo,
+                        help="Generar en --directorio-salida un PDF por variante: tarifa de TARIFAS_PRECIO con "
+                             "las opciones :sin_stock y :destacados, p. ej. 'minorista,distribuidor,"
+                             "minorista:sin_stock,minorista:destacados' (motor rápido, requiere pypdf).")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="Leer los productos de catalogo_snapshot, la copia desnormalizada del catálogo, "
+                             "sin unir las tablas de productos, marcas y categorías.")
+    parser.add_argument("--refrescar-snapshot", action="store_true",
+                        help="Poner al día catalogo_snapshot y terminar, sin generar (p. ej. en una tarea programada).")
+    parser.add_argument("--perfil", metavar="RUTA_JSON",
+                        help="Medir fases, contadores y tiempos por ficha y guardar el informe en este archivo.")
+    parser.add_argument("--log-nivel", default=LOG_NIVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Nivel de los mensajes (DEBUG muestra cada producto añadido).")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=args.log_nivel, format="%(message)s")
+
     # Crear directorio de imágenes si no existe (si se planea usar imágenes locales)
     if not os.path.exists(IMG_DIR):
         os.makedirs(IMG_DIR)
-        print(f"Directorio '{IMG_DIR}' creado/verificado (para imágenes locales).")
+        log.info(f"Directorio '{IMG_DIR}' creado/verificado (para imágenes locales).")
 
-    run_catalog_generation() 
\ No newline at end of file
+    run_catalog_generation(streaming=args.streaming, procesos=args.procesos, incremental=args.incremental,
+                           con_imagenes=not args.sin_imagenes, motor=args.motor, ruta_perfil=args.perfil,
+                           dividir_por=args.dividir_por, max_paginas=args.max_paginas, max_mb=args.max_mb,
+                           directorio_salida=args.directorio_salida, forzar=args.forzar,
+                           optimizar=args.optimizar, linealizar=args.linealizar, buscar=args.buscar,
+                           exportar=args.exportar, tuberia=args.tuberia, variantes=args.variantes,
+                           snapshot=args.snapshot, refrescar_snapshot=args.refrescar_snapshot,
+                           reanudable=args.reanudable, reanudar=args.reanudar) 
\ No newline at end of file
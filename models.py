@@ -1,5 +1,6 @@
 import datetime
-from sqlalchemy import Column, Integer, String, Text, Numeric, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import (Column, Integer, String, Text, Numeric, Boolean, DateTime, ForeignKey, Index, func,
+                        literal_column, true)
 from sqlalchemy.orm import relationship
 
 # Importar Base desde database.py
@@ -60,5 +61,28 @@ class Producto(Base):
     categoria = relationship("Categoria", back_populates="productos")
     subcategoria = relationship("Subcategoria", back_populates="productos")
 
+# Condiciones de los índices parciales. Las consultas deben usar estas mismas
+# expresiones, con literales y no parámetros, para que SQLite (que compara el
+# texto de la condición) y PostgreSQL (con planes genéricos) elijan esos índices.
+PRODUCTO_DESTACADO = Producto.destacado == true()
+PRODUCTO_CON_STOCK = Producto.stock > literal_column("0")
+
+# Columnas que filtra `crud.FiltroProductos`: incluidas en los índices por
+# categoría y marca para que PostgreSQL resuelva la página sólo con el índice.
+_COLUMNAS_FILTRO = ["categoria_id", "subcategoria_id", "marca_id", "precio", "stock", "destacado"]
+
+# Índices de las consultas filtradas y paginadas por clave de `crud` (ver la
+# migración `b7d41c2e9f03`). Todos terminan en `id`, la última columna de las claves de paginación.
+Index("ix_productos_categoria_id_id", Producto.categoria_id, Producto.id,
+      postgresql_include=[c for c in _COLUMNAS_FILTRO if c != "categoria_id"])
+Index("ix_productos_marca_id_id", Producto.marca_id, Producto.id,
+      postgresql_include=[c for c in _COLUMNAS_FILTRO if c != "marca_id"])
+Index("ix_productos_subcategoria_id_id", Producto.subcategoria_id, Producto.id)
+Index("ix_productos_precio_id", Producto.precio, Producto.id)
+Index("ix_productos_destacados", Producto.categoria_id, Producto.id,
+      postgresql_where=PRODUCTO_DESTACADO, sqlite_where=PRODUCTO_DESTACADO)
+Index("ix_productos_con_stock", Producto.categoria_id, Producto.id,
+      postgresql_where=PRODUCTO_CON_STOCK, sqlite_where=PRODUCTO_CON_STOCK)
+
 # No es necesario if __name__ == "__main__": para crear tablas aquí,
 # Alembic y el script de seed se encargan de ello. 
\ No newline at end of file
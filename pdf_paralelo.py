@@ -0,0 +1,206 @@
+"""Renderizado del catálogo en paralelo, por tramos, con un pool de procesos.
+
+El catálogo se reparte en tramos de productos consecutivos (múltiplos de 4, para
+respetar los saltos de página) que se renderizan en procesos separados junto con
+el índice. Después se unen en un único PDF con `pypdf`:
+
+* la numeración de las páginas de producto se estampa al unir, de forma que sigue
+  siendo continua desde la primera página del índice;
+* los enlaces del índice a `#prod_<codigo>` se crean sobre el PDF unido, apuntando
+  a la página y posición que cada tramo registró para su ancla, y el número de
+  página de cada entrada del índice se estampa con la página final de su ficha.
+"""
+
+import itertools
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from pypdf import PdfWriter
+from pypdf.annotations import Link
+from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, Fit, NameObject
+from reportlab.lib.colors import black, grey
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+import crud
+import database
+import imagenes
+import pdf_utils
+
+log = logging.getLogger(__name__)
+
+PRODUCTOS_POR_TRAMO = 2000
+
+# --- Trabajo en los procesos hijos ---
+def _inicializar_proceso():
+    # Las conexiones del pool heredadas del padre no deben reutilizarse en el hijo
+    database.descartar_conexiones_heredadas()
+
+def _renderizar_indice(ruta: str):
+    db = database.SessionLectura()
+    try:
+        resumen = crud.obtener_resumen_productos(db)
+    finally:
+        db.close()
+    num_paginas, enlaces, numeros = pdf_utils.renderizar_indice_tramo(ruta, resumen)
+    return ruta, num_paginas, enlaces, numeros
+
+def _renderizar_tramo(ruta: str, id_desde: int, id_hasta: int, con_imagenes: bool, motor: str):
+    """Devuelve `((ruta, num_paginas, anclas), faltantes)`, con las imágenes que faltaron en el tramo."""
+    db = database.SessionLectura()
+    cargador = imagenes.CargadorImagenes() if con_imagenes else None
+    try:
+        productos = crud.obtener_productos_ligeros_por_rango_id(db, id_desde, id_hasta)
+        num_paginas, anclas = pdf_utils.renderizar_tramo_productos(ruta, productos, cargador, motor)
+    finally:
+        db.close()
+        if cargador:
+            cargador.cerrar()
+    return (ruta, num_paginas, anclas), cargador.faltantes() if cargador else 0
+
+# --- Unión de los tramos ---
+def _repartir_en_tramos(ids: List[int], productos_por_tramo: int) -> List[Tuple[int, int]]:
+    """Divide la lista ordenada de ids en rangos `(id_desde, id_hasta)` de múltiplos de 4 productos."""
+    productos_por_tramo = max(4, productos_por_tramo - productos_por_tramo % 4)
+    return [(ids[i], ids[min(i + productos_por_tramo, len(ids)) - 1])
+            for i in range(0, len(ids), productos_por_tramo)]
+
+def _escapar_texto_pdf(texto: str) -> bytes:
+    datos = texto.encode('cp1252')
+    return datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+def _estampar_textos(writer: PdfWriter, textos):
+    """
+    Añade textos alineados a la derecha al PDF unido. `textos` son tuplas
+    `(índice de página base 0, x_derecha, y, texto, tamaño, color)` en Helvetica.
+    Se añade un flujo de contenido nuevo a cada página, sin reescribir el existente.
+    """
+    por_pagina = {}
+    for indice, x_derecha, y, texto, tamano, color in textos:
+        x = x_derecha - stringWidth(texto, 'Helvetica', tamano)
+        por_pagina.setdefault(indice, []).append(
+            b'q %.6f %.6f %.6f rg BT /FNumPag %g Tf %.2f %.2f Td (%s) Tj ET Q\n'
+            % (color.red, color.green, color.blue, tamano, x, y, _escapar_texto_pdf(texto)))
+    if not por_pagina:
+        return
+
+    # Los flujos de contenido tienen que ser objetos indirectos y pypdf sólo los crea con
+    # `PdfWriter._add_object`, sin equivalente público: por eso requirements.txt acota su versión
+    fuente = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+        NameObject('/Encoding'): NameObject('/WinAnsiEncoding'),
+    }))
+    # Aísla el estado gráfico del contenido original: q <original> Q <textos>
+    abrir = DecodedStreamObject()
+    abrir.set_data(b'q\n')
+    abrir = writer._add_object(abrir)
+
+    for indice, operaciones in por_pagina.items():
+        flujo = DecodedStreamObject()
+        flujo.set_data(b'Q\n' + b''.join(operaciones))
+        flujo = flujo.flate_encode()
+
+        pagina = writer.pages[indice]
+        contenido = pagina.raw_get('/Contents')
+        flujos = list(contenido.get_object()) if isinstance(contenido.get_object(), ArrayObject) else [contenido]
+        pagina[NameObject('/Contents')] = ArrayObject([abrir, *flujos, writer._add_object(flujo)])
+
+        recursos = pagina['/Resources'].get_object()
+        if '/Font' not in recursos:
+            recursos[NameObject('/Font')] = DictionaryObject()
+        recursos['/Font'].get_object()[NameObject('/FNumPag')] = fuente
+
+def _numeros_pie(primera: int, ultima: int):
+    """Números del pie para las páginas `primera..ultima` (índices base 0), como `pdf_utils.footer_canvas`."""
+    doc = pdf_utils._crear_doc_template(os.devnull)
+    x_derecha = doc.width + doc.leftMargin
+    for indice in range(primera, ultima + 1):
+        yield indice, x_derecha, 0.5 * inch, pdf_utils.texto_numero_pagina(indice + 1), 8, grey
+
+def unir_tramos(nombre_archivo: str, indice, tramos, deduplicar: bool = True):
+    """
+    Une el índice y los tramos renderizados en `nombre_archivo`.
+
+    `indice` es `(ruta, num_paginas, enlaces, numeros)` y `tramos` una lista ordenada
+    de `(ruta, num_paginas, anclas)`, tal como los devuelven los procesos hijos. Un
+    tramo puede llevar un cuarto elemento, la primera página (base 0) que se toma
+    de `ruta`: entonces se unen sólo sus `num_paginas` páginas desde ahí, y las
+    páginas de `anclas` se cuentan desde esa primera página.
+
+    Cada tramo es un PDF independiente con sus propias copias de las fuentes y de
+    las imágenes que comparte con otros tramos; con `deduplicar`, los objetos
+    idénticos se guardan una sola vez en el PDF unido.
+    """
+    ruta_indice, paginas_indice, enlaces, numeros = indice
+    writer = PdfWriter()
+    writer.append(ruta_indice, import_outline=False)
+
+    destinos = {}
+    desplazamiento = paginas_indice
+    for ruta, num_paginas, anclas, *primera in tramos:
+        primera = primera[0] if primera else 0
+        writer.append(ruta, pages=(primera, primera + num_paginas), import_outline=False)
+        for clave, (pagina, x, y) in anclas.items():
+            destinos[clave] = (desplazamiento + pagina - 1, x, y)
+        desplazamiento += num_paginas
+    numeros_indice = ((pagina - 1, x, y, str(destinos[ancla][0] + 1), tamano, black)
+                      for pagina, x, y, ancla, fuente, tamano in numeros if ancla in destinos)
+    _estampar_textos(writer, itertools.chain(_numeros_pie(paginas_indice, desplazamiento - 1), numeros_indice))
+
+    for pagina, rect, destino in enlaces:
+        if destino not in destinos:
+            continue
+        indice_destino, x, y = destinos[destino]
+        writer.add_annotation(pagina - 1, Link(rect=rect, border=[0, 0, 0], target_page_index=indice_destino,
+                                               fit=Fit.xyz(left=x, top=y, zoom=0)))
+
+    if deduplicar:
+        writer.compress_identical_objects()
+    with open(nombre_archivo, "wb") as f:
+        writer.write(f)
+    return desplazamiento
+
+def generar_catalogo_pdf_paralelo(nombre_archivo: str, num_procesos: int = None,
+                                  productos_por_tramo: int = PRODUCTOS_POR_TRAMO, con_imagenes: bool = False,
+                                  motor: str = pdf_utils.MOTOR_PLATYPUS):
+    """
+    Genera el catálogo completo repartiendo el renderizado en `num_procesos` procesos
+    (por defecto, uno por núcleo). Cada proceso lee sus productos de la base de datos
+    por rango de ids, así que no hay que enviarle objetos ORM. Con `con_imagenes`,
+    cada proceso usa su propio `CargadorImagenes` sobre la caché de miniaturas común.
+    Devuelve el número de imágenes sustituidas por el marcador de posición en todos
+    los tramos, o None si no hay productos.
+    """
+    db = database.SessionLectura()
+    try:
+        ids = [fila.id for fila in crud.obtener_resumen_productos(db)]
+    finally:
+        db.close()
+
+    if not ids:
+        log.warning("No se encontraron productos para generar el catálogo.")
+        return None
+
+    rangos = _repartir_en_tramos(ids, productos_por_tramo)
+    num_procesos = num_procesos or os.cpu_count() or 1
+    log.info(f"Renderizando {len(ids)} productos en {len(rangos)} tramos con {num_procesos} procesos...")
+
+    with tempfile.TemporaryDirectory(prefix="catalogo_tramos_") as directorio:
+        with ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_proceso) as pool:
+            futuro_indice = pool.submit(_renderizar_indice, os.path.join(directorio, "indice.pdf"))
+            futuros = [pool.submit(_renderizar_tramo, os.path.join(directorio, f"tramo_{n:05d}.pdf"),
+                                   desde, hasta, con_imagenes, motor)
+                       for n, (desde, hasta) in enumerate(rangos)]
+            indice = futuro_indice.result()
+            tramos, faltantes = zip(*(futuro.result() for futuro in futuros))
+
+        log.info(f"Uniendo {len(tramos)} tramos en {nombre_archivo}...")
+        total_paginas = unir_tramos(nombre_archivo, indice, tramos)
+
+    log.info(f"PDF '{nombre_archivo}' generado exitosamente ({total_paginas} páginas).")
+    return sum(faltantes)
@@ -1,24 +1,39 @@
 """Utilidades para la generación de PDFs con ReportLab."""
 
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak, Table, TableStyle, Flowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas # Importar canvas
 from reportlab.lib.colors import grey, black # Importar black y otros colores si es necesario
-from typing import List
+from reportlab import rl_config
+from typing import Callable, Iterable, Iterator, List, Tuple
+import itertools
+import logging
+
+from config import INDICE_COLUMNAS, INDICE_NUMEROS_PAGINA
 
 # Importar modelos para type hinting, si es necesario acceder a atributos específicos
 import models # Accederemos como models.Producto
+from instrumentacion import FlowablePerfilado, clave_ficha, contar_bytes
+from formato_ficha import TITULO_CATALOGO, ancla_producto, recortar_descripcion, textos_ficha
+# Motores y versión del diseño (definidos en formato_ficha, que no depende de ReportLab)
+from formato_ficha import MOTOR_LISTA, MOTOR_PLATYPUS, MOTOR_RAPIDO, MOTORES, VERSION_DISENO
+
+log = logging.getLogger(__name__)
+
+# Flujos (contenido de página, imágenes) comprimidos sólo con Flate: ReportLab
+# añade por defecto una capa ASCII85 que los hace un 25% más grandes.
+rl_config.useA85 = 0
 
 # Estilos (se podrían personalizar más)
 STYLES = getSampleStyleSheet()
 STYLE_NORMAL = STYLES['Normal']
 STYLE_HEADING1 = STYLES['h1']
 STYLE_HEADING2 = STYLES['h2']
-STYLE_SMALL = getSampleStyleSheet()['Normal']
-STYLE_SMALL.fontSize = 8
-STYLE_SMALL.leading = 10 # Espacio entre líneas para texto pequeño
+# Derivado de 'Normal' en lugar de crear otra hoja con getSampleStyleSheet() sólo para modificarlo
+STYLE_SMALL = ParagraphStyle('Normal', parent=STYLE_NORMAL, fontSize=8,
+                             leading=10) # Espacio entre líneas para texto pequeño
 
 # Estilo para las entradas del índice
 STYLE_INDEX_ENTRY = ParagraphStyle('IndexEntry',
@@ -28,6 +43,9 @@ STYLE_INDEX_ENTRY = ParagraphStyle('IndexEntry',
                                  spaceBefore=4,
                                  leftIndent=0.2*inch
                                  )
+# Variante para el índice sin tabla (indice_catalogo.py): dentro de la tabla el
+# spaceBefore no contaba y cada fila añadía 3 + 3 de relleno, que aquí pasa a ser el spaceBefore.
+STYLE_INDEX_ENTRY_FLUJO = ParagraphStyle('IndexEntryFlujo', parent=STYLE_INDEX_ENTRY, spaceBefore=6)
 
 # --- Estilos para la tabla de producto ---
 STYLE_PROD_LABEL = ParagraphStyle('ProdLabel', parent=STYLES['Normal'], fontSize=9, alignment=0) # Izquierda
@@ -45,7 +63,7 @@ def header_canvas(canvas_obj, doc):
     
     # Texto del encabezado (a 0.4 pulgadas del borde superior de la página)
     y_text_header = doc.pagesize[1] - 0.4 * inch
-    canvas_obj.drawString(doc.leftMargin, y_text_header, "Tesla SAS - Catálogo de Productos")
+    canvas_obj.drawString(doc.leftMargin, y_text_header, TITULO_CATALOGO)
     
     # Línea decorativa debajo del encabezado (a 0.6 pulgadas del borde superior de la página)
     y_line_header = doc.pagesize[1] - 0.6 * inch
@@ -60,23 +78,94 @@ def footer_canvas(canvas_obj, doc):
     canvas_obj.setFillColor(grey)
     # Pie de página "Tesla SAS"
     canvas_obj.drawString(doc.leftMargin, 0.5 * inch, "Tesla SAS")
-    # Numeración de página
-    page_num_text = f"Página {doc.page}"
-    canvas_obj.drawRightString(doc.width + doc.leftMargin, 0.5 * inch, page_num_text)
+    # Numeración de página (en los tramos del modo paralelo se estampa después de unirlos)
+    if not getattr(doc, 'numeracion_diferida', False):
+        canvas_obj.drawRightString(doc.width + doc.leftMargin, 0.5 * inch, texto_numero_pagina(doc.page))
     canvas_obj.restoreState()
+
+def texto_numero_pagina(numero: int) -> str:
+    """Texto de la numeración del pie de página."""
+    return f"Página {numero}"
 # --- Fin de funciones para encabezado y pie de página ---
 
-def generar_elemento_producto(producto_obj: models.Producto, doc) -> List:
+# --- Canvas auxiliares para el renderizado por tramos ---
+class CanvasRegistroAnclas(canvas.Canvas):
+    """Canvas que además registra la página y posición de cada ancla (`<a name=.../>`)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.anclas = {}
+
+    def bookmarkPage(self, key, fit="Fit", left=None, top=None, bottom=None, right=None, zoom=None):
+        self.anclas[key] = (self.getPageNumber(), left, top)
+        return super().bookmarkPage(key, fit=fit, left=left, top=top, bottom=bottom, right=right, zoom=zoom)
+
+class CanvasNumerosIndice(CanvasRegistroAnclas):
+    """
+    Canvas para el catálogo en un solo documento: el índice dibuja el número de
+    página de cada ancla como un formulario que se define al guardar, cuando ya se
+    sabe en qué página quedó cada ficha.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._formularios = {} # ancla -> (nombre del formulario, fuente, tamaño)
+
+    def numero_pagina_ancla(self, ancla: str, x_derecha: float, y: float, fuente: str, tamano: float):
+        """Dibuja, alineado a la derecha en `(x_derecha, y)`, el número de la página de `ancla`."""
+        if ancla not in self._formularios:
+            self._formularios[ancla] = (f"NumPag{len(self._formularios)}", fuente, tamano)
+        self.saveState()
+        self.translate(x_derecha, y)
+        self.doForm(self._formularios[ancla][0])
+        self.restoreState()
+
+    def save(self):
+        if len(self._code):
+            self.showPage()
+        for ancla, (nombre, fuente, tamano) in self._formularios.items():
+            pagina = self.anclas.get(ancla)
+            self.beginForm(nombre, lowerx=-inch, lowery=-tamano, upperx=0, uppery=2 * tamano)
+            self.setFont(fuente, tamano)
+            self.drawRightString(0, 0, str(pagina[0]) if pagina else "")
+            self.endForm()
+        super().save()
+
+class CanvasEnlacesDiferidos(canvas.Canvas):
+    """
+    Canvas que no crea las anotaciones de enlaces internos (`#destino`), sino que
+    las registra como `(página, rectángulo absoluto, destino)` para añadirlas
+    cuando el destino exista, p. ej. tras unir los tramos en un solo PDF. Los
+    números de página del índice se registran igual, como
+    `(página, x_derecha, y, ancla, fuente, tamaño)` en coordenadas absolutas.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enlaces = []
+        self.numeros = []
+
+    def linkRect(self, contents, destinationname, Rect=None, addtopage=1, name=None, relative=1,
+                 thickness=0, color=None, dashArray=None, **kw):
+        self.enlaces.append((self.getPageNumber(), tuple(self._absRect(Rect, relative)), destinationname))
+
+    def numero_pagina_ancla(self, ancla: str, x_derecha: float, y: float, fuente: str, tamano: float):
+        self.numeros.append((self.getPageNumber(), *self.absolutePosition(x_derecha, y), ancla, fuente, tamano))
+# --- Fin de canvas auxiliares ---
+
+def generar_elemento_producto(producto_obj: models.Producto, doc, imagenes=None) -> List:
     """
     Crea una Tabla de ReportLab para un solo producto.
+
+    `imagenes` es un `imagenes.CargadorImagenes` opcional; sin él, o si la imagen
+    no está disponible a tiempo, se muestra el marcador "[Imagen omitida]".
     """
     
-    bookmark_anchor = None
-    if producto_obj.codigo:
-        bookmark_anchor = f"prod_{producto_obj.codigo.replace(' ', '_')}"
+    textos = textos_ficha(producto_obj)
+    bookmark_anchor = ancla_producto(textos.codigo) if textos.codigo else None
 
     # Nombre del producto con ancla
-    nombre_texto = producto_obj.nombre or 'Nombre no disponible'
+    nombre_texto = textos.nombre
     if bookmark_anchor:
         nombre_texto_render = f'<a name="{bookmark_anchor}"/>{nombre_texto}'
     else:
@@ -89,40 +178,34 @@ def generar_elemento_producto(producto_obj: models.Producto, doc) -> List:
     # El valor puede ser un Paragraph o un string simple que se convertirá a Paragraph
     product_details_data = []
 
-    # Imagen (placeholder por ahora)
-    img_placeholder = Paragraph("[Imagen omitida]", STYLE_SMALL)
+    # Imagen (miniatura ya reducida a la resolución de la ficha, o marcador)
+    miniatura = imagenes.obtener(producto_obj.imagen_url) if imagenes else None
+    if miniatura:
+        img_placeholder = Image(miniatura.ruta, width=miniatura.ancho, height=miniatura.alto)
+    else:
+        img_placeholder = Paragraph("[Imagen omitida]", STYLE_SMALL)
     # product_details_data.append([img_placeholder, ' ']) # Ocupar dos celdas, o SPAN
 
     # Marca
-    marca_str = producto_obj.marca.nombre if producto_obj.marca else "N/A"
-    product_details_data.append([Paragraph("<b>Marca:</b>", STYLE_PROD_LABEL), Paragraph(marca_str, STYLE_PROD_VALUE)])
+    product_details_data.append([Paragraph("<b>Marca:</b>", STYLE_PROD_LABEL), Paragraph(textos.marca, STYLE_PROD_VALUE)])
 
     # Categoría y Subcategoría
-    cat_text = producto_obj.categoria.nombre if producto_obj.categoria else "N/A"
-    if producto_obj.subcategoria:
-        cat_text += f" > {producto_obj.subcategoria.nombre}"
-    product_details_data.append([Paragraph("<b>Categoría:</b>", STYLE_PROD_LABEL), Paragraph(cat_text, STYLE_PROD_VALUE)])
+    product_details_data.append([Paragraph("<b>Categoría:</b>", STYLE_PROD_LABEL), Paragraph(textos.categoria, STYLE_PROD_VALUE)])
     
     # Código de producto
-    if producto_obj.codigo:
-        product_details_data.append([Paragraph("<b>Código:</b>", STYLE_PROD_LABEL), Paragraph(producto_obj.codigo, STYLE_PROD_VALUE)])
-
-    # Descripción
-    descripcion_texto = producto_obj.descripcion or 'Descripción no disponible.'
-    if len(descripcion_texto) > 250: # Un poco más largo para la tabla
-        descripcion_texto = descripcion_texto[:247] + "..."
-    # La descripción ocupará ambas columnas
-    p_descripcion = Paragraph(descripcion_texto, STYLE_PROD_DESC)
+    if textos.codigo:
+        product_details_data.append([Paragraph("<b>Código:</b>", STYLE_PROD_LABEL), Paragraph(textos.codigo, STYLE_PROD_VALUE)])
+
+    # Descripción (un poco más larga que en una sola línea; ocupará ambas columnas)
+    p_descripcion = Paragraph(recortar_descripcion(textos.descripcion), STYLE_PROD_DESC)
     # product_details_data.append([p_descripcion, ' ']) # Span en TableStyle
 
     # Precio y Stock
-    precio_str = f"${producto_obj.precio:.2f}" if producto_obj.precio is not None else "N/A"
-    stock_str = str(producto_obj.stock) if producto_obj.stock is not None else "N/A"
-    product_details_data.append([Paragraph("<b>Precio:</b>", STYLE_PROD_LABEL), Paragraph(precio_str, STYLE_PROD_VALUE)])
-    product_details_data.append([Paragraph("<b>Stock:</b>", STYLE_PROD_LABEL), Paragraph(stock_str, STYLE_PROD_VALUE)])
+    product_details_data.append([Paragraph("<b>Precio:</b>", STYLE_PROD_LABEL), Paragraph(textos.precio, STYLE_PROD_VALUE)])
+    product_details_data.append([Paragraph("<b>Stock:</b>", STYLE_PROD_LABEL), Paragraph(textos.stock, STYLE_PROD_VALUE)])
 
     # Si es destacado
-    destacado_str = "<i>-- Producto Destacado --</i>" if producto_obj.destacado else ""
+    destacado_str = "<i>-- Producto Destacado --</i>" if textos.destacado else ""
     p_destacado = Paragraph(destacado_str, STYLE_SMALL)
     # product_details_data.append([p_destacado, ' ']) # Span en TableStyle
 
@@ -221,87 +304,281 @@ def generar_elemento_producto(producto_obj: models.Producto, doc) -> List:
     # La función generar_catalogo_pdf_completo espera una lista de flowables de esta función.
     return [product_table, Spacer(1, 0.3*inch)]
 
-def generar_catalogo_pdf_completo(nombre_archivo: str, productos_list_objs: List[models.Producto]):
+def _iterar_story_productos(productos: Iterable[models.Producto], doc, imagenes=None,
+                            motor: str = MOTOR_PLATYPUS, perfil=None) -> Iterator[Flowable]:
     """
-    Genera el archivo PDF del catálogo.
+    Genera, producto a producto, los flowables de la sección principal del catálogo,
+    con un `PageBreak` cada 4 productos.
+
+    Con `motor=MOTOR_RAPIDO` las fichas se maquetan y paginan en `render_rapido`
+    y se entrega un flowable por página en lugar de una tabla por producto. Con
+    `motor=MOTOR_LISTA` se genera en su lugar la lista de precios de
+    `lista_precios`, sin imágenes.
+
+    Con un `instrumentacion.Perfil`, cada ficha registra sus tiempos de
+    maquetación y dibujo.
+    """
+    if perfil:
+        productos = perfil.contar_iterador(productos, "productos")
+    if motor == MOTOR_LISTA:
+        import lista_precios # Importa los estilos de este módulo
+        yield from lista_precios.iterar_story_lista(productos)
+        return
+    if imagenes:
+        productos = imagenes.anticipar(productos)
+    if motor == MOTOR_RAPIDO:
+        import render_rapido # Importa los estilos de este módulo
+        hay_productos = False
+        for flowable in render_rapido.iterar_paginas_fichas(productos, doc, imagenes, perfil):
+            hay_productos = True
+            yield flowable
+        if not hay_productos:
+            yield Paragraph("No hay productos para mostrar.", STYLE_NORMAL)
+        return
+
+    hay_productos = False
+    for i, producto_obj in enumerate(productos):
+        # El salto se emite antes del siguiente producto para no necesitar len()
+        if i > 0 and i % 4 == 0:
+            yield PageBreak()
+        hay_productos = True
+        log.debug(f"Añadiendo producto al PDF: {producto_obj.nombre}")
+        tabla, espacio = generar_elemento_producto(producto_obj, doc, imagenes)
+        yield FlowablePerfilado(tabla, clave_ficha(producto_obj), perfil) if perfil else tabla
+        yield espacio
+
+    if not hay_productos:
+        yield Paragraph("No hay productos para mostrar.", STYLE_NORMAL)
+
+def _decorar_pagina(canvas_obj, doc):
+    """Dibuja encabezado y pie de página."""
+    header_canvas(canvas_obj, doc)
+    footer_canvas(canvas_obj, doc)
+
+def _crear_doc_template(nombre_archivo: str) -> SimpleDocTemplate:
+    return SimpleDocTemplate(nombre_archivo, pagesize=letter,
+                             rightMargin=inch/2, leftMargin=inch/2,
+                             topMargin=inch, # Aumentar margen superior para el encabezado
+                             bottomMargin=inch) # Aumentar margen inferior para el pie
+
+def _construir_documento(doc: SimpleDocTemplate, story, perfil=None):
+    """`doc.build` con encabezado, pie y números de página del índice, medido como `layout` con `perfil`."""
+    canvasmaker = perfil.envolver_canvas(CanvasNumerosIndice) if perfil else CanvasNumerosIndice
+    if not perfil:
+        doc.build(story, onFirstPage=_decorar_pagina, onLaterPages=_decorar_pagina, canvasmaker=canvasmaker)
+        return
+    with perfil.fase("layout"):
+        doc.build(story, onFirstPage=_decorar_pagina, onLaterPages=_decorar_pagina, canvasmaker=canvasmaker)
+    contar_bytes(perfil, doc.filename)
+
+def construir_catalogo(destino, productos_list_objs: List[models.Producto], imagenes=None,
+                       motor: str = MOTOR_PLATYPUS, perfil=None) -> int:
+    """
+    Construye el catálogo completo en `destino` (una ruta o un búfer como
+    `io.BytesIO`) y devuelve el número de páginas. A diferencia de
+    `generar_catalogo_pdf_completo`, los errores se propagan. Con
+    `motor=MOTOR_LISTA` no hay índice y los productos se agrupan por categoría.
     """
-    doc = SimpleDocTemplate(nombre_archivo, pagesize=letter,
-                            rightMargin=inch/2, leftMargin=inch/2,
-                            topMargin=inch, # Aumentar margen superior para el encabezado
-                            bottomMargin=inch) # Aumentar margen inferior para el pie
+    doc = _crear_doc_template(destino)
 
     story = []
 
-    # --- INICIO: Generación del Índice ---
-    story.append(Paragraph("Índice del Catálogo", STYLE_HEADING1))
-    story.append(Spacer(1, 0.2*inch))
-
-    if not productos_list_objs:
-        story.append(Paragraph("No hay productos para mostrar en el índice.", STYLE_NORMAL))
+    if motor == MOTOR_LISTA:
+        import lista_precios
+        productos_list_objs = lista_precios.ordenar_por_categoria(productos_list_objs)
     else:
-        index_table_data = []
-        
-        for producto_obj in productos_list_objs:
-            nombre_producto = producto_obj.nombre or "Producto sin nombre"
-            # Asumimos que producto_obj.codigo es solo el número.
-            # Si necesitara limpieza (ej. quitar "Código: "), se haría aquí.
-            codigo_producto_num = producto_obj.codigo or "N/A" 
-            
-            bookmark_anchor_ref = None
-            if producto_obj.codigo: # Usar producto_obj.codigo para el ancla
-                bookmark_anchor_ref = f"prod_{producto_obj.codigo.replace(' ', '_')}"
-
-            # Formato: Nombre - CODIGO_EN_AZUL
-            texto_indice_contenido = f'{nombre_producto} - <font color="blue">{codigo_producto_num}</font>'
-
-            if bookmark_anchor_ref:
-                texto_indice_html = f'<a href="#{bookmark_anchor_ref}">{texto_indice_contenido}</a>'
-                p_texto_indice = Paragraph(texto_indice_html, STYLE_INDEX_ENTRY)
-            else:
-                # Sin ancla, solo el texto formateado
-                p_texto_indice = Paragraph(texto_indice_contenido, STYLE_INDEX_ENTRY)
-            
-            index_table_data.append([p_texto_indice]) # Una sola celda por fila
-        
-        if index_table_data:
-            # Tabla con una sola columna, usando el ancho disponible del documento
-            index_table = Table(index_table_data, colWidths=[doc.width]) 
-            
-            # Estilo de tabla simplificado para una sola columna
-            ts_index = TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                # LEFTPADDING es 0 porque STYLE_INDEX_ENTRY ya maneja la sangría del párrafo.
-                ('LEFTPADDING', (0,0), (-1,-1), 0), 
-                ('RIGHTPADDING', (0,0), (-1,-1), 0),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 3), # Espacio entre entradas del índice
-                # ('GRID', (0,0), (-1,-1), 0.5, grey) # Descomentar para ver bordes
-            ])
-            index_table.setStyle(ts_index)
-            story.append(index_table)
-        
-    story.append(PageBreak()) # Salto de página después del índice
-    # --- FIN: Generación del Índice ---
+        # --- Índice (indice_catalogo.py) ---
+        story.extend(_iterar_story_indice(productos_list_objs))
 
     # Título del catálogo principal (opcional, podría eliminarse si el índice es suficiente)
     # story.append(Paragraph("Catálogo de Productos", STYLE_HEADING1))
     # story.append(Spacer(1, 0.3*inch))
 
-    if not productos_list_objs:
-        # Esta parte podría estar redundante si ya se manejó en el índice,
-        # pero se deja por si el índice y el catálogo principal pueden tener diferentes condiciones.
-        story.append(Paragraph("No hay productos para mostrar.", STYLE_NORMAL))
+    productos_story = _iterar_story_productos(productos_list_objs, doc, imagenes, motor, perfil)
+    story.extend(perfil.medir_iterador(productos_story, "story") if perfil else productos_story)
+    _construir_documento(doc, story, perfil)
+    return doc.page
+
+def generar_catalogo_pdf_completo(nombre_archivo: str, productos_list_objs: List[models.Producto], imagenes=None,
+                                  motor: str = MOTOR_PLATYPUS, perfil=None):
+    """
+    Genera el archivo PDF del catálogo.
+    """
+    log.info(f"Construyendo PDF: {nombre_archivo}...")
+    try:
+        construir_catalogo(nombre_archivo, productos_list_objs, imagenes, motor, perfil)
+        log.info(f"PDF '{nombre_archivo}' generado exitosamente.")
+    except Exception as e:
+        log.error(f"Error al generar el PDF: {e}")
+        # Considerar relanzar la excepción o manejarla de forma más específica si es necesario
+
+# --- Optimización del archivo de salida ---
+def optimizar_pdf(ruta: str, linealizar: bool = False) -> bool:
+    """
+    Reescribe `ruta` con los objetos pequeños agrupados en flujos de objetos
+    comprimidos (PDF 1.5) y, con `linealizar`, linealizado para que los visores
+    muestren la primera página antes de descargar el resto. Requiere `pikepdf`;
+    si no está instalado, deja el archivo como está y devuelve False.
+
+    El resto de optimizaciones no necesita esta etapa: ReportLab ya inserta cada
+    imagen distinta una sola vez por documento (por hash de su contenido),
+    comprime los flujos con Flate y sólo incrusta el subconjunto de glifos usados
+    de las fuentes TrueType; al unir tramos, `pdf_paralelo.unir_tramos` elimina
+    los objetos repetidos entre ellos.
+    """
+    try:
+        import pikepdf
+    except ImportError:
+        log.warning("pikepdf no está instalado: no se generan flujos de objetos ni se linealiza el PDF.")
+        return False
+    with pikepdf.open(ruta, allow_overwriting_input=True) as pdf:
+        pdf.save(ruta, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                 linearize=linealizar)
+    return True
+
+# --- Modo perezoso (story bajo demanda) ---
+class StoryPerezosa:
+    """
+    Story que se alimenta de un iterador de flowables a medida que `doc.build` los consume.
+
+    `BaseDocTemplate.build` trata el story como una lista de la que saca el primer
+    elemento (`del flowables[0]`) y en la que reinserta al principio los trozos
+    partidos (`flowables[0:0] = ...`, `insert(0, ...)`). Esta clase expone esas
+    operaciones sobre un búfer pequeño que se rellena desde el iterador, de modo
+    que sólo hay en memoria unos pocos flowables por delante de la página actual;
+    los ya colocados se liberan al salir del búfer.
+
+    `len()` devuelve el tamaño del búfer (no el total), así que `keepWithNext`
+    sólo puede encadenar hasta `anticipacion` flowables.
+    """
+
+    def __init__(self, flowables: Iterable[Flowable], anticipacion: int = 16):
+        self._iterador = iter(flowables)
+        self._buffer: List[Flowable] = []
+        self._anticipacion = anticipacion
+        self._agotado = False
+
+    def _rellenar(self, minimo: int = 0):
+        objetivo = max(minimo, self._anticipacion)
+        while not self._agotado and len(self._buffer) < objetivo:
+            try:
+                self._buffer.append(next(self._iterador))
+            except StopIteration:
+                self._agotado = True
+
+    def __len__(self):
+        self._rellenar()
+        return len(self._buffer)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, int) and indice >= 0:
+            self._rellenar(indice + 1)
+        else:
+            self._rellenar()
+        return self._buffer[indice]
+
+    def __setitem__(self, indice, valor):
+        self._rellenar()
+        self._buffer[indice] = valor
+
+    def __delitem__(self, indice):
+        self._rellenar()
+        del self._buffer[indice]
+
+    def insert(self, indice, valor):
+        self._buffer.insert(indice, valor)
+
+def _iterar_story_indice(productos: Iterable, columnas: int = INDICE_COLUMNAS,
+                         con_numeros: bool = INDICE_NUMEROS_PAGINA) -> Iterator[Flowable]:
+    """
+    Genera la sección del índice: el título y una `indice_catalogo.SeccionIndice`
+    que consume `productos` página a página. Con `con_numeros`, el canvas del
+    documento debe ser `CanvasNumerosIndice` o `CanvasEnlacesDiferidos`.
+    """
+    import indice_catalogo # Importa los estilos de este módulo
+    yield Paragraph("Índice del Catálogo", STYLE_HEADING1)
+    yield Spacer(1, 0.2*inch)
+
+    productos = iter(productos)
+    primero = next(productos, None)
+    if primero is None:
+        yield Paragraph("No hay productos para mostrar en el índice.", STYLE_NORMAL)
     else:
-        for i, producto_obj in enumerate(productos_list_objs):
-            print(f"Añadiendo producto al PDF: {producto_obj.nombre}")
-            story.extend(generar_elemento_producto(producto_obj, doc))
-            if (i + 1) % 4 == 0 and (i+1) < len(productos_list_objs):
-                 story.append(PageBreak())
+        yield indice_catalogo.SeccionIndice(itertools.chain([primero], productos), columnas, con_numeros)
+    yield PageBreak() # Salto de página después del índice
 
-    print(f"Construyendo PDF: {nombre_archivo}...")
+def generar_catalogo_pdf_perezoso(nombre_archivo: str, obtener_productos: Callable[[], Iterable[models.Producto]],
+                                  imagenes=None, motor: str = MOTOR_PLATYPUS, perfil=None):
+    """
+    Genera el catálogo PDF sin construir el story completo en memoria.
+
+    `obtener_productos` se llama dos veces (una para el índice y otra para las
+    fichas) y debe devolver cada vez un iterable nuevo en el mismo orden, p. ej.
+    `lambda: crud.iterar_productos_ligeros(db)`; con `motor=MOTOR_LISTA`, que no
+    tiene índice, una sola vez, y los productos deben venir ordenados por categoría. Los flowables se crean
+    bajo demanda mientras `doc.build` avanza y se descartan una vez colocados, por
+    lo que la memoria durante el build depende del tamaño de página y no del
+    número de productos.
+
+    Con `perfil`, la lectura de productos, la creación de flowables y el layout
+    se miden como fases separadas aunque se intercalen.
+    """
+    doc = _crear_doc_template(nombre_archivo)
+
+    def productos():
+        return perfil.medir_iterador(obtener_productos(), "consulta") if perfil else obtener_productos()
+
+    def flowables():
+        if motor != MOTOR_LISTA:
+            yield from _iterar_story_indice(productos())
+        yield from _iterar_story_productos(productos(), doc, imagenes, motor, perfil)
+
+    log.info(f"Construyendo PDF (modo perezoso): {nombre_archivo}...")
     try:
-        doc.build(story, onFirstPage=lambda c, d: (header_canvas(c, d), footer_canvas(c, d)), 
-                  onLaterPages=lambda c, d: (header_canvas(c, d), footer_canvas(c, d)))
-        print(f"PDF '{nombre_archivo}' generado exitosamente.")
+        story = perfil.medir_iterador(flowables(), "story") if perfil else flowables()
+        _construir_documento(doc, StoryPerezosa(story), perfil)
+        log.info(f"PDF '{nombre_archivo}' generado exitosamente.")
     except Exception as e:
-        print(f"Error al generar el PDF: {e}")
-        # Considerar relanzar la excepción o manejarla de forma más específica si es necesario 
\ No newline at end of file
+        log.error(f"Error al generar el PDF: {e}")
+
+# --- Renderizado por tramos (modo paralelo) ---
+def renderizar_indice_tramo(nombre_archivo: str, productos: Iterable) -> Tuple[int, list, list]:
+    """
+    Renderiza sólo el índice en `nombre_archivo`, con numeración desde la página 1.
+
+    Los enlaces a `#prod_<codigo>` y los números de página de cada producto dependen
+    de fichas que están en otros archivos, así que no se dibujan: se devuelven, junto
+    con el número de páginas del índice, tal como los registra `CanvasEnlacesDiferidos`.
+    """
+    doc = _crear_doc_template(nombre_archivo)
+    canvas_creado = []
+
+    def crear_canvas(*args, **kwargs):
+        canvas_creado.append(CanvasEnlacesDiferidos(*args, **kwargs))
+        return canvas_creado[-1]
+
+    doc.build(StoryPerezosa(_iterar_story_indice(productos)), onFirstPage=_decorar_pagina,
+              onLaterPages=_decorar_pagina, canvasmaker=crear_canvas)
+    return doc.page, canvas_creado[0].enlaces, canvas_creado[0].numeros
+
+def renderizar_tramo_productos(nombre_archivo: str, productos: Iterable[models.Producto],
+                               imagenes=None, motor: str = MOTOR_PLATYPUS) -> Tuple[int, dict]:
+    """
+    Renderiza las fichas de un tramo de productos en `nombre_archivo`, sin número de
+    página en el pie (se estampa al unir los tramos).
+
+    El tramo debe empezar en un múltiplo de 4 productos para que los saltos de
+    página coincidan con los del catálogo completo. Devuelve el número de páginas
+    y las anclas `{clave: (página, x, y)}` definidas en el tramo.
+    """
+    doc = _crear_doc_template(nombre_archivo)
+    doc.numeracion_diferida = True
+    canvas_creado = []
+
+    def crear_canvas(*args, **kwargs):
+        canvas_creado.append(CanvasRegistroAnclas(*args, **kwargs))
+        return canvas_creado[-1]
+
+    doc.build(StoryPerezosa(_iterar_story_productos(productos, doc, imagenes, motor)), onFirstPage=_decorar_pagina,
+              onLaterPages=_decorar_pagina, canvasmaker=crear_canvas)
+    return doc.page, canvas_creado[0].anclas
@@ -0,0 +1,292 @@
+"""Motor de renderizado rápido de fichas de producto, dibujando directamente en el canvas.
+
+`pdf_utils.generar_elemento_producto` crea por ficha una `Table` con SPAN, unos
+ocho `Paragraph` y un `TableStyle` nuevo, y platypus vuelve a medirlo todo en cada
+wrap/split. Este motor reproduce la misma ficha (mismas fuentes, rellenos y
+posiciones) pero:
+
+* parte el texto con métricas de fuente cacheadas (`MetricasTexto`) en lugar de
+  construir párrafos;
+* calcula de antemano la altura de cada ficha y reparte las fichas en páginas
+  (respetando el salto cada 4 productos);
+* entrega a `doc.build` un único flowable por página (`PaginaFichas`) que dibuja
+  sus fichas con `drawString`/`drawImage`.
+
+La única diferencia visible es que una ficha que no cabe entera en lo que queda de
+página pasa completa a la siguiente, en lugar de partirse entre filas de la tabla.
+"""
+
+import time
+from collections import namedtuple
+from typing import Iterable, Iterator, List
+
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, PageBreak
+
+import models
+from formato_ficha import TextosFicha, ancla_producto, recortar_descripcion, textos_ficha
+from instrumentacion import clave_ficha
+from pdf_utils import STYLE_PROD_H2_TABLE, STYLE_PROD_LABEL, STYLE_PROD_VALUE, STYLE_PROD_DESC, STYLE_SMALL
+
+# Geometría de la tabla de ficha de pdf_utils.generar_elemento_producto
+PADDING = 3
+PADDING_INFERIOR_NOMBRE = 10
+PADDING_INFERIOR_IMAGEN = 6
+PADDING_INFERIOR_DESCRIPCION = 6
+PADDING_SUPERIOR_DESTACADO = 6
+ANCHO_ETIQUETA = 1.5 * inch
+ESPACIO_ENTRE_FICHAS = 0.3 * inch
+PRODUCTOS_POR_PAGINA = 4
+# Padding por defecto del Frame de SimpleDocTemplate
+PADDING_FRAME = 6
+
+class MetricasTexto:
+    """Anchos de palabra cacheados por fuente y tamaño, y partición de líneas."""
+
+    def __init__(self):
+        self._anchos = {}
+
+    def ancho(self, texto: str, fuente: str, tamano: float) -> float:
+        clave = (texto, fuente, tamano)
+        ancho = self._anchos.get(clave)
+        if ancho is None:
+            ancho = self._anchos[clave] = stringWidth(texto, fuente, tamano)
+        return ancho
+
+    def partir(self, texto: str, fuente: str, tamano: float, ancho_max: float) -> List[str]:
+        """Parte `texto` en líneas de como mucho `ancho_max` (como hace Paragraph con texto simple)."""
+        palabras = texto.split()
+        if not palabras:
+            return [""]
+        espacio = self.ancho(" ", fuente, tamano)
+        lineas = []
+        actual = [palabras[0]]
+        ancho_actual = self.ancho(palabras[0], fuente, tamano)
+        for palabra in palabras[1:]:
+            ancho_palabra = self.ancho(palabra, fuente, tamano)
+            if ancho_actual + espacio + ancho_palabra > ancho_max:
+                lineas.append(" ".join(actual))
+                actual = [palabra]
+                ancho_actual = ancho_palabra
+            else:
+                actual.append(palabra)
+                ancho_actual += espacio + ancho_palabra
+        lineas.append(" ".join(actual))
+        return lineas
+
+# Fuentes derivadas una sola vez de los estilos de pdf_utils
+FUENTE_NOMBRE = (STYLE_PROD_H2_TABLE.fontName, STYLE_PROD_H2_TABLE.fontSize, STYLE_PROD_H2_TABLE.leading)
+FUENTE_ETIQUETA = ("Helvetica-Bold", STYLE_PROD_LABEL.fontSize, STYLE_PROD_LABEL.leading)
+FUENTE_VALOR = (STYLE_PROD_VALUE.fontName, STYLE_PROD_VALUE.fontSize, STYLE_PROD_VALUE.leading)
+FUENTE_DESCRIPCION = (STYLE_PROD_DESC.fontName, STYLE_PROD_DESC.fontSize, STYLE_PROD_DESC.leading)
+FUENTE_PEQUENA = (STYLE_SMALL.fontName, STYLE_SMALL.fontSize, STYLE_SMALL.leading)
+FUENTE_DESTACADO = ("Helvetica-Oblique", STYLE_SMALL.fontSize, STYLE_SMALL.leading)
+
+# Parte de una ficha: su altura y sus operaciones de dibujo, relativas a la esquina
+# superior izquierda del fragmento. Las fichas se componen apilando fragmentos, que
+# pueden compartirse entre fichas (`variantes_catalogo`).
+Fragmento = namedtuple("Fragmento", "altura operaciones")
+
+def _texto(operaciones: list, lineas: List[str], fuente, x: float, y_fila: float) -> float:
+    """Añade las líneas de texto de una celda que empieza en `y_fila`; devuelve su altura."""
+    nombre, tamano, interlineado = fuente
+    for n, linea in enumerate(lineas):
+        operaciones.append(("texto", nombre, tamano, x, y_fila + PADDING + tamano + n * interlineado, linea))
+    return len(lineas) * interlineado
+
+def maquetar_cabecera(textos: TextosFicha, ancla: str, miniatura, ancho_tabla: float,
+                      metricas: MetricasTexto) -> Fragmento:
+    """Nombre, imagen (o marcador) y filas de marca, categoría y código."""
+    operaciones = []
+    ancho_span = ancho_tabla - 2 * PADDING
+    y = 0.0 # Borde superior de la fila actual (hacia abajo, positivo)
+
+    # Nombre (fila 0, ocupa las dos columnas)
+    lineas = metricas.partir(textos.nombre, FUENTE_NOMBRE[0], FUENTE_NOMBRE[1], ancho_span)
+    if ancla:
+        operaciones.append(("ancla", ancla, PADDING, y + PADDING + FUENTE_NOMBRE[1] - FUENTE_NOMBRE[2]))
+    y += _texto(operaciones, lineas, FUENTE_NOMBRE, PADDING, y) + PADDING + PADDING_INFERIOR_NOMBRE
+
+    # Imagen o marcador (fila 1, centrada)
+    if miniatura:
+        x_imagen = PADDING + (ancho_span - miniatura.ancho) / 2.0
+        operaciones.append(("imagen", miniatura.ruta, x_imagen, y + PADDING, miniatura.ancho, miniatura.alto))
+        alto = miniatura.alto
+    else:
+        alto = _texto(operaciones, ["[Imagen omitida]"], FUENTE_PEQUENA, PADDING, y)
+    y += alto + PADDING + PADDING_INFERIOR_IMAGEN
+
+    detalles = [("Marca:", textos.marca), ("Categoría:", textos.categoria)]
+    if textos.codigo:
+        detalles.append(("Código:", textos.codigo))
+    for etiqueta, valor in detalles:
+        y += _fila(operaciones, etiqueta, valor, ancho_tabla, metricas, y)
+    return Fragmento(y, operaciones)
+
+def _fila(operaciones: list, etiqueta: str, valor: str, ancho_tabla: float, metricas: MetricasTexto,
+          y: float) -> float:
+    """Añade una fila de detalle (etiqueta en negrita y valor) en `y`; devuelve su altura."""
+    alto_etiqueta = _texto(operaciones, [etiqueta], FUENTE_ETIQUETA, PADDING, y)
+    lineas = metricas.partir(valor, FUENTE_VALOR[0], FUENTE_VALOR[1], ancho_tabla - ANCHO_ETIQUETA - 2 * PADDING)
+    alto_valor = _texto(operaciones, lineas, FUENTE_VALOR, ANCHO_ETIQUETA + PADDING, y)
+    return max(alto_etiqueta, alto_valor) + 2 * PADDING
+
+def maquetar_fila(etiqueta: str, valor: str, ancho_tabla: float, metricas: MetricasTexto) -> Fragmento:
+    """Fila de detalle suelta, como "Precio:" o "Stock:"."""
+    operaciones = []
+    return Fragmento(_fila(operaciones, etiqueta, valor, ancho_tabla, metricas, 0.0), operaciones)
+
+def maquetar_hueco(etiqueta: str, clave, altura: float) -> Fragmento:
+    """
+    Fila de detalle con la etiqueta y, en lugar del valor, un hueco de `altura`
+    cuya esquina superior izquierda se registra al dibujar con
+    `canvas.marcar_hueco(clave, x, y)`, para estampar el valor después
+    (`variantes_catalogo`) en la misma posición que en `maquetar_fila`.
+    """
+    operaciones = []
+    _texto(operaciones, [etiqueta], FUENTE_ETIQUETA, PADDING, 0.0)
+    operaciones.append(("hueco", clave, 0.0, 0.0))
+    return Fragmento(altura, operaciones)
+
+def maquetar_pie(textos: TextosFicha, ancho_tabla: float, metricas: MetricasTexto) -> Fragmento:
+    """Descripción (ocupa las dos columnas) y, si lo es, la marca de producto destacado."""
+    operaciones = []
+    lineas = metricas.partir(recortar_descripcion(textos.descripcion), FUENTE_DESCRIPCION[0], FUENTE_DESCRIPCION[1],
+                             ancho_tabla - 2 * PADDING)
+    y = _texto(operaciones, lineas, FUENTE_DESCRIPCION, PADDING, 0.0) + PADDING + PADDING_INFERIOR_DESCRIPCION
+
+    if textos.destacado:
+        y += PADDING_SUPERIOR_DESTACADO - PADDING
+        y += _texto(operaciones, ["-- Producto Destacado --"], FUENTE_DESTACADO, PADDING, y) + 2 * PADDING
+    return Fragmento(y, operaciones)
+
+class FichaRapida:
+    """
+    Ficha de un producto ya maquetada: los fragmentos que la forman, cada uno con
+    la distancia desde el borde superior de la ficha, y su altura total.
+    """
+    __slots__ = ("altura", "fragmentos", "ancla", "clave")
+
+    def __init__(self, fragmentos: Iterable[Fragmento], ancla: str = None, clave=None):
+        self.ancla = ancla
+        self.clave = clave
+        self.fragmentos = []
+        y = 0.0
+        for fragmento in fragmentos:
+            self.fragmentos.append((y, fragmento.operaciones))
+            y += fragmento.altura
+        self.altura = y
+
+    def dibujar(self, canvas_obj, x: float, y_superior: float):
+        """Dibuja la ficha con su esquina superior izquierda en `(x, y_superior)`."""
+        fuente_actual = None
+        for dy_fragmento, operaciones in self.fragmentos:
+            y_fragmento = y_superior - dy_fragmento
+            for operacion in operaciones:
+                tipo = operacion[0]
+                if tipo == "texto":
+                    _, nombre, tamano, dx, dy, linea = operacion
+                    if fuente_actual != (nombre, tamano):
+                        canvas_obj.setFont(nombre, tamano)
+                        fuente_actual = (nombre, tamano)
+                    canvas_obj.drawString(x + dx, y_fragmento - dy, linea)
+                elif tipo == "imagen":
+                    _, ruta, dx, dy, ancho, alto = operacion
+                    canvas_obj.drawImage(ruta, x + dx, y_fragmento - dy - alto, ancho, alto)
+                elif tipo == "ancla":
+                    _, clave, dx, dy = operacion
+                    canvas_obj.bookmarkHorizontal(clave, x + dx, y_fragmento - dy)
+                elif tipo == "hueco":
+                    _, clave, dx, dy = operacion
+                    canvas_obj.marcar_hueco(clave, x + dx, y_fragmento - dy)
+
+def maquetar_ficha(producto_obj: models.Producto, ancho_tabla: float, metricas: MetricasTexto,
+                   imagenes=None) -> FichaRapida:
+    """Ficha completa de un producto, con la misma disposición que `pdf_utils.generar_elemento_producto`."""
+    textos = textos_ficha(producto_obj)
+    ancla = ancla_producto(producto_obj.codigo) if producto_obj.codigo else None
+    miniatura = imagenes.obtener(producto_obj.imagen_url) if imagenes else None
+    return FichaRapida((maquetar_cabecera(textos, ancla, miniatura, ancho_tabla, metricas),
+                        maquetar_fila("Precio:", textos.precio, ancho_tabla, metricas),
+                        maquetar_fila("Stock:", textos.stock, ancho_tabla, metricas),
+                        maquetar_pie(textos, ancho_tabla, metricas)),
+                       ancla, clave_ficha(producto_obj))
+
+class PaginaFichas(Flowable):
+    """Flowable que ocupa una página y dibuja sus fichas ya maquetadas."""
+
+    def __init__(self, fichas: List[FichaRapida], ancho_tabla: float, perfil=None):
+        super().__init__()
+        self.fichas = fichas
+        self.ancho_tabla = ancho_tabla
+        self.perfil = perfil
+        self.altura = sum(f.altura for f in fichas) + ESPACIO_ENTRE_FICHAS * (len(fichas) - 1)
+
+    def wrap(self, availWidth, availHeight):
+        # La tabla de la ficha es algo más ancha que el frame y platypus la centra
+        self._desplazamiento_x = (availWidth - self.ancho_tabla) / 2.0
+        return availWidth, self.altura
+
+    def draw(self):
+        y = self.altura
+        for ficha in self.fichas:
+            if self.perfil:
+                inicio = time.perf_counter()
+                ficha.dibujar(self.canv, self._desplazamiento_x, y)
+                self.perfil.registrar_ficha(ficha.clave, dibujar=time.perf_counter() - inicio)
+            else:
+                ficha.dibujar(self.canv, self._desplazamiento_x, y)
+            y -= ficha.altura + ESPACIO_ENTRE_FICHAS
+
+def ancho_tabla_fichas(doc) -> float:
+    """Ancho de la tabla de ficha de `pdf_utils.generar_elemento_producto` en `doc`."""
+    return 1.5 * inch + (doc.width - 1.5 * inch - 0.1 * inch)
+
+def paginar_fichas(fichas: Iterable[FichaRapida], doc, perfil=None) -> Iterator[Flowable]:
+    """
+    Agrupa fichas ya maquetadas en páginas de `PRODUCTOS_POR_PAGINA` (o menos si
+    no caben) y entrega un `PaginaFichas` por página, separados por `PageBreak`.
+    """
+    ancho_tabla = ancho_tabla_fichas(doc)
+    alto_frame = doc.height - 2 * PADDING_FRAME
+
+    primera = True
+    pagina, alto_pagina = [], 0.0
+    for i, ficha in enumerate(fichas):
+        nueva_pagina = i % PRODUCTOS_POR_PAGINA == 0
+        if pagina and not nueva_pagina and alto_pagina + ESPACIO_ENTRE_FICHAS + ficha.altura > alto_frame:
+            nueva_pagina = True
+        if nueva_pagina and pagina:
+            if not primera:
+                yield PageBreak()
+            yield PaginaFichas(pagina, ancho_tabla, perfil)
+            primera = False
+            pagina, alto_pagina = [], 0.0
+        alto_pagina += (ESPACIO_ENTRE_FICHAS if pagina else 0.0) + ficha.altura
+        pagina.append(ficha)
+
+    if pagina:
+        if not primera:
+            yield PageBreak()
+        yield PaginaFichas(pagina, ancho_tabla, perfil)
+
+def iterar_paginas_fichas(productos: Iterable[models.Producto], doc, imagenes=None,
+                          perfil=None) -> Iterator[Flowable]:
+    """
+    Equivalente rápido de la sección de fichas de `pdf_utils._iterar_story_productos`:
+    maqueta las fichas y las agrupa en páginas antes de entregarlas a `doc.build`.
+    Con `perfil` se registra, por ficha, el tiempo de maquetación y de dibujo.
+    """
+    metricas = MetricasTexto()
+    ancho_tabla = ancho_tabla_fichas(doc)
+
+    def fichas():
+        for producto_obj in productos:
+            inicio = time.perf_counter() if perfil else 0.0
+            ficha = maquetar_ficha(producto_obj, ancho_tabla, metricas, imagenes)
+            if perfil:
+                perfil.registrar_ficha(ficha.clave, maquetar=time.perf_counter() - inicio)
+            yield ficha
+
+    yield from paginar_fichas(fichas(), doc, perfil)
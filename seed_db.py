@@ -1,5 +1,12 @@
 from faker import Faker
+import argparse
+import csv
+import datetime
+import io
 import random
+import time
+
+from sqlalchemy import delete, insert, select, text
 
 # Importar desde los nuevos módulos
 from database import SessionLocal, engine # engine para Base.metadata.create_all si fuera necesario
@@ -51,16 +58,18 @@ def crear_categorias(db_session, cantidad=3):
 
 def crear_subcategorias(db_session, categorias, subcategorias_por_categoria=2):
     subcategorias_creadas = []
+    # Una sola consulta para todas las subcategorías existentes, en lugar de una por nombre candidato
+    existentes = set(db_session.query(Subcategoria.nombre, Subcategoria.categoria_id).all())
     for categoria_padre in categorias:
         for _ in range(subcategorias_por_categoria):
             nombre_subcat = fake.word().capitalize() + " " + fake.word().capitalize()
-            subcat_existente = db_session.query(Subcategoria).filter_by(nombre=nombre_subcat, categoria_id=categoria_padre.id).first()
-            if subcat_existente:
+            if (nombre_subcat, categoria_padre.id) in existentes:
                 continue
                 
             subcategoria = Subcategoria(nombre=nombre_subcat, categoria_id=categoria_padre.id)
             db_session.add(subcategoria)
             subcategorias_creadas.append(subcategoria)
+            existentes.add((nombre_subcat, categoria_padre.id))
     db_session.commit()
     print(f"Creadas {len(subcategorias_creadas)} subcategorías.")
     return subcategorias_creadas
@@ -68,6 +77,9 @@ def crear_subcategorias(db_session, categorias, subcategorias_por_categoria=2):
 def crear_productos(db_session, marcas, categorias, subcategorias, cantidad_total=20):
     productos_creados = []
     codigos_producto_existentes = {p[0] for p in db_session.query(Producto.codigo).filter(Producto.codigo.isnot(None)).all()}
+    subcategorias_por_categoria = {}
+    for s in subcategorias:
+        subcategorias_por_categoria.setdefault(s.categoria_id, []).append(s)
 
     for i in range(cantidad_total):
         nombre_producto = fake.catch_phrase().capitalize()
@@ -87,8 +99,8 @@ def crear_productos(db_session, marcas, categorias, subcategorias, cantidad_tota
         categoria_elegida = random.choice(categorias) if categorias else None
         
         subcategoria_elegida = None
-        if categoria_elegida and subcategorias:
-            subcategorias_validas = [s for s in subcategorias if s.categoria_id == categoria_elegida.id]
+        if categoria_elegida:
+            subcategorias_validas = subcategorias_por_categoria.get(categoria_elegida.id)
             if subcategorias_validas:
                 subcategoria_elegida = random.choice(subcategorias_validas)
         
@@ -118,7 +130,7 @@ def crear_productos(db_session, marcas, categorias, subcategorias, cantidad_tota
     print(f"Creados {len(productos_creados)} productos.")
     return productos_creados
 
-def poblar_db():
+def poblar_db(limpiar=False, num_marcas=7, num_categorias=4, subcategorias_por_categoria=3, num_productos=20):
     # Crea las tablas si no existen (Alembic debería encargarse de esto, pero no hace daño para un script de seed)
     # Base.metadata.create_all(bind=engine) # Comentado ya que Alembic maneja la estructura.
 
@@ -127,8 +139,7 @@ def poblar_db():
     try:
         # Limpiar datos existentes (opcional, pero útil para un script de seed)
         # Cuidado: ¡Esto borrará todos los datos de estas tablas!
-        respuesta_limpiar = input("¿Deseas limpiar los datos existentes de productos, marcas, categorías y subcategorías? (s/N): ").lower()
-        if respuesta_limpiar == 's':
+        if limpiar:
             print("Limpiando tablas...")
             db.query(Producto).delete()
             db.query(Subcategoria).delete()
@@ -138,11 +149,11 @@ def poblar_db():
             print("Tablas limpiadas.")
 
         # Crear datos
-        marcas = crear_marcas(db, cantidad=7)
-        categorias = crear_categorias(db, cantidad=4)
+        marcas = crear_marcas(db, cantidad=num_marcas)
+        categorias = crear_categorias(db, cantidad=num_categorias)
         subcategorias = []
         if categorias:
-             subcategorias = crear_subcategorias(db, categorias, subcategorias_por_categoria=3)
+             subcategorias = crear_subcategorias(db, categorias, subcategorias_por_categoria=subcategorias_por_categoria)
         
         # Asegurarnos de tener al menos una categoría si es necesario para los productos
         if not categorias:
@@ -152,7 +163,7 @@ def poblar_db():
             db.commit()
             categorias.append(cat_defecto)
 
-        crear_productos(db, marcas, categorias, subcategorias, cantidad_total=20)
+        crear_productos(db, marcas, categorias, subcategorias, cantidad_total=num_productos)
         
         print("\n¡Base de datos poblada exitosamente!")
 
@@ -162,6 +173,176 @@ def poblar_db():
     finally:
         db.close()
 
+# --- Modo masivo ---
+# Los valores de texto se generan con Faker una sola vez, en "bolsas" de unos miles,
+# y cada fila elige de ellas con un `random.Random` propio: generar 1M de frases con
+# Faker llevaría horas. Con la misma semilla se obtienen las mismas filas, también
+# las fechas (y con ellas la huella de `crud.obtener_huella_catalogo`).
+TAMANO_BOLSA = 2000
+FECHA_BASE_SEMILLA = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+COLUMNAS_PRODUCTO = ("nombre", "descripcion", "precio", "marca_id", "categoria_id", "subcategoria_id",
+                     "codigo", "stock", "imagen_url", "destacado", "fecha_creacion", "fecha_actualizado")
+
+def _digito_control_ean13(doce_digitos: str) -> str:
+    suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(doce_digitos))
+    return str((10 - suma % 10) % 10)
+
+def _limpiar_tablas(conn):
+    print("Limpiando tablas...")
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("TRUNCATE productos, subcategorias, categorias, marcas RESTART IDENTITY CASCADE"))
+    else:
+        for modelo in (Producto, Subcategoria, Categoria, Marca):
+            conn.execute(delete(modelo))
+        # SQLite reutiliza los ids borrados y la copia se refresca por `fecha_actualizado`, que con
+        # semilla es fija: se vacía para que el próximo refresco la llene de nuevo
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'catalogo_snapshot_estado'")).first():
+            conn.execute(text("DELETE FROM catalogo_snapshot"))
+            conn.execute(text("DELETE FROM catalogo_snapshot_estado"))
+
+def _nombres_unicos(generar, cantidad, existentes):
+    """`cantidad` nombres nuevos; si Faker se repite se añade el primer sufijo numérico libre."""
+    nombres = []
+    for _ in range(cantidad):
+        nombre = base = generar()
+        sufijo = 1
+        while nombre in existentes:
+            sufijo += 1
+            nombre = f"{base} {sufijo}"
+        existentes.add(nombre)
+        nombres.append(nombre)
+    return nombres
+
+def _insertar_productos(conn, filas):
+    """Inserta un lote de productos con COPY en PostgreSQL (psycopg2) o con executemany en el resto."""
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        bufer = io.StringIO()
+        escritor = csv.writer(bufer)
+        for fila in filas:
+            escritor.writerow(["" if fila[c] is None else fila[c] for c in COLUMNAS_PRODUCTO])
+        bufer.seek(0)
+        cursor = conn.connection.cursor()
+        cursor.copy_expert(f"COPY productos ({', '.join(COLUMNAS_PRODUCTO)}) FROM STDIN WITH (FORMAT csv)", bufer)
+    else:
+        conn.execute(insert(Producto), filas)
+
+def poblar_db_masivo(num_productos, num_marcas=50, num_categorias=10, subcategorias_por_categoria=5,
+                     semilla=None, limpiar=False, lote=10000):
+    """
+    Inserta `num_productos` productos (y sus marcas, categorías y subcategorías)
+    por lotes de `lote` filas con inserciones masivas, sin crear objetos ORM.
+    """
+    rnd = random.Random(semilla)
+    if semilla is not None:
+        Faker.seed(semilla)
+    inicio = time.perf_counter()
+
+    with engine.begin() as conn:
+        if limpiar:
+            _limpiar_tablas(conn)
+
+        existentes = set(conn.scalars(select(Marca.nombre)))
+        nombres = _nombres_unicos(fake.company, num_marcas, existentes)
+        marca_ids = list(conn.scalars(insert(Marca).returning(Marca.id, sort_by_parameter_order=True),
+                                      [{"nombre": n, "logo_url": fake.image_url(width=100, height=100)} for n in nombres]))
+        print(f"Creadas {len(marca_ids)} marcas.")
+
+        existentes = set(conn.scalars(select(Categoria.nombre)))
+        nombres = _nombres_unicos(lambda: fake.word().capitalize() + " " + fake.word().capitalize(),
+                                  num_categorias, existentes)
+        categoria_ids = list(conn.scalars(insert(Categoria).returning(Categoria.id, sort_by_parameter_order=True),
+                                          [{"nombre": n, "icono": fake.lexify(text="fa-??????")} for n in nombres]))
+        print(f"Creadas {len(categoria_ids)} categorías.")
+
+        filas = [{"nombre": fake.word().capitalize() + " " + fake.word().capitalize(), "categoria_id": cat_id}
+                 for cat_id in categoria_ids for _ in range(subcategorias_por_categoria)]
+        subcategoria_ids = list(conn.scalars(insert(Subcategoria).returning(Subcategoria.id, sort_by_parameter_order=True),
+                                             filas)) if filas else []
+        subcategorias_de = {}
+        for fila, sub_id in zip(filas, subcategoria_ids):
+            subcategorias_de.setdefault(fila["categoria_id"], []).append(sub_id)
+        print(f"Creadas {len(subcategoria_ids)} subcategorías.")
+
+    # Bolsas de valores generadas una sola vez
+    nombres = [fake.catch_phrase().capitalize()[:250] for _ in range(TAMANO_BOLSA)]
+    descripciones = [fake.text(max_nb_chars=200) for _ in range(TAMANO_BOLSA)]
+    imagenes = [fake.image_url(width=640, height=480) for _ in range(TAMANO_BOLSA // 10)]
+
+    with engine.connect() as conn:
+        codigos_existentes = set() if limpiar else set(conn.scalars(select(Producto.codigo).where(Producto.codigo.isnot(None))))
+    # Códigos EAN-13 del rango interno (prefijo 2), consecutivos desde un origen derivado de la semilla
+    secuencia = rnd.randrange(10**10)
+    # Con semilla, una fecha fija derivada de ella, para que dos ejecuciones den los mismos datos
+    if semilla is None:
+        fecha = datetime.datetime.now(datetime.timezone.utc)
+    else:
+        fecha = FECHA_BASE_SEMILLA + datetime.timedelta(seconds=random.Random(semilla).randrange(365 * 24 * 3600))
+
+    insertados = 0
+    while insertados < num_productos:
+        filas = []
+        for _ in range(min(lote, num_productos - insertados)):
+            codigo = None
+            while codigo is None or codigo in codigos_existentes:
+                secuencia += 1
+                doce = f"2{secuencia % 10**11:011d}"
+                codigo = doce + _digito_control_ean13(doce)
+            cat_id = rnd.choice(categoria_ids)
+            subcats = subcategorias_de.get(cat_id)
+            filas.append({
+                "nombre": nombres[rnd.randrange(TAMANO_BOLSA)],
+                "descripcion": descripciones[rnd.randrange(TAMANO_BOLSA)],
+                "precio": round(rnd.uniform(5.99, 2999.99), 2),
+                "marca_id": rnd.choice(marca_ids) if marca_ids else None,
+                "categoria_id": cat_id,
+                "subcategoria_id": rnd.choice(subcats) if subcats else None,
+                "codigo": codigo,
+                "stock": rnd.randint(0, 100),
+                "imagen_url": imagenes[rnd.randrange(len(imagenes))],
+                "destacado": rnd.random() < 0.5,
+                "fecha_creacion": fecha,
+                "fecha_actualizado": fecha,
+            })
+        # Una transacción por lote: un fallo a mitad deja los lotes anteriores insertados
+        with engine.begin() as conn:
+            _insertar_productos(conn, filas)
+        insertados += len(filas)
+        transcurrido = time.perf_counter() - inicio
+        print(f"  {insertados}/{num_productos} productos ({insertados / transcurrido:.0f} filas/s)")
+
+    print(f"Creados {insertados} productos en {time.perf_counter() - inicio:.1f} s.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pobla la base de datos con datos de prueba generados por Faker.")
+    parser.add_argument("--productos", type=int, default=20, help="Número de productos a crear.")
+    parser.add_argument("--marcas", type=int, default=None, help="Número de marcas (7 por defecto; 50 en modo masivo).")
+    parser.add_argument("--categorias", type=int, default=None,
+                        help="Número de categorías (4 por defecto; 10 en modo masivo).")
+    parser.add_argument("--subcategorias", type=int, default=None,
+                        help="Subcategorías por categoría (3 por defecto; 5 en modo masivo).")
+    parser.add_argument("--semilla", type=int, default=None, help="Semilla para obtener siempre los mismos datos.")
+    parser.add_argument("--limpiar", action="store_true",
+                        help="Borrar antes los productos, marcas, categorías y subcategorías existentes.")
+    parser.add_argument("--masivo", action="store_true",
+                        help="Inserción masiva por lotes (para cientos de miles o millones de productos).")
+    parser.add_argument("--lote", type=int, default=10000, help="Filas por lote en modo masivo.")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
     print("Iniciando el script para poblar la base de datos con datos de prueba...")
-    poblar_db() 
\ No newline at end of file
+    if args.masivo:
+        poblar_db_masivo(args.productos,
+                         num_marcas=50 if args.marcas is None else args.marcas,
+                         num_categorias=10 if args.categorias is None else args.categorias,
+                         subcategorias_por_categoria=5 if args.subcategorias is None else args.subcategorias,
+                         semilla=args.semilla, limpiar=args.limpiar, lote=args.lote)
+    else:
+        if args.semilla is not None:
+            random.seed(args.semilla)
+            Faker.seed(args.semilla)
+        poblar_db(limpiar=args.limpiar,
+                  num_marcas=7 if args.marcas is None else args.marcas,
+                  num_categorias=4 if args.categorias is None else args.categorias,
+                  subcategorias_por_categoria=3 if args.subcategorias is None else args.subcategorias,
+                  num_productos=args.productos)
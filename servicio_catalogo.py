@@ -0,0 +1,292 @@
+"""Servicio HTTP que genera catálogos bajo demanda.
+
+Uso:
+    python servicio_catalogo.py [--host 127.0.0.1] [--puerto 8000] [--motor platypus|rapido|lista] [--sin-imagenes]
+
+Rutas:
+
+* `GET /catalogo.pdf`: catálogo completo. Admite los filtros `categoria` y `marca`
+  (por nombre), `destacado=1|0` y `motor=platypus|rapido|lista`, p. ej.
+  `/catalogo.pdf?categoria=Electrónica&destacado=1`.
+* `GET /estado`: estadísticas del servicio en JSON.
+
+El proceso mantiene cargados los módulos, estilos y métricas de fuente (se genera
+un catálogo vacío al arrancar) y el pool de conexiones de `database.SessionLectura`
+(el de la réplica de lectura, si está configurada), cuyo uso se muestra en `/estado`.
+Los PDF generados se guardan en memoria, con un máximo de `SERVICIO_CACHE_MB`,
+con la huella de los datos (`crud.obtener_huella_catalogo`) como parte de la
+clave. Esa clave es también el `ETag` de la respuesta: si el cliente envía
+`If-None-Match` con el mismo valor se responde 304 sin generar ni enviar el PDF.
+Un catálogo en el que alguna imagen no estaba disponible o no llegó a tiempo
+(con el marcador de posición en su lugar) no se guarda ni lleva `ETag`: se
+envía con `Cache-Control: no-store` y la siguiente petición lo vuelve a generar.
+Las peticiones simultáneas de la misma clave esperan a una única generación, y
+como mucho se generan `SERVICIO_RENDERS` catálogos a la vez.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from config import LOG_NIVEL, SERVICIO_CACHE_MB, SERVICIO_HOST, SERVICIO_PUERTO, SERVICIO_RENDERS
+from database import SessionLectura, metricas_pools
+import crud
+import imagenes
+import pdf_utils
+
+log = logging.getLogger(__name__)
+
+class ErrorPeticion(ValueError):
+    """Parámetros de la petición no válidos (respuesta 400)."""
+
+class CachePDF:
+    """PDF generados en memoria, con desalojo del usado hace más tiempo al superar `max_bytes`."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes_en_uso = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            datos = self._entradas.get(clave)
+            if datos is not None:
+                self._entradas.move_to_end(clave)
+            return datos
+
+    def guardar(self, clave: str, datos: bytes):
+        if len(datos) > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                return
+            self._entradas[clave] = datos
+            self.bytes_en_uso += len(datos)
+            while self.bytes_en_uso > self.max_bytes:
+                _, desalojado = self._entradas.popitem(last=False)
+                self.bytes_en_uso -= len(desalojado)
+
+    def __len__(self):
+        return len(self._entradas)
+
+class ServicioCatalogos:
+    """Genera, cachea y agrupa las peticiones de catálogos; independiente de HTTP."""
+
+    def __init__(self, motor: str = pdf_utils.MOTOR_PLATYPUS, max_bytes: int = SERVICIO_CACHE_MB * 2**20,
+                 renders_simultaneos: int = SERVICIO_RENDERS, con_imagenes: bool = True):
+        self.motor = motor
+        self.con_imagenes = con_imagenes
+        self.cache = CachePDF(max_bytes)
+        self._en_curso = {} # clave -> Future con los bytes del PDF y sus imágenes faltantes
+        self._lock = threading.Lock()
+        self._renders = threading.BoundedSemaphore(renders_simultaneos)
+        self.estadisticas = {"peticiones": 0, "no_modificado": 0, "aciertos": 0, "agrupadas": 0, "generados": 0,
+                             "incompletos": 0, "errores": 0, "segundos_generando": 0.0}
+
+    def calentar(self):
+        """Genera un catálogo vacío con cada motor para dejar cargados módulos, estilos y fuentes."""
+        for motor in pdf_utils.MOTORES:
+            pdf_utils.construir_catalogo(io.BytesIO(), [], motor=motor)
+
+    def _contar(self, clave: str, cantidad=1):
+        with self._lock:
+            self.estadisticas[clave] += cantidad
+
+    def leer_filtros(self, consulta: str) -> dict:
+        """Convierte la query string en filtros normalizados; lanza `ErrorPeticion` si no son válidos."""
+        parametros = {k: v[-1] for k, v in parse_qs(consulta).items()}
+        filtros = {"categoria": parametros.get("categoria"), "marca": parametros.get("marca"),
+                   "destacado": None, "motor": parametros.get("motor", self.motor)}
+        if "destacado" in parametros:
+            if parametros["destacado"] not in ("0", "1"):
+                raise ErrorPeticion("destacado debe ser 0 o 1")
+            filtros["destacado"] = parametros["destacado"] == "1"
+        if filtros["motor"] not in pdf_utils.MOTORES:
+            raise ErrorPeticion(f"motor debe ser uno de {', '.join(pdf_utils.MOTORES)}")
+        return filtros
+
+    def etag(self, filtros: dict) -> str:
+        """ETag de la petición: huella de los datos, filtros y versión del diseño."""
+        db = SessionLectura()
+        try:
+            huella = crud.obtener_huella_catalogo(db)
+        finally:
+            db.close()
+        clave = json.dumps([huella, sorted(filtros.items()), pdf_utils.VERSION_DISENO], ensure_ascii=False)
+        return '"' + hashlib.sha256(clave.encode()).hexdigest()[:32] + '"'
+
+    def obtener_pdf(self, etag: str, filtros: dict) -> Tuple[bytes, str, bool]:
+        """
+        Devuelve el PDF de `etag`, su origen (`cache`, `agrupada`, si esperó a una
+        generación en curso, o `generado`) y si está completo: False si alguna
+        imagen se sustituyó por el marcador de posición. Los incompletos no se cachean.
+        """
+        datos = self.cache.obtener(etag)
+        if datos is not None:
+            self._contar("aciertos")
+            return datos, "cache", True
+
+        with self._lock:
+            futuro = self._en_curso.get(etag)
+            propio = futuro is None
+            if propio:
+                futuro = self._en_curso[etag] = Future()
+        if not propio:
+            self._contar("agrupadas")
+            datos, faltantes = futuro.result()
+            return datos, "agrupada", not faltantes
+
+        try:
+            datos, faltantes = self._generar(filtros)
+            if faltantes:
+                self._contar("incompletos")
+            else:
+                self.cache.guardar(etag, datos)
+            futuro.set_result((datos, faltantes))
+            return datos, "generado", not faltantes
+        except BaseException as e:
+            self._contar("errores")
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[etag]
+
+    def _generar(self, filtros: dict) -> Tuple[bytes, int]:
+        """Genera el catálogo de `filtros`; devuelve el PDF y cuántas imágenes faltaron en él."""
+        with self._renders:
+            inicio = time.perf_counter()
+            db = SessionLectura()
+            try:
+                productos = crud.obtener_productos_ligeros(db, filtros["categoria"], filtros["marca"],
+                                                           filtros["destacado"])
+            finally:
+                db.close()
+            bufer = io.BytesIO()
+            # Un cargador por catálogo: su presupuesto de espera es por generación
+            cargador = (imagenes.CargadorImagenes()
+                        if self.con_imagenes and filtros["motor"] != pdf_utils.MOTOR_LISTA else None)
+            try:
+                pdf_utils.construir_catalogo(bufer, productos, cargador, filtros["motor"])
+            finally:
+                if cargador:
+                    cargador.cerrar()
+            duracion = time.perf_counter() - inicio
+        faltantes = cargador.faltantes() if cargador else 0
+        self._contar("generados")
+        self._contar("segundos_generando", duracion)
+        log.info(f"Catálogo generado ({len(productos)} productos, {filtros}) en {duracion:.2f} s"
+                 + (f"; {faltantes} imágenes no disponibles o sin llegar a tiempo, no se cachea." if faltantes else "."))
+        return bufer.getvalue(), faltantes
+
+    def estado(self) -> dict:
+        with self._lock:
+            estado = dict(self.estadisticas, en_curso=len(self._en_curso))
+        estado["segundos_generando"] = round(estado["segundos_generando"], 3)
+        estado["cache"] = {"entradas": len(self.cache), "bytes": self.cache.bytes_en_uso,
+                           "max_bytes": self.cache.max_bytes}
+        estado["pools"] = metricas_pools()
+        return estado
+
+class ManejadorCatalogos(BaseHTTPRequestHandler):
+    """Atiende las rutas del servicio; `self.server.servicio` es el `ServicioCatalogos`."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/estado":
+            self._responder(HTTPStatus.OK, json.dumps(self.server.servicio.estado()).encode(), "application/json")
+        elif url.path == "/catalogo.pdf":
+            self._catalogo(url.query)
+        else:
+            self._responder(HTTPStatus.NOT_FOUND, b"Ruta no encontrada\n", "text/plain; charset=utf-8")
+
+    def _catalogo(self, consulta: str):
+        servicio = self.server.servicio
+        servicio._contar("peticiones")
+        try:
+            filtros = servicio.leer_filtros(consulta)
+        except ErrorPeticion as e:
+            self._responder(HTTPStatus.BAD_REQUEST, f"{e}\n".encode(), "text/plain; charset=utf-8")
+            return
+        try:
+            etag = servicio.etag(filtros)
+            cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+            if_none_match = self.headers.get("If-None-Match", "")
+            if if_none_match.strip() == "*" or etag in (v.strip() for v in if_none_match.split(",")):
+                servicio._contar("no_modificado")
+                self._responder(HTTPStatus.NOT_MODIFIED, b"", None, cabeceras)
+                return
+            datos, origen, completo = servicio.obtener_pdf(etag, filtros)
+        except Exception as e:
+            log.exception(f"Error al generar el catálogo {filtros}: {e}")
+            self._responder(HTTPStatus.INTERNAL_SERVER_ERROR, b"Error al generar el catalogo\n",
+                            "text/plain; charset=utf-8")
+            return
+        if not completo:
+            # Con marcadores en lugar de imágenes: sin ETag, para que el cliente no lo revalide con 304
+            cabeceras = {"Cache-Control": "no-store"}
+        nombre = "catalogo" + "".join(f"_{v}" for k, v in filtros.items() if k in ("categoria", "marca") and v)
+        cabeceras["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(nombre)}.pdf"
+        cabeceras["X-Catalogo-Origen"] = origen
+        self._responder(HTTPStatus.OK, datos, "application/pdf", cabeceras)
+
+    def _responder(self, estado: HTTPStatus, cuerpo: bytes, tipo: Optional[str], cabeceras: dict = None):
+        self.send_response(estado)
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        if tipo:
+            self.send_header("Content-Type", tipo)
+        if estado != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        log.debug(f"{self.address_string()} {formato % args}")
+
+def crear_servidor(servicio: ServicioCatalogos, host: str = SERVICIO_HOST,
+                   puerto: int = SERVICIO_PUERTO) -> ThreadingHTTPServer:
+    """Servidor HTTP (un hilo por conexión) para `servicio`; `puerto=0` elige uno libre."""
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorCatalogos)
+    servidor.daemon_threads = True
+    servidor.servicio = servicio
+    return servidor
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP de catálogos PDF bajo demanda.")
+    parser.add_argument("--host", default=SERVICIO_HOST)
+    parser.add_argument("--puerto", type=int, default=SERVICIO_PUERTO)
+    parser.add_argument("--motor", choices=pdf_utils.MOTORES, default=pdf_utils.MOTOR_PLATYPUS,
+                        help="Motor de las fichas si la petición no indica `motor`.")
+    parser.add_argument("--sin-imagenes", action="store_true",
+                        help="No cargar las imágenes de producto (se muestra el marcador).")
+    parser.add_argument("--log-nivel", default=LOG_NIVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=args.log_nivel, format="%(message)s")
+    servicio = ServicioCatalogos(args.motor, con_imagenes=not args.sin_imagenes)
+    servicio.calentar()
+    servidor = crear_servidor(servicio, args.host, args.puerto)
+    log.info(f"Servicio de catálogos en http://{args.host}:{servidor.server_port}/catalogo.pdf")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
@@ -0,0 +1,309 @@
+"""Varias variantes del catálogo en una sola ejecución: tarifas de precio, con o sin stock, sólo destacados.
+
+Cada variante es una tarifa (`TARIFAS_PRECIO`, p. ej. "minorista:1,distribuidor:0.8")
+con opciones: `distribuidor`, `minorista:sin_stock`, `minorista:destacados`. Los
+productos se leen una vez y los precios de todas las tarifas se calculan en una
+sola pasada (`precios_por_tarifa`). Las fichas se dibujan con el motor rápido
+(`render_rapido`), componiendo fragmentos: cabecera (nombre, imagen, marca,
+categoría, código), fila de precio, fila de stock y pie (descripción, destacado).
+Las filas de precio y de stock se maquetan una vez por valor distinto y se comparten
+entre fichas y variantes.
+
+Las variantes con la misma maquetación (mismos productos, con o sin stock) sólo se
+diferencian en el precio, que ocupa siempre una fila de la misma altura. Por eso
+se dibuja una vez el PDF base con todo menos los precios, registrando la posición
+de cada uno, y cada variante es una copia de esa base a la que se añade, como
+actualización incremental del PDF, un flujo de contenido por página con sus
+precios (`EstampadorIncremental`). Cada tarifa adicional cuesta copiar el archivo
+y escribir esos flujos, no volver a maquetar y dibujar el catálogo. Las
+maquetaciones con una sola variante se dibujan directamente con sus precios.
+"""
+
+import itertools
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from collections import namedtuple
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from io import BytesIO
+from typing import Dict, Iterable, List, Sequence
+
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+
+import pdf_utils
+import render_rapido
+from config import TARIFAS_PRECIO
+from formato_ficha import ancla_producto, texto_precio, textos_ficha
+from pdf_paralelo import _escapar_texto_pdf
+
+log = logging.getLogger(__name__)
+
+# Opciones de una variante, después de la tarifa: "distribuidor:sin_stock:destacados"
+OPCIONES = ("sin_stock", "destacados")
+
+Variante = namedtuple("Variante", "nombre tarifa con_stock solo_destacados")
+
+CENTIMO = Decimal("0.01")
+
+def leer_tarifas(texto: str = TARIFAS_PRECIO) -> Dict[str, Decimal]:
+    """Tarifas `nombre -> factor` de un texto "minorista:1,distribuidor:0.8"; lanza ValueError si no es válido."""
+    tarifas = {}
+    for parte in texto.split(","):
+        nombre, _, factor = parte.strip().partition(":")
+        try:
+            valor = Decimal(factor)
+        except InvalidOperation:
+            valor = None
+        if not nombre or valor is None or valor <= 0:
+            raise ValueError(f"tarifa no válida: '{parte.strip()}' (se espera nombre:factor, p. ej. distribuidor:0.8)")
+        tarifas[nombre] = valor
+    return tarifas
+
+def leer_variantes(texto: str, tarifas: Dict[str, Decimal] = None) -> List[Variante]:
+    """
+    Variantes de un texto "minorista,distribuidor,minorista:sin_stock", sin
+    repetidas; lanza ValueError si una tarifa u opción no existe.
+    """
+    tarifas = leer_tarifas() if tarifas is None else tarifas
+    variantes = {}
+    for parte in texto.split(","):
+        tarifa, *opciones = parte.strip().split(":")
+        if tarifa not in tarifas:
+            raise ValueError(f"tarifa desconocida: '{tarifa}' (definidas en TARIFAS_PRECIO: {', '.join(tarifas)})")
+        desconocidas = [o for o in opciones if o not in OPCIONES]
+        if desconocidas:
+            raise ValueError(f"opción desconocida: '{desconocidas[0]}' (admitidas: {', '.join(OPCIONES)})")
+        opciones = [o for o in OPCIONES if o in opciones] # Orden fijo para que el nombre no dependa del texto
+        nombre = "_".join([tarifa, *opciones])
+        variantes[nombre] = Variante(nombre, tarifa, "sin_stock" not in opciones, "destacados" in opciones)
+    return list(variantes.values())
+
+def precios_por_tarifa(productos: Sequence, tarifas: Dict[str, Decimal]) -> Dict[str, List[str]]:
+    """
+    Precio ya formateado de cada producto en cada una de `tarifas`, en una sola
+    pasada por los productos y redondeado al céntimo. Los precios se repiten mucho
+    en un catálogo: cada precio distinto se calcula y formatea una vez por tarifa.
+    """
+    columnas = [(factor, []) for factor in tarifas.values()]
+    calculados = {}
+    for producto_obj in productos:
+        for factor, textos in columnas:
+            clave = (producto_obj.precio, factor)
+            texto = calculados.get(clave)
+            if texto is None:
+                precio = None
+                if producto_obj.precio is not None:
+                    precio = (Decimal(str(producto_obj.precio)) * factor).quantize(CENTIMO, ROUND_HALF_UP)
+                texto = calculados[clave] = texto_precio(precio)
+            textos.append(texto)
+    return {nombre: textos for nombre, (_, textos) in zip(tarifas, columnas)}
+
+class CanvasHuecos(pdf_utils.CanvasNumerosIndice):
+    """Canvas que registra la página y la posición absoluta de cada hueco (`render_rapido.maquetar_hueco`)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.huecos = {}
+
+    def marcar_hueco(self, clave, x: float, y: float):
+        self.huecos[clave] = (self.getPageNumber(), *self.absolutePosition(x, y))
+
+def _flujo(datos: bytes) -> bytes:
+    """Objeto de flujo comprimido con Flate."""
+    datos = zlib.compress(datos)
+    return b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(datos), datos)
+
+class EstampadorIncremental:
+    """
+    Copias de un PDF de ReportLab con textos añadidos a algunas de sus páginas.
+
+    Cada copia es el archivo original seguido de una actualización incremental
+    (nuevos objetos, tabla xref y trailer con `/Prev`): un flujo de contenido por
+    página con los textos y la página reescrita para dibujarlo después del
+    contenido original, aislado entre `q`/`Q` como en `pdf_paralelo`. Los números
+    de objeto y las páginas reescritas sólo dependen de `paginas`, así que se
+    preparan una vez y cada copia sólo escribe sus flujos.
+    """
+
+    def __init__(self, ruta_base: str, paginas: Iterable[int]):
+        self.ruta_base = ruta_base
+        lector = PdfReader(ruta_base)
+        with open(ruta_base, "rb") as f:
+            f.seek(max(0, os.path.getsize(ruta_base) - 1024))
+            xref_anterior = int(re.findall(rb"startxref\s+(\d+)", f.read())[-1])
+
+        siguiente = int(lector.trailer["/Size"])
+        self._num_abrir = siguiente
+        self._flujos = {} # página (base 0) -> número del objeto con sus textos
+        self._fuentes = {} # página -> {nombre de la fuente: nombre del recurso}
+        self._objetos_pagina = [] # (número, bytes de la página reescrita)
+        for indice in sorted(set(paginas)):
+            siguiente += 1
+            self._flujos[indice] = siguiente
+            pagina = lector.pages[indice]
+            self._fuentes[indice] = {str(fuente.get_object()["/BaseFont"])[1:]: nombre[1:]
+                                     for nombre, fuente in pagina["/Resources"]["/Font"].items()}
+            contenido = pagina.raw_get("/Contents")
+            flujos = list(contenido.get_object()) if isinstance(contenido.get_object(), ArrayObject) else [contenido]
+            pagina[NameObject("/Contents")] = ArrayObject([IndirectObject(self._num_abrir, 0, lector), *flujos,
+                                                           IndirectObject(siguiente, 0, lector)])
+            datos = BytesIO()
+            pagina.write_to_stream(datos)
+            self._objetos_pagina.append((pagina.indirect_reference.idnum, datos.getvalue()))
+
+        trailer = DictionaryObject({NameObject(k): lector.trailer.raw_get(k)
+                                    for k in ("/Root", "/Info", "/ID") if k in lector.trailer})
+        trailer[NameObject("/Size")] = NumberObject(siguiente + 1)
+        trailer[NameObject("/Prev")] = NumberObject(xref_anterior)
+        datos = BytesIO()
+        trailer.write_to_stream(datos)
+        self._trailer = datos.getvalue()
+
+    def escribir(self, ruta: str, textos: Iterable[tuple]):
+        """
+        Copia la base en `ruta` con `textos`: tuplas `(página base 0, x, y, texto,
+        fuente, tamaño)` con la línea base en `(x, y)` absolutos, en fuentes que ya
+        use esa página.
+        """
+        operaciones = {indice: [] for indice in self._flujos}
+        for indice, x, y, texto, fuente, tamano in textos:
+            operaciones[indice].append(b"BT /%s %g Tf %.2f %.2f Td (%s) Tj ET\n"
+                                       % (self._fuentes[indice][fuente].encode(), tamano, x, y,
+                                          _escapar_texto_pdf(texto)))
+
+        shutil.copyfile(self.ruta_base, ruta)
+        posiciones = {}
+        with open(ruta, "ab") as f:
+            f.write(b"\n")
+
+            def escribir_objeto(numero: int, datos: bytes):
+                posiciones[numero] = f.tell()
+                f.write(b"%d 0 obj\n%s\nendobj\n" % (numero, datos))
+
+            escribir_objeto(self._num_abrir, _flujo(b"q\n"))
+            for indice, numero in self._flujos.items():
+                escribir_objeto(numero, _flujo(b"Q\n" + b"".join(operaciones[indice])))
+            for numero, datos in self._objetos_pagina:
+                escribir_objeto(numero, datos)
+
+            inicio_xref = f.tell()
+            # Con la entrada 0 (cabeza de la lista de objetos libres), como la tabla original
+            f.write(b"xref\n0 1\n0000000000 65535 f \n")
+            numeros = sorted(posiciones)
+            # Una subsección por cada tramo de números consecutivos
+            for _, tramo in itertools.groupby(enumerate(numeros), key=lambda par: par[1] - par[0]):
+                tramo = [numero for _, numero in tramo]
+                f.write(b"%d %d\n" % (tramo[0], len(tramo)))
+                f.writelines(b"%010d 00000 n \n" % posiciones[numero] for numero in tramo)
+            f.write(b"trailer\n%s\nstartxref\n%d\n%%%%EOF\n" % (self._trailer, inicio_xref))
+
+class _Maquetador:
+    """Métricas, ancho de ficha y filas de detalle compartidas por todas las variantes."""
+
+    def __init__(self):
+        self.metricas = render_rapido.MetricasTexto()
+        self.ancho_tabla = render_rapido.ancho_tabla_fichas(pdf_utils._crear_doc_template(os.devnull))
+        self._filas = {}
+
+    def fila(self, etiqueta: str, valor: str) -> render_rapido.Fragmento:
+        """Fila de detalle, maquetada una sola vez por valor distinto."""
+        clave = (etiqueta, valor)
+        fragmento = self._filas.get(clave)
+        if fragmento is None:
+            fragmento = self._filas[clave] = render_rapido.maquetar_fila(etiqueta, valor, self.ancho_tabla,
+                                                                         self.metricas)
+        return fragmento
+
+    def ficha(self, producto_obj, fila_precio: render_rapido.Fragmento, con_stock: bool,
+              imagenes=None) -> render_rapido.FichaRapida:
+        textos = textos_ficha(producto_obj)
+        ancla = ancla_producto(textos.codigo) if textos.codigo else None
+        miniatura = imagenes.obtener(producto_obj.imagen_url) if imagenes else None
+        fragmentos = [render_rapido.maquetar_cabecera(textos, ancla, miniatura, self.ancho_tabla, self.metricas),
+                      fila_precio]
+        if con_stock:
+            fragmentos.append(self.fila("Stock:", textos.stock))
+        fragmentos.append(render_rapido.maquetar_pie(textos, self.ancho_tabla, self.metricas))
+        return render_rapido.FichaRapida(fragmentos, ancla)
+
+    def renderizar(self, ruta: str, productos: List, filas_precio: List[render_rapido.Fragmento], con_stock: bool,
+                   imagenes=None, canvas_clase=pdf_utils.CanvasNumerosIndice):
+        """Catálogo con índice y fichas de `productos`; devuelve `(páginas, canvas)`."""
+        doc = pdf_utils._crear_doc_template(ruta)
+        canvas_creado = []
+
+        def crear_canvas(*args, **kwargs):
+            canvas_creado.append(canvas_clase(*args, **kwargs))
+            return canvas_creado[-1]
+
+        def fichas():
+            iterados = imagenes.anticipar(productos) if imagenes else productos
+            for producto_obj, fila_precio in zip(iterados, filas_precio):
+                yield self.ficha(producto_obj, fila_precio, con_stock, imagenes)
+
+        story = itertools.chain(pdf_utils._iterar_story_indice(productos), render_rapido.paginar_fichas(fichas(), doc))
+        doc.build(pdf_utils.StoryPerezosa(story), onFirstPage=pdf_utils._decorar_pagina,
+                  onLaterPages=pdf_utils._decorar_pagina, canvasmaker=crear_canvas)
+        return doc.page, canvas_creado[0]
+
+def generar_variantes(directorio: str, productos: List, variantes: List[Variante],
+                      tarifas: Dict[str, Decimal] = None, imagenes=None, prefijo: str = "catalogo") -> List[tuple]:
+    """
+    Genera en `directorio` el catálogo `prefijo_<variante>.pdf` de cada una de
+    `variantes` a partir de `productos` (p. ej. de `crud.obtener_productos_ligeros`).
+    Devuelve `[(ruta, páginas, bytes)]`.
+    """
+    tarifas = leer_tarifas() if tarifas is None else tarifas
+    precios = precios_por_tarifa(productos, {v.tarifa: tarifas[v.tarifa] for v in variantes})
+    maquetador = _Maquetador()
+    grupos = {}
+    for variante in variantes:
+        grupos.setdefault((variante.con_stock, variante.solo_destacados), []).append(variante)
+    os.makedirs(directorio, exist_ok=True)
+    log.info(f"Generando {len(variantes)} variantes con {len(productos)} productos "
+             f"({len(grupos)} maquetaciones distintas)...")
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="variantes_catalogo_") as directorio_temporal:
+        for num_grupo, ((con_stock, solo_destacados), del_grupo) in enumerate(grupos.items()):
+            indices = [i for i, p in enumerate(productos) if p.destacado] if solo_destacados else range(len(productos))
+            if not indices:
+                log.warning(f"Sin productos para {', '.join(v.nombre for v in del_grupo)}: no se generan.")
+                continue
+            seleccion = [productos[i] for i in indices]
+            rutas = [os.path.join(directorio, f"{prefijo}_{v.nombre}.pdf") for v in del_grupo]
+
+            if len(del_grupo) == 1:
+                filas = [maquetador.fila("Precio:", precios[del_grupo[0].tarifa][i]) for i in indices]
+                paginas, _ = maquetador.renderizar(rutas[0], seleccion, filas, con_stock, imagenes)
+                resultados.append((rutas[0], paginas, os.path.getsize(rutas[0])))
+                continue
+
+            # Base sin precios, con un hueco tan alto como la fila de precio más alta de las tarifas del grupo
+            huecos = [render_rapido.maquetar_hueco(
+                          "Precio:", n, max(maquetador.fila("Precio:", precios[v.tarifa][i]).altura for v in del_grupo))
+                      for n, i in enumerate(indices)]
+            ruta_base = os.path.join(directorio_temporal, f"base_{num_grupo}.pdf")
+            paginas, canvas_base = maquetador.renderizar(ruta_base, seleccion, huecos, con_stock, imagenes,
+                                                         CanvasHuecos)
+            estampador = EstampadorIncremental(ruta_base, (pagina - 1 for pagina, _, _ in canvas_base.huecos.values()))
+            for variante, ruta in zip(del_grupo, rutas):
+                precios_variante = precios[variante.tarifa]
+
+                def textos():
+                    for n, (pagina, x, y) in canvas_base.huecos.items():
+                        fila = maquetador.fila("Precio:", precios_variante[indices[n]])
+                        # La primera operación de la fila es la etiqueta, ya dibujada en la base
+                        for _, fuente, tamano, dx, dy, linea in fila.operaciones[1:]:
+                            yield pagina - 1, x + dx, y - dy, linea, fuente, tamano
+
+                estampador.escribir(ruta, textos())
+                resultados.append((ruta, paginas, os.path.getsize(ruta)))
+
+    for ruta, paginas, tamano in resultados:
+        log.info(f"  {ruta}: {paginas} páginas, {tamano / 2**20:.1f} MiB")
+    return resultados